@@ -0,0 +1,83 @@
+"""This script starts a cluster of Quantum Manager Servers (Python Version) together with a parallel simulation.
+
+Each shard is a quantum manager server storing part of the keys, listening on consecutive ports starting at `port`.
+The simulation command (e.g. `mpiexec -n 2 python3 my_script.py`) is run once all shards are listening,
+and the script waits for the shards to stop after the simulation ends.
+The simulation should use the same number of shards (the `qm_shards` argument of the parallel timeline,
+or the `shards` field of the JSON configuration file).
+
+Arguments:
+    ip (str): ip address to listen on.
+    port (int): port of the first shard.
+    client_num (int): number of quantum manager clients linked to each shard.
+    shard_num (int): number of shards.
+    command (List[str]): command running the simulation.
+    --transport (str): "tcp" (default), or "unix" for Unix domain sockets when all clients run on the same host.
+    --threaded: serve each client on its own thread in each shard.
+
+Options should be given before the positional arguments, e.g.:
+    python3 qm_cluster.py --transport unix 127.0.0.1 6789 2 4 mpiexec -n 2 python3 my_script.py
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import time
+
+from psequence.communication import unix_socket_path
+from psequence.quantum_manager_server import start_server, start_threaded_server, valid_ip, valid_port
+
+
+def wait_for_shard(ip, port, transport):
+    # connecting would count as a client of the shard, so wait for the socket file (or a short delay for TCP)
+    if transport == "unix":
+        while not os.path.exists(unix_socket_path(port)):
+            time.sleep(0.01)
+    else:
+        time.sleep(0.5)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='A cluster of quantum manager servers running with a simulation')
+    parser.add_argument('ip', type=valid_ip, help='listening IP address')
+    parser.add_argument('port', type=valid_port, help='listening port number of the first shard')
+    parser.add_argument('client_num', type=int,
+                        help='The number of connected clients')
+    parser.add_argument('shard_num', type=int, help='The number of shards')
+    parser.add_argument('command', nargs=argparse.REMAINDER,
+                        help='command running the simulation')
+    parser.add_argument('--transport', choices=['tcp', 'unix'], default='tcp',
+                        help='socket type for connections with clients')
+    parser.add_argument('--threaded', action='store_true',
+                        help='serve clients concurrently')
+    args = parser.parse_args()
+
+    server_function = start_threaded_server if args.threaded else start_server
+    shards = []
+    for i in range(args.shard_num):
+        shard = multiprocessing.Process(target=server_function,
+                                        args=(args.ip, args.port + i, args.client_num, "KET",
+                                              "server_log_{}.json".format(i), args.transport))
+        shard.start()
+        shards.append(shard)
+    for i in range(args.shard_num):
+        wait_for_shard(args.ip, args.port + i, args.transport)
+
+    result = subprocess.run(args.command)
+    if result.returncode != 0:
+        for shard in shards:
+            shard.terminate()
+    for shard in shards:
+        shard.join()
+
+    # summarize the logs of the shards
+    for i in range(args.shard_num):
+        log_file = "server_log_{}.json".format(i)
+        if os.path.exists(log_file):
+            with open(log_file) as fh:
+                log = json.load(fh)
+            print("shard {}: {} messages, {} keys and {} states held".format(i, log["msg_counter"], log["keys_held"],
+                                                                           log["states_held"]))
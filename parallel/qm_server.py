@@ -7,9 +7,11 @@ Arguments:
     ip (str): ip address to listen on.
     port (int): port to listen on.
     client_num (int): number of quantum manager clients linked to the server.
+    --transport (str): "tcp" (default), or "unix" for a Unix domain socket when all clients run on the same host.
+    --threaded: serve each client on its own thread, with concurrent requests on disjoint entangled states.
 """
 
-from psequence.quantum_manager_server import start_server, valid_ip, valid_port
+from psequence.quantum_manager_server import start_server, start_threaded_server, valid_ip, valid_port
 import argparse
 
 if __name__ == '__main__':
@@ -19,6 +21,13 @@ if __name__ == '__main__':
     parser.add_argument('port', type=valid_port, help='listening port number')
     parser.add_argument('client_num', type=int,
                         help='The number of connected clients')
+    parser.add_argument('--transport', choices=['tcp', 'unix'], default='tcp',
+                        help='socket type for connections with clients')
+    parser.add_argument('--threaded', action='store_true',
+                        help='serve clients concurrently')
     args = parser.parse_args()
 
-    start_server(args.ip, args.port, args.client_num)
+    if args.threaded:
+        start_threaded_server(args.ip, args.port, args.client_num, transport=args.transport)
+    else:
+        start_server(args.ip, args.port, args.client_num, transport=args.transport)
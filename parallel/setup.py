@@ -15,7 +15,6 @@ setup(
     install_requires=[
         'numpy>=1.22',
         'pandas',
-        'qutip>=4.6.0',
         'tqdm>=4.54.0',
         'mpi4py',
         'pytest-mpi',
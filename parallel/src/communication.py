@@ -1,4 +1,16 @@
+"""This module defines functions to send and receive messages between quantum manager clients and servers.
+
+Messages are framed by their length in bytes (`LEN_BYTE_LEN` bytes in `BYTE_ORDER`).
+Message bodies are either JSON (compatible with the C++ server) or the binary format of the Python server,
+which starts with `BINARY_MAGIC` (see `quantum_manager_server.pack_messages`).
+Messages are received in place into a reusable buffer (see `ReceiveBuffer`).
+Connections use TCP sockets, or Unix domain sockets when all processes run on one host (see `connect_to_server`).
+"""
+
 from json import dumps, loads
+import os
+import socket as sock
+from tempfile import gettempdir
 from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
@@ -7,6 +19,83 @@ if TYPE_CHECKING:
 LEN_BYTE_LEN = 4
 BYTE_ORDER = "big"
 
+JSON_WIRE_FORMAT = "json"
+BINARY_WIRE_FORMAT = "binary"
+BINARY_MAGIC = b"\x00"  # first byte of binary message bodies (JSON bodies start with a printable character)
+
+TCP_TRANSPORT = "tcp"
+UNIX_TRANSPORT = "unix"
+
+
+def unix_socket_path(port: int) -> str:
+    """Function to get the path of the Unix domain socket used in place of a TCP port.
+
+    Args:
+        port (int): port of the quantum manager server.
+
+    Returns:
+        str: path of the socket file in the temporary directory.
+    """
+
+    return os.path.join(gettempdir(), "sequence_qm_{}.sock".format(port))
+
+
+def _transport_family(transport: str) -> int:
+    if transport == TCP_TRANSPORT:
+        return sock.AF_INET
+    elif transport == UNIX_TRANSPORT:
+        if not hasattr(sock, "AF_UNIX"):
+            raise ValueError("Unix domain sockets are not supported on this platform")
+        return sock.AF_UNIX
+    raise ValueError("Invalid transport {}".format(transport))
+
+
+def listen_for_clients(ip: str, port: int, transport: str = TCP_TRANSPORT) -> "socket":
+    """Function to open the listening socket of a quantum manager server.
+
+    With the "unix" transport, the socket file is given by `unix_socket_path(port)` and `ip` is not used.
+
+    Args:
+        ip (str): ip address to bind to.
+        port (int): port to bind to.
+        transport (str): "tcp" or "unix" (default "tcp").
+
+    Returns:
+        socket: listening socket.
+    """
+
+    s = sock.socket(_transport_family(transport))
+    if transport == UNIX_TRANSPORT:
+        path = unix_socket_path(port)
+        if os.path.exists(path):
+            os.remove(path)
+        s.bind(path)
+    else:
+        s.setsockopt(sock.SOL_SOCKET, sock.SO_REUSEADDR, 1)
+        s.bind((ip, port))
+    s.listen()
+    return s
+
+
+def connect_to_server(ip: str, port: int, transport: str = TCP_TRANSPORT) -> "socket":
+    """Function to connect to a quantum manager server.
+
+    Args:
+        ip (str): ip address of the server.
+        port (int): port of the server.
+        transport (str): "tcp" or "unix" (default "tcp"); the "unix" transport requires the server on the same host.
+
+    Returns:
+        socket: connected socket.
+    """
+
+    s = sock.socket(_transport_family(transport))
+    if transport == UNIX_TRANSPORT:
+        s.connect(unix_socket_path(port))
+    else:
+        s.connect((ip, port))
+    return s
+
 
 def send_msg_with_length(socket: "socket", msg: Any):
     msg_byte = dumps(msg)
@@ -15,15 +104,70 @@ def send_msg_with_length(socket: "socket", msg: Any):
     socket.sendall(data)
 
 
-def recv_msg_with_length(socket: "socket") -> Any:
-    length_byte = socket.recv(LEN_BYTE_LEN)
-    length = int.from_bytes(length_byte, BYTE_ORDER)
-    all_data = ''
-    while len(all_data) < length:
-        received_data = socket.recv(length)
-        if all_data == '':
-            all_data = received_data
-        else:
-            all_data += received_data
-    received_msg = loads(all_data)
+def send_bytes_with_length(socket: "socket", data: bytes):
+    socket.sendall(len(data).to_bytes(LEN_BYTE_LEN, BYTE_ORDER) + data)
+
+
+class ReceiveBuffer:
+    """Class of a reusable buffer to receive messages framed by their length (one per connection).
+
+    Messages are received in place with `socket.recv_into`, and the buffer grows to fit the largest message.
+    The view returned by `recv` is only valid until the next call; decoded values must not keep references to it.
+
+    Attributes:
+        buffer (bytearray): storage for the last message received.
+    """
+
+    def __init__(self, size: int = 1 << 16):
+        self.buffer = bytearray(size)
+
+    def recv(self, socket: "socket") -> memoryview:
+        """Method to receive the next message.
+
+        Args:
+            socket (socket): socket to receive from.
+
+        Returns:
+            memoryview: view of the message body in the buffer.
+
+        Raises:
+            ConnectionError: if the connection is closed before the whole message is received.
+        """
+
+        header = memoryview(self.buffer)[:LEN_BYTE_LEN]
+        _recv_exactly(socket, header)
+        length = int.from_bytes(header, BYTE_ORDER)
+        header.release()
+        if length > len(self.buffer):
+            self.buffer = bytearray(max(length, 2 * len(self.buffer)))
+        body = memoryview(self.buffer)[:length]
+        _recv_exactly(socket, body)
+        return body
+
+
+def _recv_exactly(socket: "socket", view: memoryview) -> None:
+    received = 0
+    while received < len(view):
+        count = socket.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("connection closed while receiving a message")
+        received += count
+
+
+def recv_bytes_with_length(socket: "socket", buffer: ReceiveBuffer = None) -> memoryview:
+    if buffer is None:
+        buffer = ReceiveBuffer(LEN_BYTE_LEN)
+    return buffer.recv(socket)
+
+
+def is_binary(data: bytes) -> bool:
+    return data[:1] == BINARY_MAGIC
+
+
+def decode_json(data: memoryview) -> Any:
+    return loads(str(data, 'utf-8'))
+
+
+def recv_msg_with_length(socket: "socket", buffer: ReceiveBuffer = None) -> Any:
+    received_msg = decode_json(recv_bytes_with_length(socket, buffer))
     return received_msg
@@ -4,16 +4,25 @@ from sequence.topology.router_net_topo import RouterNetTopo
 from sequence.topology.node import QuantumRouter, BSMNode
 
 from .p_timeline import ParallelTimeline
+from .communication import BINARY_WIRE_FORMAT, TCP_TRANSPORT
 
 
 class ParallelRouterNetTopo(RouterNetTopo):
+    WIRE_FORMAT = "wire_format"
+    TRANSPORT = "transport"
+    SHARDS = "shards"
+
     def _add_timeline(self, config):
         stop_time = config.get(Topo.STOP_TIME, float('inf'))
         assert MPI.COMM_WORLD.Get_size() == config[self.PROC_NUM]
         lookahead = config[self.LOOKAHEAD]
         ip = config[self.IP]
         port = config[self.PORT]
-        self.tl = ParallelTimeline(lookahead, qm_ip=ip, qm_port=port, stop_time=stop_time)
+        wire_format = config.get(self.WIRE_FORMAT, BINARY_WIRE_FORMAT)
+        transport = config.get(self.TRANSPORT, TCP_TRANSPORT)
+        shards = config.get(self.SHARDS, 1)
+        self.tl = ParallelTimeline(lookahead, qm_ip=ip, qm_port=port, stop_time=stop_time,
+                                   qm_wire_format=wire_format, qm_transport=transport, qm_shards=shards)
 
     def _add_nodes(self, config):
         rank = MPI.COMM_WORLD.Get_rank()
@@ -6,7 +6,8 @@ from sequence.kernel.timeline import Timeline
 from sequence.kernel.event import Event
 from sequence.kernel.quantum_manager import KET_STATE_FORMALISM
 
-from .quantum_manager_client import QuantumManagerClient
+from .quantum_manager_client import QuantumManagerClient, ShardedQuantumManagerClient
+from .communication import BINARY_WIRE_FORMAT, TCP_TRANSPORT
 
 
 class ParallelTimeline(Timeline):
@@ -29,7 +30,8 @@ class ParallelTimeline(Timeline):
     """
 
     def __init__(self, lookahead: int, stop_time=float('inf'), formalism=KET_STATE_FORMALISM,
-                 qm_ip=None, qm_port=None):
+                 qm_ip=None, qm_port=None, qm_wire_format=BINARY_WIRE_FORMAT, qm_transport=TCP_TRANSPORT,
+                 qm_shards=1):
         """Constructor for the ParallelTimeline class.
 
         Also creates a quantum manager client, unless `qm_ip` and `qm_port` are both set to None.
@@ -40,6 +42,13 @@ class ParallelTimeline(Timeline):
             formalism (str): formalism to use for storing quantum states (default 'KET').
             qm_ip (str): IP address for the quantum manager server (default None).
             qm_port (int): port to connect to for quantum manager server (default None).
+            qm_wire_format (str): message format for the quantum manager server (default "binary").
+                The "json" format is required for the C++ server.
+            qm_transport (str): connection to the quantum manager server (default "tcp").
+                The "unix" transport uses a Unix domain socket, for simulations where all processes and the server
+                run on the same host.
+            qm_shards (int): number of quantum manager servers sharing the keys (default 1).
+                Shards listen on consecutive ports starting at `qm_port`.
         """
 
         super(ParallelTimeline, self).__init__(stop_time, formalism)
@@ -49,7 +58,12 @@ class ParallelTimeline(Timeline):
         self.event_buffer = [[] for _ in range(MPI.COMM_WORLD.Get_size())]
         self.lookahead = lookahead
         if qm_ip is not None and qm_port is not None:
-            self.quantum_manager = QuantumManagerClient(formalism, qm_ip, qm_port)
+            if qm_shards > 1:
+                ports = [qm_port + i for i in range(qm_shards)]
+                self.quantum_manager = ShardedQuantumManagerClient(formalism, qm_ip, ports, qm_wire_format,
+                                                                   qm_transport)
+            else:
+                self.quantum_manager = QuantumManagerClient(formalism, qm_ip, qm_port, qm_wire_format, qm_transport)
 
         self.show_progress = False
 
@@ -63,7 +77,7 @@ class ParallelTimeline(Timeline):
     def schedule(self, event: 'Event'):
         """Method to schedule an event."""
 
-        if type(event.process.owner) is str \
+        if event.process._func is None \
                 and event.process.owner in self.foreign_entities:
             self.buffer_min_ts = min(self.buffer_min_ts, event.time)
             tl_id = self.foreign_entities[event.process.owner]
@@ -127,6 +141,9 @@ class ParallelTimeline(Timeline):
                 self.quantum_manager.flush_before_sync()
             self.computing_time += time() - tick
 
+        if self.metrics_file is not None:
+            self.metrics.export(self.metrics_file)
+
     def add_foreign_entity(self, entity_name: str, foreign_id: int):
         """Adds the name of an entity on another parallel timeline.
 
@@ -1,21 +1,25 @@
-"""This module defines the QuantumManagerClient class.
+"""This module defines the QuantumManagerClient and ShardedQuantumManagerClient classes.
 
 This client provides the same interface as the QuantumManager class for manipulating qubits.
 Qubits only managed by the local process are stored within a QuantumManager class instance.
-Qubits managed or accessed between processes are stored on a remote quantum manager server.
+Qubits managed or accessed between processes are stored on a remote quantum manager server,
+or on a cluster of servers that each store part of the keys (with the ShardedQuantumManagerClient class).
 """
-from collections import defaultdict
-from socket import socket
-from typing import List
-from time import time
+from collections import defaultdict, Counter
+from typing import Dict, List, Tuple
+from time import sleep, time
 from uuid import uuid4
 from sequence.kernel.quantum_manager import QuantumManagerKet, QuantumManagerDensity, KetState, \
     KET_STATE_FORMALISM, DENSITY_MATRIX_FORMALISM
 from sequence.components.circuit import Circuit
-from .communication import send_msg_with_length, recv_msg_with_length
+from .communication import send_msg_with_length, recv_msg_with_length, send_bytes_with_length, \
+    recv_bytes_with_length, connect_to_server, ReceiveBuffer, BINARY_WIRE_FORMAT, JSON_WIRE_FORMAT, TCP_TRANSPORT
 
 from .quantum_manager_server import QuantumManagerMsgType, \
-    QuantumManagerMessage
+    QuantumManagerMessage, pack_messages, unpack_return_value, LOCATION_HOME, LOCATION_NONE, LOCATION_MOVING
+
+RETRY_DELAY = 0.001  # seconds to wait before locating keys moved by other processes again
+RETRY_TIMEOUT = 20  # seconds after which keys that keep moving or are not found raise an error
 
 
 class QuantumManagerClient:
@@ -30,27 +34,40 @@ class QuantumManagerClient:
         socket (socket): socket for communication with server.
         managed_qubits (set): keys for all qubits managed locally by client.
         message_buffer (List): list of messages to send to quantum manager server.
+        wire_format (str): format of messages sent to the server ("binary" or "json").
+        circuit_ids (Dict[tuple, int]): IDs of circuits sent to the server in binary format.
+        receive_buffer (ReceiveBuffer): buffer for messages received from the server.
+        transport (str): type of socket connected to the server ("tcp" or "unix").
     """
 
-    def __init__(self, formalism: str, ip: str, port: int):
+    def __init__(self, formalism: str, ip: str, port: int, wire_format: str = BINARY_WIRE_FORMAT,
+                 transport: str = TCP_TRANSPORT):
         """Constructor for QuantumManagerClient class.
 
         Args:
             formalism (str): formalism to use for quantum manager.
             ip (str): ip of quantum manager server.
             port (int): port of quantum manager server.
+            wire_format (str): format of messages, "binary" (Python server) or "json" (Python or C++ server)
+                (default "binary").
+            transport (str): "tcp" (default), or "unix" for a Unix domain socket to a server on the same host.
         """
+        if wire_format not in (BINARY_WIRE_FORMAT, JSON_WIRE_FORMAT):
+            raise ValueError("Invalid wire format {}".format(wire_format))
         self.formalism = formalism
         self.ip = ip
         self.port = port
-        self.socket = socket()
+        self.wire_format = wire_format
+        self.circuit_ids = {}
+        self.receive_buffer = ReceiveBuffer()
+        self.transport = transport
         self.managed_qubits = set()
         self.io_time = 0
         self.type_counter = defaultdict(lambda: 0)
         self.client_call_counter = 0
         self.message_buffer = []
 
-        self.socket.connect((self.ip, self.port))
+        self.socket = connect_to_server(self.ip, self.port, self.transport)
         self.socket.settimeout(20)
 
         # local quantum manager
@@ -99,44 +116,38 @@ class QuantumManagerClient:
         if self._check_local([key]):
             return self.qm.get(key)
         else:
-            state_raw = self._send_message(QuantumManagerMsgType.GET, [key],
-                                           [])
-            state = KetState([0, 1], [0])
-            state.deserialize(state_raw)
-            return state
+            return self._send_message(QuantumManagerMsgType.GET, [key], [])
 
     def run_circuit(self, circuit: "Circuit", keys: List[int], meas_samp=None) -> any:
         self.client_call_counter += 1
         if self._check_local(keys):
             return self.qm.run_circuit(circuit, keys, meas_samp)
         else:
-            visited_qubits = set()
+            # keys of the request, in circuit order
+            visited_qubits = []
             for key in keys:
                 if key in visited_qubits:
                     continue
                 if self.is_managed_by_server(key):
-                    visited_qubits.add(key)
+                    visited_qubits.append(key)
                 else:
                     state = self.qm.get(key)
                     for state_key in state.keys:
-                        visited_qubits.add(state_key)
+                        if state_key not in visited_qubits:
+                            visited_qubits.append(state_key)
                         assert not self.is_managed_by_server(state_key)
                     self.move_manage_to_server(state.keys[0])
             # todo: move qubit to client if all keys of entangled qubits belong
             #       to the client
             if len(circuit.measured_qubits) == 0:
                 self._send_message(QuantumManagerMsgType.RUN,
-                                   list(visited_qubits),
+                                   visited_qubits,
                                    [circuit, keys], False)
                 return {}
 
-            ret_val_raw = self._send_message(QuantumManagerMsgType.RUN,
-                                             list(visited_qubits),
-                                             [circuit, keys, meas_samp])
-
-            ret_val = {}
-            for key in ret_val_raw:
-                ret_val[int(key, 16)] = ret_val_raw[key]
+            ret_val = self._send_message(QuantumManagerMsgType.RUN,
+                                         visited_qubits,
+                                         [circuit, keys, meas_samp])
 
             for measured_q in ret_val:
                 if not measured_q in self.qm.states:
@@ -147,6 +158,17 @@ class QuantumManagerClient:
                     self.move_manage_to_client([measured_q], [1, 0])
             return ret_val
 
+    def run_circuit_batch(self, circuit: "Circuit", keys_list: List[List[int]], meas_samps=None) -> List:
+        if meas_samps is None:
+            meas_samps = [None] * len(keys_list)
+        return [self.run_circuit(circuit, keys, meas_samp) for keys, meas_samp in zip(keys_list, meas_samps)]
+
+    def defer_circuit(self, circuit: "Circuit", keys: List[int], meas_samp=None, callback=None) -> None:
+        # circuits are not deferred by the client; they are run immediately (locally or on the server)
+        result = self.run_circuit(circuit, keys, meas_samp)
+        if callback is not None:
+            callback(result)
+
     def set(self, keys: List[int], amplitudes: any) -> None:
         self.client_call_counter += 1
         if self._check_local(keys):
@@ -161,7 +183,7 @@ class QuantumManagerClient:
 
     def remove(self, key: int) -> None:
         self.client_call_counter += 1
-        self._send_message(QuantumManagerMsgType.REMOVE, [key], [])
+        self._send_message(QuantumManagerMsgType.REMOVE, [key], [], False)
         self.qm.remove(key)
 
     def kill(self) -> None:
@@ -224,16 +246,38 @@ class QuantumManagerClient:
 
         if expecting_receive:
             self.flush_message_buffer()
-            tick = time()
-            received_msg = recv_msg_with_length(self.socket)
-            self.io_time += time() - tick
-            return received_msg
+            return self._receive_return_value(msg_type)
+
+    def _receive_return_value(self, msg_type) -> any:
+        # block until the return value of a request of the given type is received
+        tick = time()
+        if self.wire_format == BINARY_WIRE_FORMAT:
+            data = recv_bytes_with_length(self.socket, self.receive_buffer)
+            received_msg = unpack_return_value(msg_type, data)
+        else:
+            received_msg = self._decode_json(msg_type, recv_msg_with_length(self.socket, self.receive_buffer))
+        self.io_time += time() - tick
+        return received_msg
+
+    @staticmethod
+    def _decode_json(msg_type, received_msg) -> any:
+        # convert return values in JSON format to those of the quantum manager
+        if msg_type in (QuantumManagerMsgType.GET, QuantumManagerMsgType.TAKE):
+            state = KetState([0, 1], [0])
+            state.deserialize(received_msg)
+            return state
+        elif msg_type == QuantumManagerMsgType.RUN:
+            return {int(key, 16): res for key, res in received_msg.items()}
+        return received_msg
 
     def flush_message_buffer(self):
         if len(self.message_buffer) > 0:
             tick = time()
-            msgs = [msg.serialize() for msg in self.message_buffer]
-            send_msg_with_length(self.socket, msgs)
+            if self.wire_format == BINARY_WIRE_FORMAT:
+                send_bytes_with_length(self.socket, pack_messages(self.message_buffer, self.circuit_ids))
+            else:
+                msgs = [msg.serialize() for msg in self.message_buffer]
+                send_msg_with_length(self.socket, msgs)
             self.io_time += time() - tick
             self.message_buffer = []
 
@@ -243,3 +287,321 @@ class QuantumManagerClient:
 
     def _check_local(self, keys: List[int]):
         return not any([self.is_managed_by_server(key) for key in keys])
+
+
+class ShardedQuantumManagerClient(QuantumManagerClient):
+    """Class to process interactions with a cluster of quantum manager servers (shards).
+
+    Each key on the servers is stored by one shard: its home shard (`key % number of shards`) by default,
+    or the shard its state migrated to.
+    The home shard of a key records the shard storing it if it is stored elsewhere (with RELOCATE messages),
+    and the client asks it for the location of keys (with LOCATE messages) the first time they are used
+    in each synchronization window.
+    A circuit or SET on keys stored by several shards first migrates their states to one shard:
+    each state is taken from its shard (with a TAKE message, which gets and removes it at once)
+    and set on the target shard with the request, once its new location is recorded on the home shards.
+
+    Other processes may move keys at any time, so locations known by the client may be outdated.
+    Shards only run the GET, RUN, REMOVE and TAKE requests of the client on keys they hold,
+    and answer each of them with whether it was run (see the CHECK message of `start_server`).
+    Requests that were not run are sent again once their keys are located again,
+    waiting while another process moves them.
+    Each of these requests thus waits for an answer from its shard.
+    Other messages are sent without waiting, and `flush_before_sync` waits until the shards have run them,
+    so other processes see their effects in the next synchronization window.
+
+    Attributes:
+        formalism (str): formalism to use for quantum manager (must match servers).
+        ip (str): ip address of quantum manager servers.
+        ports (List[int]): port of each shard.
+        shards (List[QuantumManagerClient]): connection to each shard.
+        locations (Dict[int, int]): shard storing keys located in the current synchronization window
+            (`LOCATION_NONE` if not stored).
+        unstored (set): keys created by the client and not stored by the shards since.
+        unsynced (set): shards sent messages since their last reply.
+        migrations_in (List[int]): number of keys migrated to each shard.
+        migrations_out (List[int]): number of keys migrated from each shard.
+        managed_qubits (set): keys for all qubits managed locally by client.
+    """
+
+    def __init__(self, formalism: str, ip: str, ports: List[int], wire_format: str = BINARY_WIRE_FORMAT,
+                 transport: str = TCP_TRANSPORT):
+        """Constructor for ShardedQuantumManagerClient class.
+
+        Args:
+            formalism (str): formalism to use for quantum manager.
+            ip (str): ip of quantum manager servers.
+            ports (List[int]): port of each shard.
+            wire_format (str): format of messages (default "binary").
+            transport (str): "tcp" (default), or "unix" for Unix domain sockets to servers on the same host.
+        """
+
+        self.formalism = formalism
+        self.ip = ip
+        self.ports = ports
+        self.shards = [QuantumManagerClient(formalism, ip, port, wire_format, transport) for port in ports]
+        for shard in self.shards:
+            shard._send_message(QuantumManagerMsgType.CHECK, [], [], False)
+        self.locations: Dict[int, int] = {}
+        self.unstored = set()
+        self.unsynced = set()
+        self.migrations_in = [0] * len(ports)
+        self.migrations_out = [0] * len(ports)
+        self.managed_qubits = set()
+        self.client_call_counter = 0
+
+        # local quantum manager
+        if formalism == KET_STATE_FORMALISM:
+            self.qm = QuantumManagerKet()
+        elif formalism == DENSITY_MATRIX_FORMALISM:
+            self.qm = QuantumManagerDensity()
+        else:
+            raise Exception("Invalid formalism {} given".format(formalism))
+
+    @property
+    def io_time(self) -> float:
+        return sum(shard.io_time for shard in self.shards)
+
+    @property
+    def type_counter(self) -> Dict[str, int]:
+        counter = defaultdict(lambda: 0)
+        for shard in self.shards:
+            for msg_type, count in shard.type_counter.items():
+                counter[msg_type] += count
+        return counter
+
+    def home(self, key: int) -> int:
+        return key % len(self.shards)
+
+    def shard_of(self, key: int) -> int:
+        """Method to get the shard storing a key.
+
+        Args:
+            key (int): key of a qubit.
+
+        Returns:
+            int: index of the shard (`LOCATION_NONE` if the key is not stored,
+                or `LOCATION_MOVING` if another process is moving it).
+        """
+
+        return self._locate([key])[0]
+
+    def shard_stats(self) -> List[Dict[str, int]]:
+        """Method to get the activity of the client with each shard, and the states held by each shard.
+
+        Returns:
+            List[Dict[str, int]]: messages sent to each shard, keys and states held by it,
+                and keys migrated to and from it by the client.
+        """
+
+        stats = []
+        for i, shard in enumerate(self.shards):
+            keys_held, states_held = shard._send_message(QuantumManagerMsgType.STATS, [], [])
+            stats.append({"messages": sum(shard.type_counter.values()), "keys_held": keys_held,
+                          "states_held": states_held, "migrations_in": self.migrations_in[i],
+                          "migrations_out": self.migrations_out[i]})
+        return stats
+
+    def new(self, state=(complex(1), complex(0))) -> int:
+        key = super().new(state)
+        self.unstored.add(key)
+        return key
+
+    def disconnect_from_server(self):
+        for shard in self.shards:
+            shard.disconnect_from_server()
+
+    def kill(self) -> None:
+        self.client_call_counter += 1
+        for shard in self.shards:
+            shard.kill()
+
+    def _send_message(self, msg_type, keys: List, args: List,
+                      expecting_receive=True) -> any:
+        # route a GET, SET, RUN or REMOVE request to the shard storing its keys
+        if msg_type == QuantumManagerMsgType.SET:
+            self._set(keys, args)
+        elif msg_type == QuantumManagerMsgType.REMOVE:
+            self._remove(keys[0])
+        else:
+            return self._request(msg_type, keys, args, expecting_receive)
+
+    def _request(self, msg_type, keys: List[int], args: List, expecting_receive: bool) -> any:
+        # run a GET or RUN request on the shard storing its keys, until the keys are found there
+        start = time()
+        while True:
+            locations = self._find(keys, start)
+            if LOCATION_NONE in locations:
+                raise KeyError("keys {} are not stored by the shards".format(
+                    [key for key, location in zip(keys, locations) if location == LOCATION_NONE]))
+            if msg_type == QuantumManagerMsgType.RUN:
+                shard, moved = self._colocate(keys, start)
+            else:
+                shard, moved = locations[0], []
+
+            self._relocate(moved, shard)
+            ran, return_val = self._checked(shard, msg_type, keys, args, expecting_receive)
+            if ran:
+                return return_val
+            self._retry(keys, start)
+
+    def _set(self, keys: List[int], args: List) -> None:
+        # set the states of keys on one shard; stored states are taken there first,
+        # so that keys are not left on other shards and the states are only seen once set
+        shard, moved = self._colocate(keys, time(), take_all=True)
+        self._relocate(moved, shard)
+        # keys created by the client are not known to other processes, so their location is not confirmed
+        self._relocate([key for key in keys if key not in moved], shard, confirm=False)
+        self.shards[shard]._send_message(QuantumManagerMsgType.SET, keys, args, False)
+        self._flush(shard)
+
+    def _remove(self, key: int) -> None:
+        # remove a key from the shard storing it, if any
+        if key in self.unstored:
+            self.unstored.discard(key)
+            return
+        start = time()
+        while True:
+            shard = self._find([key], start)[0]
+            if shard == LOCATION_NONE:
+                return
+            ran, _ = self._checked(shard, QuantumManagerMsgType.REMOVE, [key], [], False)
+            if ran:
+                self.locations[key] = LOCATION_NONE
+                home = self.home(key)
+                if shard != home:
+                    self.shards[home]._send_message(QuantumManagerMsgType.RELOCATE, [key], [LOCATION_NONE], False)
+                    self._flush(home)
+                return
+            self._retry([key], start)
+
+    def _checked(self, shard: int, msg_type, keys: List[int], args: List,
+                 expecting_receive: bool) -> Tuple[bool, any]:
+        # send a request (with the messages buffered for the shard) and get whether the shard ran it,
+        # and its return value
+        connection = self.shards[shard]
+        connection._send_message(msg_type, keys, args, False)
+        connection.flush_message_buffer()
+        self.unsynced.discard(shard)
+        if not connection._receive_return_value(QuantumManagerMsgType.CHECK):
+            return False, None
+        if expecting_receive:
+            return True, connection._receive_return_value(msg_type)
+        return True, None
+
+    def _locate(self, keys: List[int]) -> List[int]:
+        # ask the home shards for the location of keys not located in this window
+        unknown = {}
+        for key in keys:
+            if key not in self.locations and key not in self.unstored:
+                home_keys = unknown.setdefault(self.home(key), [])
+                if key not in home_keys:
+                    home_keys.append(key)
+        moving = set()
+        for home, home_keys in unknown.items():
+            replies = self.shards[home]._send_message(QuantumManagerMsgType.LOCATE, home_keys, [])
+            for key, location in zip(home_keys, replies):
+                if location == LOCATION_MOVING:
+                    moving.add(key)
+                else:
+                    self.locations[key] = home if location == LOCATION_HOME else location
+        return [LOCATION_NONE if key in self.unstored else LOCATION_MOVING if key in moving else self.locations[key]
+                for key in keys]
+
+    def _find(self, keys: List[int], start: float) -> List[int]:
+        # locate keys, waiting while other processes move them
+        while True:
+            locations = self._locate(keys)
+            if LOCATION_MOVING not in locations:
+                return locations
+            self._retry([key for key, location in zip(keys, locations) if location == LOCATION_MOVING], start)
+
+    def _retry(self, keys: List[int], start: float) -> None:
+        # forget the locations of keys moved by other processes, and wait before locating them again
+        if time() - start > RETRY_TIMEOUT:
+            raise TimeoutError("keys {} were not found on the shards".format(keys))
+        for key in keys:
+            self.locations.pop(key, None)
+        sleep(RETRY_DELAY)
+
+    def _relocate(self, keys: List[int], shard: int, confirm=True) -> None:
+        # record the new shard of keys on their home shards, before their states are sent to it:
+        # other processes only find the states once recorded, so records of later moves are sent after it
+        # with `confirm`, waits until the home shards have recorded it
+        updates = defaultdict(list)
+        for key in keys:
+            self.locations[key] = shard
+            self.unstored.discard(key)
+            if self.home(key) != shard:
+                updates[self.home(key)].append(key)
+        for home, home_keys in updates.items():
+            self.shards[home]._send_message(QuantumManagerMsgType.RELOCATE, home_keys, [shard], False)
+            if confirm:
+                self.shards[home]._send_message(QuantumManagerMsgType.SYNC, [], [])
+                self.unsynced.discard(home)
+            else:
+                self._flush(home)
+
+    def _colocate(self, keys: List[int], start: float, take_all=False) -> Tuple[int, List[int]]:
+        # take the states of stored keys to the shard storing most of them
+        # (ties go to the shard of the earliest key, e.g. the first qubit of a circuit);
+        # the states are left in the message buffer of that shard, to be sent with the request using them
+        # with `take_all`, states already on that shard are also taken (and set again), to check they are there
+        while True:
+            locations = self._find(keys, start)
+            stored = [(key, shard) for key, shard in zip(keys, locations) if shard != LOCATION_NONE]
+            if not stored:
+                return self.home(keys[0]), []
+
+            counts = Counter(shard for _, shard in stored)
+            most = max(counts.values())
+            target = next(shard for _, shard in stored if counts[shard] == most)
+            moved = []
+            # states on the target are taken first, since taking them sends the buffer of the target
+            for key, shard in sorted(stored, key=lambda item: item[1] != target):
+                if key in moved or (shard == target and not take_all):
+                    continue
+                state_keys = self._take(key, shard, target)
+                if state_keys is None:
+                    # moved by another process since it was located
+                    self._relocate(moved, target)
+                    self._flush(target)
+                    self._retry([key], start)
+                    break
+                moved += state_keys
+            else:
+                return target, moved
+
+    def _take(self, key: int, source: int, target: int) -> List[int]:
+        # move the state of a key from its shard to the message buffer of the target shard
+        # returns the keys of the state, or None if the source no longer holds the key
+        ran, state = self._checked(source, QuantumManagerMsgType.TAKE, [key], [], True)
+        if not ran:
+            return None
+        self.shards[target]._send_message(QuantumManagerMsgType.SET, state.keys, [state.state], False)
+        if source != target:
+            # taken keys are marked as moving on the source, which is only used by their home shard
+            others = [state_key for state_key in state.keys if self.home(state_key) != source]
+            if others:
+                self.shards[source]._send_message(QuantumManagerMsgType.RELOCATE, others, [LOCATION_NONE], False)
+            self.migrations_out[source] += len(state.keys)
+            self.migrations_in[target] += len(state.keys)
+        return state.keys
+
+    def _flush(self, shard: int) -> None:
+        if len(self.shards[shard].message_buffer) > 0:
+            self.shards[shard].flush_message_buffer()
+            self.unsynced.add(shard)
+
+    def flush_message_buffer(self):
+        for i in range(len(self.shards)):
+            self._flush(i)
+
+    def flush_before_sync(self):
+        # wait until shards have run all messages, including those sent without waiting for a reply
+        for i, shard in enumerate(self.shards):
+            if len(shard.message_buffer) > 0 or i in self.unsynced:
+                shard._send_message(QuantumManagerMsgType.SYNC, [], [])
+        self.unsynced = set()
+        # other processes may move keys during the next window
+        self.locations = {}
@@ -3,18 +3,28 @@
 This function should be started on a separate process for parallel simulation, \
         using the `mpi_tests/qm_server.py` script or similar.
 Additionally defined are utility functions for socket connections and the messages used by the client/server.
+
+Messages are sent in JSON (with keys as hex strings and amplitudes as pairs of floats),
+or in a binary format with 128-bit keys and raw complex128 amplitude buffers.
+In the binary format, each distinct circuit is sent once per connection and later referenced by an integer ID.
 """
 
 from enum import Enum
+import os
 import socket
 import argparse
 from ipaddress import ip_address
 import select
-from typing import List
+from struct import Struct
+from typing import List, Dict, Tuple
 from time import time
-from json import dump
-from .communication import send_msg_with_length, recv_msg_with_length
+from json import dump, dumps, loads
+from threading import Lock, Thread
+from numpy import array, frombuffer, complex128
+from .communication import send_msg_with_length, send_bytes_with_length, is_binary, decode_json, ReceiveBuffer, \
+    listen_for_clients, unix_socket_path, BINARY_MAGIC, TCP_TRANSPORT, UNIX_TRANSPORT
 from sequence.components.circuit import Circuit
+from sequence.kernel.quantum_state import KetState, DensityState
 
 from .p_quantum_manager import ParallelQuantumManagerKet, ParallelQuantumManagerDensity
 
@@ -51,6 +61,21 @@ class QuantumManagerMsgType(Enum):
     CONNECT = 6
     CONNECTED = 7
     SYNC = 8
+    LOCATE = 9
+    RELOCATE = 10
+    STATS = 11
+    TAKE = 12
+    CHECK = 13
+
+
+# locations of keys returned by LOCATE (other values are the index of the shard storing the key)
+LOCATION_HOME = -1  # stored by the shard answering
+LOCATION_NONE = -2  # not stored
+LOCATION_MOVING = -3  # taken from the shard answering, and not yet stored by another shard
+
+# requests answered with whether the shard holds their keys on connections sending CHECK
+CHECKED_TYPES = (QuantumManagerMsgType.GET, QuantumManagerMsgType.RUN, QuantumManagerMsgType.REMOVE,
+                 QuantumManagerMsgType.TAKE)
 
 
 class QuantumManagerMessage:
@@ -102,6 +127,9 @@ class QuantumManagerMessage:
             if len(self.args) > 2:
                 args["meas_samp"] = self.args[2]
 
+        elif self.type == QuantumManagerMsgType.RELOCATE:
+            args["location"] = self.args[0]
+
         return {"type": self.type.name, "keys": hex_keys, "args": args}
 
     def deserialize(self, j_data):
@@ -111,7 +139,7 @@ class QuantumManagerMessage:
             j_data: serialized QuantumManagerMessage data.
         """
 
-        self.keys = j_data["keys"]
+        self.keys = [int(key, 16) for key in j_data["keys"]]
 
         if j_data["type"] == "GET":
             self.type = QuantumManagerMsgType.GET
@@ -126,25 +154,392 @@ class QuantumManagerMessage:
             self.args = [cmplx_n_list]
         elif j_data["type"] == "RUN":
             self.type = QuantumManagerMsgType.RUN
-            # use hex string as key temporarily
             c_raw = j_data["args"]["circuit"]
             circuit = Circuit(1)
             circuit.deserialize(c_raw)
-            keys = j_data["args"]["keys"]
+            keys = [int(key, 16) for key in j_data["args"]["keys"]]
             meas_samp = j_data["args"]["meas_samp"]
             self.args = [circuit, keys, meas_samp]
 
+        elif j_data["type"] == "RELOCATE":
+            self.type = QuantumManagerMsgType.RELOCATE
+            self.args = [j_data["args"]["location"]]
+
         elif j_data["type"] == "CLOSE":
             self.type = QuantumManagerMsgType.CLOSE
         elif j_data["type"] == "SYNC":
             self.type = QuantumManagerMsgType.SYNC
+        else:
+            self.type = QuantumManagerMsgType[j_data["type"]]
+
+    def serialize_binary(self, circuit_ids: Dict[tuple, int]) -> bytes:
+        """Serializes the message in the binary format.
+
+        Args:
+            circuit_ids (Dict[tuple, int]): IDs of circuits already sent on the connection (see `circuit_key`).
+                Circuits not yet sent are added, and their definition is included in the message.
+
+        Returns:
+            bytes: message type, keys and arguments.
+        """
+
+        parts = [_MSG_HEADER.pack(self.type.value, len(self.keys)), _pack_keys(self.keys)]
+
+        if self.type == QuantumManagerMsgType.SET:
+            parts.append(_pack_amplitudes(self.args[0]))
+
+        elif self.type == QuantumManagerMsgType.RUN:
+            circuit, keys = self.args[0], self.args[1]
+            key = circuit_key(circuit)
+            definition = b""
+            if key not in circuit_ids:
+                circuit_ids[key] = len(circuit_ids)
+                definition = dumps(circuit.serialize()).encode("utf-8")
+            meas_samp = self.args[2] if len(self.args) > 2 and self.args[2] is not None else -1
+            parts += [_RUN_HEADER.pack(circuit_ids[key], len(definition)), definition,
+                      _COUNT.pack(len(keys)), _pack_keys(keys), _FLOAT.pack(meas_samp)]
+
+        elif self.type == QuantumManagerMsgType.RELOCATE:
+            parts.append(_INT.pack(self.args[0]))
+
+        return b"".join(parts)
+
+    def deserialize_binary(self, data: bytes, offset: int, circuits: Dict[int, Circuit]) -> int:
+        """Method to reconstruct a message from data in the binary format.
+
+        Args:
+            data (bytes): buffer holding the message.
+            offset (int): position of the message in `data`.
+            circuits (Dict[int, Circuit]): circuits received on the connection, by ID (updated with new circuits).
+
+        Returns:
+            int: position after the message in `data`.
+        """
+
+        msg_type, num_keys = _MSG_HEADER.unpack_from(data, offset)
+        self.type = QuantumManagerMsgType(msg_type)
+        self.keys, offset = _unpack_keys(data, offset + _MSG_HEADER.size, num_keys)
+        self.args = []
+
+        if self.type == QuantumManagerMsgType.SET:
+            amplitudes, offset = _unpack_amplitudes(data, offset)
+            self.args = [amplitudes.copy()]  # data may be a reused receive buffer
+
+        elif self.type == QuantumManagerMsgType.RUN:
+            circuit_id, definition_len = _RUN_HEADER.unpack_from(data, offset)
+            offset += _RUN_HEADER.size
+            if definition_len > 0:
+                circuit = Circuit(1)
+                circuit.deserialize(loads(bytes(data[offset:offset + definition_len])))
+                circuits[circuit_id] = circuit
+                offset += definition_len
+            num_run_keys, = _COUNT.unpack_from(data, offset)
+            keys, offset = _unpack_keys(data, offset + _COUNT.size, num_run_keys)
+            meas_samp, = _FLOAT.unpack_from(data, offset)
+            self.args = [circuits[circuit_id], keys, meas_samp]
+            offset += _FLOAT.size
+
+        elif self.type == QuantumManagerMsgType.RELOCATE:
+            location, = _INT.unpack_from(data, offset)
+            self.args = [location]
+            offset += _INT.size
+
+        return offset
+
+
+# binary format (little-endian)
+# message: type (u8), number of keys (u32), keys (16 bytes each), then arguments:
+#   SET: number of dimensions (u8), dimensions (u32 each), complex128 amplitudes
+#   RUN: circuit ID (u32), length of circuit definition (u32, 0 if sent before), JSON circuit definition,
+#        number of circuit keys (u32), circuit keys (16 bytes each), measurement sample (f64, -1 if none)
+#   RELOCATE: location (i32)
+# return values: GET and TAKE: number of keys (u32), keys, amplitudes as for SET; RUN: number of results (u32),
+#   key and result (u8) of each; LOCATE and STATS: number of values (u32), values (i32 each);
+#   SYNC and CHECK: bool (u8)
+# batch: BINARY_MAGIC, number of messages (u32), messages
+KEY_BYTE_LEN = 16
+_MSG_HEADER = Struct("<BI")
+_RUN_HEADER = Struct("<II")
+_COUNT = Struct("<I")
+_FLOAT = Struct("<d")
+_INT = Struct("<i")
+_DIM = Struct("<B")
+
+
+def circuit_key(circuit: Circuit) -> tuple:
+    """Function to get a hashable description of a circuit, used to identify circuits already sent."""
+
+    return (circuit.size, tuple((name, tuple(indices), arg) for name, indices, arg in circuit.gates),
+            tuple(circuit.measured_qubits))
+
+
+def _pack_keys(keys: List[int]) -> bytes:
+    return b"".join([key.to_bytes(KEY_BYTE_LEN, "little") for key in keys])
+
+
+def _unpack_keys(data: bytes, offset: int, num_keys: int) -> Tuple[List[int], int]:
+    end = offset + num_keys * KEY_BYTE_LEN
+    keys = [int.from_bytes(data[i:i + KEY_BYTE_LEN], "little") for i in range(offset, end, KEY_BYTE_LEN)]
+    return keys, end
+
+
+def _pack_amplitudes(amplitudes) -> bytes:
+    amplitudes = array(amplitudes, dtype=complex128)
+    shape = Struct("<" + "I" * amplitudes.ndim).pack(*amplitudes.shape)
+    return _DIM.pack(amplitudes.ndim) + shape + amplitudes.tobytes()
+
+
+def _unpack_amplitudes(data: bytes, offset: int):
+    ndim, = _DIM.unpack_from(data, offset)
+    offset += _DIM.size
+    shape_format = Struct("<" + "I" * ndim)
+    shape = shape_format.unpack_from(data, offset)
+    offset += shape_format.size
+    count = 1
+    for dim in shape:
+        count *= dim
+    amplitudes = frombuffer(data, dtype=complex128, count=count, offset=offset).reshape(shape)
+    return amplitudes, offset + count * amplitudes.itemsize
+
+
+def pack_messages(msgs: List[QuantumManagerMessage], circuit_ids: Dict[tuple, int]) -> bytes:
+    """Function to serialize a batch of messages in the binary format.
+
+    Args:
+        msgs (List[QuantumManagerMessage]): messages to send.
+        circuit_ids (Dict[tuple, int]): IDs of circuits already sent on the connection.
+
+    Returns:
+        bytes: serialized batch.
+    """
+
+    return b"".join([BINARY_MAGIC, _COUNT.pack(len(msgs))] + [msg.serialize_binary(circuit_ids) for msg in msgs])
+
+
+def unpack_messages(data: bytes, circuits: Dict[int, Circuit]) -> List[QuantumManagerMessage]:
+    """Function to deserialize a batch of messages in the binary format.
+
+    Args:
+        data (bytes): serialized batch.
+        circuits (Dict[int, Circuit]): circuits received on the connection, by ID.
+
+    Returns:
+        List[QuantumManagerMessage]: received messages.
+    """
+
+    num_msgs, = _COUNT.unpack_from(data, len(BINARY_MAGIC))
+    offset = len(BINARY_MAGIC) + _COUNT.size
+    msgs = []
+    for _ in range(num_msgs):
+        msg = QuantumManagerMessage(None, [], [])
+        offset = msg.deserialize_binary(data, offset, circuits)
+        msgs.append(msg)
+    return msgs
+
+
+def pack_return_value(msg_type: QuantumManagerMsgType, return_val) -> bytes:
+    """Function to serialize the return value of a request in the binary format.
+
+    Args:
+        msg_type (QuantumManagerMsgType): type of the request.
+        return_val (any): state (for GET and TAKE), measurement results (for RUN),
+            list of integers (for LOCATE and STATS) or bool (for SYNC and CHECK).
+
+    Returns:
+        bytes: serialized return value.
+    """
+
+    if msg_type in (QuantumManagerMsgType.GET, QuantumManagerMsgType.TAKE):
+        return b"".join([BINARY_MAGIC, _COUNT.pack(len(return_val.keys)), _pack_keys(return_val.keys),
+                         _pack_amplitudes(return_val.state)])
+    elif msg_type == QuantumManagerMsgType.RUN:
+        results = [key.to_bytes(KEY_BYTE_LEN, "little") + bytes([res]) for key, res in return_val.items()]
+        return b"".join([BINARY_MAGIC, _COUNT.pack(len(results))] + results)
+    elif msg_type in (QuantumManagerMsgType.LOCATE, QuantumManagerMsgType.STATS):
+        return b"".join([BINARY_MAGIC, _COUNT.pack(len(return_val))] + [_INT.pack(val) for val in return_val])
+    else:
+        return BINARY_MAGIC + bytes([bool(return_val)])
+
+
+def unpack_return_value(msg_type: QuantumManagerMsgType, data: bytes):
+    """Function to deserialize the return value of a request in the binary format (see `pack_return_value`).
+
+    Returns:
+        any: state (as `KetState` or `DensityState`) for GET and TAKE, measurement results for RUN,
+            list of integers for LOCATE and STATS, bool for SYNC and CHECK.
+    """
+
+    offset = len(BINARY_MAGIC)
+    if msg_type in (QuantumManagerMsgType.GET, QuantumManagerMsgType.TAKE):
+        num_keys, = _COUNT.unpack_from(data, offset)
+        keys, offset = _unpack_keys(data, offset + _COUNT.size, num_keys)
+        amplitudes, _ = _unpack_amplitudes(data, offset)
+        state_class = KetState if amplitudes.ndim == 1 else DensityState
+        return state_class.trusted(amplitudes.copy(), keys)
+    elif msg_type == QuantumManagerMsgType.RUN:
+        num_results, = _COUNT.unpack_from(data, offset)
+        offset += _COUNT.size
+        results = {}
+        for i in range(offset, offset + num_results * (KEY_BYTE_LEN + 1), KEY_BYTE_LEN + 1):
+            results[int.from_bytes(data[i:i + KEY_BYTE_LEN], "little")] = data[i + KEY_BYTE_LEN]
+        return results
+    elif msg_type in (QuantumManagerMsgType.LOCATE, QuantumManagerMsgType.STATS):
+        num_values, = _COUNT.unpack_from(data, offset)
+        offset += _COUNT.size
+        return [_INT.unpack_from(data, offset + i * _INT.size)[0] for i in range(num_values)]
+    else:
+        return bool(data[offset])
+
+
+def _create_manager(formalism: str):
+    if formalism == "KET":
+        return ParallelQuantumManagerKet({})
+    elif formalism == "DENSITY":
+        return ParallelQuantumManagerDensity({})
+
+
+def _receive_messages(s: "socket.socket", buffer: ReceiveBuffer,
+                      circuits: Dict[int, Circuit]) -> Tuple[List[QuantumManagerMessage], bool]:
+    # receive one batch of messages; also returns if the batch is in binary format
+    data = buffer.recv(s)
+    binary = is_binary(data)
+    if binary:
+        return unpack_messages(data, circuits), binary
+
+    msgs = []
+    for m_raw in decode_json(data):
+        msg = QuantumManagerMessage(None, [], [])
+        msg.deserialize(m_raw)
+        msgs.append(msg)
+    return msgs, binary
+
+
+def _execute(qm, locations: Dict[int, int], msg: QuantumManagerMessage):
+    # apply a request to the manager and return the value to send (or None)
+    # locations holds the shard of keys stored by other shards of a cluster (see `ShardedQuantumManagerClient`)
+    return_val = None
+    if msg.type == QuantumManagerMsgType.GET:
+        assert len(msg.args) == 0
+        return_val = qm.get(msg.keys[0])
+
+    elif msg.type == QuantumManagerMsgType.RUN:
+        assert len(msg.args) == 2 or len(msg.args) == 3
+        circuit, keys, meas_samp = msg.args
+        return_val = qm.run_circuit(circuit, keys, meas_samp)
+        if len(return_val) == 0:
+            return_val = None
+
+    elif msg.type == QuantumManagerMsgType.SET:
+        assert len(msg.args) == 1
+        qm.set(msg.keys, msg.args[0])
+        for key in msg.keys:
+            locations.pop(key, None)
+
+    elif msg.type == QuantumManagerMsgType.REMOVE:
+        assert len(msg.keys) == 1
+        assert len(msg.args) == 0
+        key = msg.keys[0]
+        qm.remove(key)
+
+    elif msg.type == QuantumManagerMsgType.TAKE:
+        # get and remove the state of a key (with all keys of its group), to store it on another shard
+        assert len(msg.keys) == 1
+        return_val = qm.get(msg.keys[0])
+        for key in return_val.keys:
+            qm.remove(key)
+            locations[key] = LOCATION_MOVING
+
+    elif msg.type == QuantumManagerMsgType.SYNC:
+        return_val = True
+
+    elif msg.type == QuantumManagerMsgType.LOCATE:
+        return_val = [locations.get(key, LOCATION_HOME if key in qm.states else LOCATION_NONE) for key in msg.keys]
+
+    elif msg.type == QuantumManagerMsgType.RELOCATE:
+        assert len(msg.args) == 1
+        for key in msg.keys:
+            if msg.args[0] < 0:
+                locations.pop(key, None)
+            else:
+                locations[key] = msg.args[0]
+
+    elif msg.type == QuantumManagerMsgType.STATS:
+        return_val = [len(qm.states), _states_held(qm)]
+
+    else:
+        raise Exception(
+            "Quantum manager session received invalid message type {}".format(
+                msg.type))
+
+    return return_val
+
+
+def _execute_checked(qm, locations: Dict[int, int], msg: QuantumManagerMessage, checked: bool):
+    # apply a request, unless the connection is checked and the keys of the request are not all held
+    # returns the status to send first (None if not checked) and the return value
+    if not checked or msg.type not in CHECKED_TYPES:
+        return None, _execute(qm, locations, msg)
+    if not all(key in qm.states for key in msg.keys):
+        return False, None
+    return True, _execute(qm, locations, msg)
+
+
+def _send_return_value(s: "socket.socket", msg_type: QuantumManagerMsgType, return_val, binary: bool) -> None:
+    if binary:
+        send_bytes_with_length(s, pack_return_value(msg_type, return_val))
+    elif msg_type in (QuantumManagerMsgType.GET, QuantumManagerMsgType.TAKE):
+        send_msg_with_length(s, return_val.serialize())
+    elif msg_type == QuantumManagerMsgType.RUN:
+        send_msg_with_length(s, {hex(key): res for key, res in return_val.items()})
+    else:
+        send_msg_with_length(s, return_val)
+
+
+def _states_held(qm) -> int:
+    # number of distinct state objects (keys of an entangled group share one state)
+    # (states are copied first, since threads of `start_threaded_server` may add or remove keys meanwhile)
+    return len({id(state) for state in list(qm.states.values())})
+
+
+def _write_log(log_file: str, msg_counter: int, traffic_counter: int,
+               timing_comp: Dict[QuantumManagerMsgType, float], qm) -> None:
+    # record timing and performance information
+    data = {"msg_counter": msg_counter, "traffic_counter": traffic_counter,
+            "keys_held": len(qm.states), "states_held": _states_held(qm)}
+    for msg_type in timing_comp:
+        data[f"{msg_type.name}_timer"] = timing_comp[msg_type]
+
+    with open(log_file, 'w') as fh:
+        dump(data, fh)
+
+
+def _accept_clients(ip: str, port: int, client_num: int, transport: str) -> List["socket.socket"]:
+    s = listen_for_clients(ip, port, transport)
+    if transport == UNIX_TRANSPORT:
+        print("listening at:", unix_socket_path(port))
+    else:
+        print("listening at:", ip, port)
+
+    sockets = []
+    for _ in range(client_num):
+        c, addr = s.accept()
+        sockets.append(c)
+    s.close()
+    if transport == UNIX_TRANSPORT:
+        os.remove(unix_socket_path(port))
+    return sockets
 
 
-def start_server(ip: str, port: int, client_num, formalism="KET", log_file="server_log.json"):
+def start_server(ip: str, port: int, client_num, formalism="KET", log_file="server_log.json",
+                 transport=TCP_TRANSPORT):
     """Main function to run quantum manager server.
 
     Will run until all clients have disconnected or `TERMINATE` message received.
     Will block processing until all clients connected.
+    Each batch of messages may be in JSON or binary format; return values are sent in the same format.
+    Requests are processed one at a time, in the order batches are received (see `start_threaded_server`).
+    After a `CHECK` message, GET, RUN, REMOVE and TAKE requests of a client are only run if the server holds
+    their keys, and are answered with whether they were run, before their return value.
 
     Args:
         ip (str): ip address server should bind to.
@@ -152,95 +547,248 @@ def start_server(ip: str, port: int, client_num, formalism="KET", log_file="serv
         client_num (int): number of remote clients that should be connected (one per process).
         formalism (str): formalism to use for quantum manager (default `"KET"` for ket vector).
         log_file (str): output log file to store server information (default `"server_log.json"`).
+        transport (str): `"tcp"` (default), or `"unix"` for a Unix domain socket when all clients run on the same host.
     """
 
-    s = socket.socket()
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind((ip, port))
-    s.listen()
-    print("listening at:", ip, port)
-
     timing_comp = {}
     traffic_counter = 0
     msg_counter = 0
 
     # initialize shared data
-    if formalism == "KET":
-        qm = ParallelQuantumManagerKet({})
-    elif formalism == "DENSITY":
-        qm = ParallelQuantumManagerDensity({})
+    qm = _create_manager(formalism)
+    locations = {}
 
-    sockets = []
-    for _ in range(client_num):
-        c, addr = s.accept()
-        sockets.append(c)
+    sockets = _accept_clients(ip, port, client_num, transport)
+    circuits = {c: {} for c in sockets}  # circuits received in binary format on each connection, by ID
+    buffers = {c: ReceiveBuffer() for c in sockets}  # receive buffer of each connection
+    checked = set()  # connections that sent a CHECK message
 
     while sockets:
         readable, writeable, exceptional = select.select(sockets, [], [], 1)
         for s in readable:
-            msgs = recv_msg_with_length(s)
+            try:
+                msgs, binary = _receive_messages(s, buffers[s], circuits[s])
+            except ConnectionError:
+                # client disconnected without a CLOSE message
+                s.close()
+                sockets.remove(s)
+                continue
 
             traffic_counter += 1
             msg_counter += len(msgs)
 
-            for m_raw in msgs:
-                msg = QuantumManagerMessage(None, [], [])
-                msg.deserialize(m_raw)
-                return_val = None
-
+            for msg in msgs:
                 tick = time()
                 if msg.type == QuantumManagerMsgType.CLOSE:
                     s.close()
                     sockets.remove(s)
                     break
 
-                elif msg.type == QuantumManagerMsgType.GET:
-                    assert len(msg.args) == 0
-                    state = qm.get(msg.keys[0])
-                    return_val = state.serialize()
+                elif msg.type == QuantumManagerMsgType.TERMINATE:
+                    for s in sockets:
+                        s.close()
+                    sockets = []
+                    status, return_val = None, None
+
+                elif msg.type == QuantumManagerMsgType.CHECK:
+                    checked.add(s)
+                    status, return_val = None, None
+
+                else:
+                    status, return_val = _execute_checked(qm, locations, msg, s in checked)
+
+                # send return value
+                if status is not None:
+                    _send_return_value(s, QuantumManagerMsgType.CHECK, status, binary)
+                if return_val is not None:
+                    _send_return_value(s, msg.type, return_val, binary)
+
+                if not msg.type in timing_comp:
+                    timing_comp[msg.type] = 0
+                timing_comp[msg.type] += time() - tick
+
+    _write_log(log_file, msg_counter, traffic_counter, timing_comp, qm)
+
+
+class KeyLocks:
+    """Class of locks on the keys of quantum states, for concurrent requests on disjoint entangled groups.
+
+    A batch of requests locks every key of the states of its keys (the entangled groups) in increasing order of key.
+    Since changing the group of a key requires holding its lock, the group is checked again once locked,
+    and locking is retried if the group changed in the meantime.
+    The lock of a key is kept while threads hold or wait for it, and removed once no thread uses it.
+
+    Attributes:
+        states (Dict[int, State]): states of the quantum manager, by key.
+        locks (Dict[int, Lock]): lock of each key in use.
+        users (Dict[int, int]): number of threads holding or waiting for the lock of each key.
+        mutex (Lock): lock protecting `locks` and `users`.
+    """
+
+    def __init__(self, states: Dict):
+        self.states = states
+        self.locks: Dict[int, Lock] = {}
+        self.users: Dict[int, int] = {}
+        self.mutex = Lock()
 
-                elif msg.type == QuantumManagerMsgType.RUN:
-                    assert len(msg.args) == 2 or len(msg.args) == 3
-                    circuit, keys, meas_samp = msg.args
-                    return_val = qm.run_circuit(circuit, keys, meas_samp)
-                    if len(return_val) == 0:
-                        return_val = None
+    def acquire(self, keys: List[int]) -> List[Tuple[int, Lock]]:
+        """Method to lock the groups of the given keys.
 
-                elif msg.type == QuantumManagerMsgType.SET:
-                    assert len(msg.args) == 1
-                    qm.set(msg.keys, msg.args[0])
+        Args:
+            keys (List[int]): keys used by a request.
+
+        Returns:
+            List[Tuple[int, Lock]]: locked keys and their locks (to be passed to `release`).
+        """
+
+        while True:
+            group = self._group(keys)
+            with self.mutex:
+                held = []
+                for key in group:
+                    if key not in self.locks:
+                        self.locks[key] = Lock()
+                        self.users[key] = 0
+                    self.users[key] += 1
+                    held.append((key, self.locks[key]))
+            for _, lock in held:
+                lock.acquire()
+            if self._group(keys) == group:
+                return held
+            self.release(held)
+
+    def release(self, held: List[Tuple[int, Lock]]) -> None:
+        """Method to unlock keys locked by `acquire`.
 
-                elif msg.type == QuantumManagerMsgType.REMOVE:
-                    assert len(msg.keys) == 1
-                    assert len(msg.args) == 0
-                    key = msg.keys[0]
-                    qm.remove(key)
+        Args:
+            held (List[Tuple[int, Lock]]): keys and locks returned by `acquire`.
+        """
+
+        with self.mutex:
+            for key, lock in held:
+                lock.release()
+                self.users[key] -= 1
+                if self.users[key] == 0:
+                    del self.users[key]
+                    del self.locks[key]
+
+    def _group(self, keys: List[int]) -> List[int]:
+        group = set(keys)
+        for key in keys:
+            state = self.states.get(key)
+            if state is not None:
+                group.update(state.keys)
+        return sorted(group)
+
+
+def _request_keys(msg: QuantumManagerMessage) -> List[int]:
+    # keys of the states used by a request
+    if msg.type == QuantumManagerMsgType.RUN:
+        return msg.keys + msg.args[1]
+    elif msg.type in (QuantumManagerMsgType.GET, QuantumManagerMsgType.SET, QuantumManagerMsgType.REMOVE,
+                      QuantumManagerMsgType.TAKE):
+        return msg.keys
+    return []
+
+
+def _serve_client(s: "socket.socket", qm, locations: Dict[int, int], locks: KeyLocks,
+                  sockets: List["socket.socket"], stats: Dict, stats_lock: Lock) -> None:
+    # process the batches of one client in order, locking the groups used by each batch
+    buffer = ReceiveBuffer()
+    circuits = {}
+    timing_comp = {}
+    traffic_counter = 0
+    msg_counter = 0
+    running = True
+    checked = False
+
+    while running:
+        try:
+            msgs, binary = _receive_messages(s, buffer, circuits)
+        except (ConnectionError, OSError):
+            # client disconnected without a CLOSE message, or server terminated
+            break
+
+        traffic_counter += 1
+        msg_counter += len(msgs)
+
+        # requests of a batch are run together, as by `start_server`
+        held = locks.acquire([key for msg in msgs for key in _request_keys(msg)])
+        try:
+            for msg in msgs:
+                tick = time()
+                if msg.type == QuantumManagerMsgType.CLOSE:
+                    running = False
+                    break
 
                 elif msg.type == QuantumManagerMsgType.TERMINATE:
-                    for s in sockets:
-                        s.close()
-                    sockets = []
+                    for c in sockets:
+                        try:
+                            c.shutdown(socket.SHUT_RDWR)
+                        except OSError:
+                            pass  # already closed by its thread
+                    running = False
+                    status, return_val = None, None
 
                 elif msg.type == QuantumManagerMsgType.SYNC:
-                    return_val = True
+                    status, return_val = None, True
+
+                elif msg.type == QuantumManagerMsgType.CHECK:
+                    checked = True
+                    status, return_val = None, None
 
                 else:
-                    raise Exception(
-                        "Quantum manager session received invalid message type {}".format(
-                            msg.type))
+                    status, return_val = _execute_checked(qm, locations, msg, checked)
 
-                # send return value
+                if status is not None:
+                    _send_return_value(s, QuantumManagerMsgType.CHECK, status, binary)
                 if return_val is not None:
-                    send_msg_with_length(s, return_val)
+                    _send_return_value(s, msg.type, return_val, binary)
 
                 if not msg.type in timing_comp:
                     timing_comp[msg.type] = 0
                 timing_comp[msg.type] += time() - tick
+        finally:
+            locks.release(held)
 
-    # record timing and performance information
-    data = {"msg_counter": msg_counter, "traffic_counter": traffic_counter}
-    for msg_type in timing_comp:
-        data[f"{msg_type.name}_timer"] = timing_comp[msg_type]
+    s.close()
+    with stats_lock:
+        stats["msg_counter"] += msg_counter
+        stats["traffic_counter"] += traffic_counter
+        for msg_type, duration in timing_comp.items():
+            stats["timing_comp"][msg_type] = stats["timing_comp"].get(msg_type, 0) + duration
 
-    with open(log_file, 'w') as fh:
-        dump(data, fh)
+
+def start_threaded_server(ip: str, port: int, client_num, formalism="KET", log_file="server_log.json",
+                          transport=TCP_TRANSPORT):
+    """Function to run a quantum manager server that serves clients concurrently.
+
+    Accepts the same messages and writes the same log as `start_server`.
+    Each client is served by its own thread, which processes the client's batches of requests in order.
+    Batches of different clients on disjoint entangled groups run concurrently;
+    batches sharing a group wait for each other (see `KeyLocks`), so each batch runs as a whole as in `start_server`.
+    Timers in the log add up the time spent by all threads running requests, without time waiting for locks.
+
+    Args:
+        ip (str): ip address server should bind to.
+        port (int): port server should bind to.
+        client_num (int): number of remote clients that should be connected (one per process).
+        formalism (str): formalism to use for quantum manager (default `"KET"` for ket vector).
+        log_file (str): output log file to store server information (default `"server_log.json"`).
+        transport (str): `"tcp"` (default), or `"unix"` for a Unix domain socket when all clients run on the same host.
+    """
+
+    qm = _create_manager(formalism)
+    locations = {}
+    locks = KeyLocks(qm.states)
+    sockets = _accept_clients(ip, port, client_num, transport)
+    stats = {"msg_counter": 0, "traffic_counter": 0, "timing_comp": {}}
+    stats_lock = Lock()
+
+    threads = [Thread(target=_serve_client, args=(s, qm, locations, locks, sockets, stats, stats_lock)) for s in sockets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    _write_log(log_file, stats["msg_counter"], stats["traffic_counter"], stats["timing_comp"], qm)
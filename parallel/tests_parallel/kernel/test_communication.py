@@ -0,0 +1,97 @@
+import os
+import socket
+from threading import Thread
+from time import sleep
+
+import numpy as np
+from pytest import raises, mark
+
+from sequence.kernel.quantum_manager import KET_STATE_FORMALISM
+
+from psequence.communication import ReceiveBuffer, send_bytes_with_length, send_msg_with_length, \
+    recv_bytes_with_length, recv_msg_with_length, listen_for_clients, connect_to_server, unix_socket_path, \
+    LEN_BYTE_LEN, UNIX_TRANSPORT
+from psequence.quantum_manager_server import QuantumManagerMessage, QuantumManagerMsgType, pack_messages, \
+    unpack_messages, start_server
+from psequence.quantum_manager_client import QuantumManagerClient
+
+
+def test_receive_buffer():
+    sender, receiver = socket.socketpair()
+    buffer = ReceiveBuffer(8)
+
+    send_msg_with_length(sender, {"type": "SYNC"})
+    assert recv_msg_with_length(receiver, buffer) == {"type": "SYNC"}
+
+    # the buffer grows to fit large messages and is reused afterwards
+    data = bytes(range(256)) * 64
+    send_bytes_with_length(sender, data)
+    assert bytes(recv_bytes_with_length(receiver, buffer)) == data
+    size = len(buffer.buffer)
+    assert size >= len(data)
+    send_bytes_with_length(sender, b"short")
+    assert bytes(recv_bytes_with_length(receiver, buffer)) == b"short"
+    assert len(buffer.buffer) == size
+
+    # messages split across several sends
+    framed = len(data).to_bytes(LEN_BYTE_LEN, "big") + data
+    sender.sendall(framed[:2])
+    sender.sendall(framed[2:100])
+    sender.sendall(framed[100:])
+    assert bytes(buffer.recv(receiver)) == data
+
+    sender.close()
+    with raises(ConnectionError):
+        buffer.recv(receiver)
+    receiver.close()
+
+
+def test_decoded_messages_own_data():
+    sender, receiver = socket.socketpair()
+    buffer = ReceiveBuffer()
+    amplitudes = np.array([0, 1j])
+
+    send_bytes_with_length(sender, pack_messages([QuantumManagerMessage(QuantumManagerMsgType.SET, [0], [amplitudes])],
+                                                 {}))
+    msg, = unpack_messages(recv_bytes_with_length(receiver, buffer), {})
+    send_bytes_with_length(sender, pack_messages([QuantumManagerMessage(QuantumManagerMsgType.SET, [1], [[1, 0]])], {}))
+    recv_bytes_with_length(receiver, buffer)
+    assert np.array_equal(msg.args[0], amplitudes)
+
+    sender.close()
+    receiver.close()
+
+
+@mark.skipif(not hasattr(socket, "AF_UNIX"), reason="requires Unix domain sockets")
+def test_unix_transport(tmp_path):
+    port = 40000 + os.getpid() % 20000
+    server = listen_for_clients("127.0.0.1", port, UNIX_TRANSPORT)
+    assert os.path.exists(unix_socket_path(port))
+    client = connect_to_server("127.0.0.1", port, UNIX_TRANSPORT)
+    connection, _ = server.accept()
+    send_msg_with_length(client, [1, 2])
+    assert recv_msg_with_length(connection) == [1, 2]
+    for s in [client, connection, server]:
+        s.close()
+    os.remove(unix_socket_path(port))
+
+    # quantum manager server and client
+    log_file = str(tmp_path / "server_log.json")
+    thread = Thread(target=start_server, args=("127.0.0.1", port, 1, "KET", log_file, UNIX_TRANSPORT), daemon=True)
+    thread.start()
+    for _ in range(500):
+        try:
+            qm = QuantumManagerClient(KET_STATE_FORMALISM, "127.0.0.1", port, transport=UNIX_TRANSPORT)
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            sleep(0.01)
+    key = qm.new()
+    qm.set([key], [0, 1])
+    assert np.array_equal(qm.get(key).state, [0, 1])
+    qm.disconnect_from_server()
+    thread.join(10)
+    assert os.path.exists(log_file)
+    assert not os.path.exists(unix_socket_path(port))
+
+    with raises(ValueError):
+        connect_to_server("127.0.0.1", port, "shm")
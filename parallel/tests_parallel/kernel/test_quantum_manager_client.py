@@ -0,0 +1,187 @@
+import json
+import os
+from threading import Thread
+from time import sleep
+
+import numpy as np
+from pytest import mark
+
+from sequence.components.circuit import Circuit
+from sequence.kernel.quantum_manager import KET_STATE_FORMALISM
+
+from psequence.communication import UNIX_TRANSPORT, unix_socket_path
+from psequence.quantum_manager_client import ShardedQuantumManagerClient
+from psequence.quantum_manager_server import start_server, start_threaded_server
+
+
+def _connect(ports):
+    # connections count as clients of the shards, so wait until all shards listen before connecting
+    while not all(os.path.exists(unix_socket_path(port)) for port in ports):
+        sleep(0.01)
+    sleep(0.01)
+    return ShardedQuantumManagerClient(KET_STATE_FORMALISM, "127.0.0.1", ports, transport=UNIX_TRANSPORT)
+
+
+def _start_cluster(tmp_path, offset, server_function=start_server):
+    # two shards with two clients each
+    port = 40000 + (os.getpid() + offset) % 20000
+    ports = [port, port + 1]
+    for shard_port in ports:
+        if os.path.exists(unix_socket_path(shard_port)):
+            os.remove(unix_socket_path(shard_port))
+    log_files = [str(tmp_path / "server_log_{}.json".format(i)) for i in range(2)]
+    servers = [Thread(target=server_function, args=("127.0.0.1", p, 2, "KET", log_file, UNIX_TRANSPORT), daemon=True)
+               for p, log_file in zip(ports, log_files)]
+    for server in servers:
+        server.start()
+    return servers, ports, log_files
+
+
+def _stop_cluster(qms, servers, log_files):
+    for qm in qms:
+        qm.disconnect_from_server()
+    for server in servers:
+        server.join(10)
+    logs = []
+    for log_file in log_files:
+        with open(log_file) as fh:
+            logs.append(json.load(fh))
+    return logs
+
+
+def _pair(qm):
+    # new keys with different home shards, stored on the servers
+    keys = [qm.new(), qm.new()]
+    while keys[0] % 2 == keys[1] % 2:
+        keys[1] = qm.new()
+    for key in keys:
+        qm.move_manage_to_server(key)
+    return keys
+
+
+def _amplitudes(state, keys):
+    # amplitudes of a state, with its keys in the given order
+    amplitudes = np.reshape(state.state, [2] * len(keys))
+    return np.transpose(amplitudes, [state.keys.index(key) for key in keys]).flatten()
+
+
+def test_sharded_client(tmp_path):
+    servers, ports, log_files = _start_cluster(tmp_path, 2)
+    qms = [_connect(ports), _connect(ports)]
+    circuit = Circuit(2)
+    circuit.h(0)
+    circuit.cx(0, 1)
+
+    # the circuit migrates the state of the second qubit to the shard of the first
+    keys = _pair(qms[0])
+    assert [qms[0].shard_of(key) for key in keys] == [keys[0] % 2, keys[1] % 2]
+    qms[0].run_circuit(circuit, keys)
+    target = keys[0] % 2
+    assert qms[0].shard_of(keys[1]) == target
+    other_keys = _pair(qms[0])
+    qms[0].run_circuit(circuit, other_keys[::-1])
+    assert qms[0].shard_of(other_keys[0]) == other_keys[1] % 2
+    stats = qms[0].shard_stats()
+    assert sum(shard["migrations_in"] for shard in stats) == 2
+    assert sum(shard["migrations_out"] for shard in stats) == 2
+    assert sum(shard["keys_held"] for shard in stats) == 4
+    assert sum(shard["states_held"] for shard in stats) == 2
+
+    # the other process finds migrated keys through their home shard, in the same window
+    qms[0].flush_message_buffer()
+    state = qms[1].get(keys[1])
+    assert state.keys == keys
+    assert np.allclose(state.state, [0.5 ** 0.5, 0, 0, 0.5 ** 0.5])
+    assert qms[1].shard_of(keys[1]) == target
+
+    # setting keys stored on different shards moves them to one shard, without stale states
+    # (keys created by the other process, so they are set on the servers)
+    keys = _pair(qms[0])
+    qms[1].set(keys, [0, 0, 0, 1])
+    shard = qms[1].shard_of(keys[0])
+    assert qms[1].shard_of(keys[1]) == shard
+    assert sum(stats["keys_held"] for stats in qms[1].shard_stats()) == 6
+    for qm in qms:
+        qm.flush_before_sync()
+    qms[0].remove(keys[1])
+    assert qms[0].shard_of(keys[1]) < 0
+    qms[0].set([keys[1]], [1, 0])
+    assert qms[0].shard_of(keys[1]) == keys[1] % 2
+    for qm in qms:
+        qm.flush_before_sync()
+    assert qms[1].shard_of(keys[1]) == keys[1] % 2
+    assert np.allclose(qms[1].get(keys[1]).state, [1, 0])
+
+    logs = _stop_cluster(qms, servers, log_files)
+    assert sum(log["keys_held"] for log in logs) == 6  # no stale copies of removed or moved keys
+
+
+def test_sharded_client_moved_keys(tmp_path):
+    servers, ports, log_files = _start_cluster(tmp_path, 4)
+    qms = [_connect(ports), _connect(ports)]
+    bell = Circuit(2)
+    bell.h(0)
+    bell.cx(0, 1)
+    flip = Circuit(1)
+    flip.x(0)
+
+    # the other process migrates a key located in this window: requests on it are sent again where it is
+    keys = _pair(qms[0])
+    qms[0].flush_before_sync()
+    qms[1].get(keys[1])
+    assert qms[1].locations[keys[1]] == keys[1] % 2
+    qms[0].run_circuit(bell, keys)
+    qms[1].run_circuit(flip, [keys[1]])
+    state = qms[1].get(keys[0])
+    assert sorted(state.keys) == sorted(keys)
+    assert np.allclose(_amplitudes(state, keys), [0, 0.5 ** 0.5, 0.5 ** 0.5, 0])
+
+    # migrating keys located before another process migrated them
+    keys = _pair(qms[0])
+    qms[0].flush_before_sync()
+    assert [qms[1].shard_of(key) for key in keys] == [keys[0] % 2, keys[1] % 2]
+    qms[0].run_circuit(bell, keys[::-1])  # moves keys[0] to the shard of keys[1]
+    qms[0].flush_before_sync()
+    qms[1].run_circuit(bell, keys)  # takes the group back to the shard keys[0] was located on
+    assert qms[1].shard_of(keys[1]) == keys[0] % 2
+    assert qms[0].shard_of(keys[0]) == keys[0] % 2
+    assert np.allclose(_amplitudes(qms[1].get(keys[0]), keys), [0.5, 0.5, -0.5, 0.5])
+
+    logs = _stop_cluster(qms, servers, log_files)
+    assert sum(log["keys_held"] for log in logs) == 4
+
+
+@mark.parametrize("server_function", [start_server, start_threaded_server])
+def test_sharded_client_concurrent_migrations(tmp_path, server_function):
+    servers, ports, log_files = _start_cluster(tmp_path, 6 if server_function is start_server else 8,
+                                               server_function)
+    qms = [_connect(ports), _connect(ports)]
+    circuit = Circuit(2)
+    circuit.cx(0, 1)
+    groups = [_pair(qms[0]) for _ in range(20)]
+    for qm in qms:
+        qm.flush_before_sync()
+    for qm in qms:
+        for keys in groups:
+            qm.shard_of(keys[0]), qm.shard_of(keys[1])
+
+    # both processes migrate each group, to the shards of different keys
+    def client_function(qm, reverse):
+        for keys in groups:
+            qm.run_circuit(circuit, keys[::-1] if reverse else keys)
+        qm.flush_before_sync()
+
+    clients = [Thread(target=client_function, args=(qm, reverse)) for qm, reverse in zip(qms, [False, True])]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+
+    for keys in groups:
+        state = qms[0].get(keys[0])
+        assert sorted(state.keys) == sorted(keys)
+        assert np.allclose(np.abs(state.state), [1, 0, 0, 0])
+        assert qms[1].shard_of(keys[0]) == qms[0].shard_of(keys[1])
+    logs = _stop_cluster(qms, servers, log_files)
+    assert sum(log["keys_held"] for log in logs) == 40
+    assert sum(log["states_held"] for log in logs) == 20
@@ -0,0 +1,205 @@
+import json
+import os
+from threading import Thread
+from time import sleep
+
+import numpy as np
+
+from sequence.components.circuit import Circuit
+from sequence.kernel.quantum_manager import KET_STATE_FORMALISM, QuantumManagerKet
+from sequence.kernel.quantum_state import KetState
+
+from psequence.communication import is_binary, UNIX_TRANSPORT
+from psequence.quantum_manager_client import QuantumManagerClient
+from psequence.quantum_manager_server import QuantumManagerMessage, QuantumManagerMsgType, pack_messages, \
+    unpack_messages, pack_return_value, unpack_return_value, KeyLocks, start_threaded_server, _execute_checked, \
+    LOCATION_MOVING
+
+KEYS = [2 ** 127 + 5, 3]
+
+
+def test_binary_messages():
+    circuit = Circuit(2)
+    circuit.h(0)
+    circuit.cx(0, 1)
+    circuit.measure(1)
+    amplitudes = np.array([0.5 ** 0.5, 0, 0, 0.5 ** 0.5 * 1j])
+    msgs = [QuantumManagerMessage(QuantumManagerMsgType.SET, KEYS, [amplitudes]),
+            QuantumManagerMessage(QuantumManagerMsgType.RUN, KEYS, [circuit, KEYS[::-1], 0.25]),
+            QuantumManagerMessage(QuantumManagerMsgType.RUN, KEYS, [circuit, KEYS]),
+            QuantumManagerMessage(QuantumManagerMsgType.GET, KEYS[:1], [])]
+
+    circuit_ids = {}
+    data = pack_messages(msgs, circuit_ids)
+    assert is_binary(data)
+    assert len(circuit_ids) == 1
+
+    circuits = {}
+    received = unpack_messages(data, circuits)
+    assert [msg.type for msg in received] == [msg.type for msg in msgs]
+    assert all(msg.keys == KEYS for msg in received[:3])
+    assert np.array_equal(received[0].args[0], amplitudes)
+    assert received[1].args[1:] == [KEYS[::-1], 0.25]
+    assert received[2].args[2] == -1
+    assert received[1].args[0] is received[2].args[0] is circuits[0]
+    assert received[1].args[0].gates == circuit.gates
+    assert received[1].args[0].measured_qubits == circuit.measured_qubits
+
+    # circuits are only sent once per connection
+    assert len(pack_messages(msgs[1:2], circuit_ids)) < len(data)
+    received = unpack_messages(pack_messages(msgs[1:2], circuit_ids), circuits)
+    assert received[0].args[0] is circuits[0]
+
+
+def test_binary_return_values():
+    state = KetState([0, 1j, 0, 0], KEYS)
+    received = unpack_return_value(QuantumManagerMsgType.GET, pack_return_value(QuantumManagerMsgType.GET, state))
+    assert received.keys == KEYS
+    assert np.array_equal(received.state, state.state)
+
+    results = {KEYS[0]: 1, KEYS[1]: 0}
+    data = pack_return_value(QuantumManagerMsgType.RUN, results)
+    assert unpack_return_value(QuantumManagerMsgType.RUN, data) == results
+    data = pack_return_value(QuantumManagerMsgType.LOCATE, [1, -2])
+    assert unpack_return_value(QuantumManagerMsgType.LOCATE, data) == [1, -2]
+    data = pack_return_value(QuantumManagerMsgType.SYNC, True)
+    assert unpack_return_value(QuantumManagerMsgType.SYNC, data) is True
+    data = pack_return_value(QuantumManagerMsgType.CHECK, False)
+    assert unpack_return_value(QuantumManagerMsgType.CHECK, data) is False
+    received = unpack_return_value(QuantumManagerMsgType.TAKE, pack_return_value(QuantumManagerMsgType.TAKE, state))
+    assert received.keys == KEYS
+
+
+def test_json_messages():
+    circuit = Circuit(1)
+    circuit.x(0)
+    msg = QuantumManagerMessage(QuantumManagerMsgType.RUN, KEYS, [circuit, KEYS[:1]])
+    received = QuantumManagerMessage(None, [], [])
+    received.deserialize(msg.serialize())
+    assert received.type == QuantumManagerMsgType.RUN
+    assert received.keys == KEYS
+    assert received.args[1] == KEYS[:1]
+
+
+def test_key_locks():
+    states = {0: KetState([1, 0], [0]), 1: KetState([1, 0, 0, 0], [1, 2])}
+    states[2] = states[1]
+    locks = KeyLocks(states)
+    held = locks.acquire([2])
+    assert [key for key, _ in held] == [1, 2]
+    assert all(lock.locked() for _, lock in held)
+    other = locks.acquire([0, 4])
+    locks.release(held)
+    assert sorted(locks.locks) == [0, 4]
+    locks.release(other)
+    assert locks.locks == {} and locks.users == {}
+
+    # a thread waiting for a lock keeps it in use, so later threads wait for the same lock
+    held = locks.acquire([5])
+    order = []
+
+    def lock_key(name):
+        key_held = locks.acquire([5])
+        order.append(name)
+        sleep(0.05)
+        order.append(name)
+        locks.release(key_held)
+
+    waiting = [Thread(target=lock_key, args=(name,)) for name in "bc"]
+    waiting[0].start()
+    while locks.users[5] < 2:
+        sleep(0.001)
+    locks.release(held)
+    waiting[1].start()
+    for thread in waiting:
+        thread.join()
+    assert order in (list("bbcc"), list("ccbb"))
+    assert locks.locks == {} and locks.users == {}
+
+
+def _connect(port):
+    for _ in range(500):
+        try:
+            return QuantumManagerClient(KET_STATE_FORMALISM, "127.0.0.1", port, transport=UNIX_TRANSPORT)
+        except (FileNotFoundError, ConnectionRefusedError):
+            sleep(0.01)
+
+
+def test_threaded_server(tmp_path):
+    port = 40000 + (os.getpid() + 1) % 20000
+    log_file = str(tmp_path / "server_log.json")
+    server = Thread(target=start_threaded_server, args=("127.0.0.1", port, 2, "KET", log_file, UNIX_TRANSPORT),
+                    daemon=True)
+    server.start()
+    circuit = Circuit(2)
+    circuit.h(0)
+    circuit.cx(0, 1)
+    circuit.measure(0)
+    circuit.measure(1)
+
+    def client_function(qm, shared, results):
+        for i in range(20):
+            keys = [qm.new(), qm.new()]
+            qm.move_manage_to_server(keys[0])
+            qm.move_manage_to_server(keys[1])
+            res = qm.run_circuit(circuit, keys, 0.25 + 0.5 * (i % 2))
+            results.append(res[keys[0]] == res[keys[1]])
+            qm.run_circuit(circuit, shared, 0.5)
+
+    qms = []
+    for _ in range(2):
+        qms.append(_connect(port))
+    shared = [qms[0].new(), qms[0].new()]
+    for key in shared:
+        qms[0].move_manage_to_server(key)
+    results = [[], []]
+    clients = [Thread(target=client_function, args=(qm, shared, res)) for qm, res in zip(qms, results)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    for qm in qms:
+        qm.disconnect_from_server()
+    server.join(10)
+
+    assert results == [[True] * 20, [True] * 20]
+    with open(log_file) as fh:
+        log = json.load(fh)
+    assert log["msg_counter"] > 80
+    assert "RUN_timer" in log
+
+
+def test_relocate_message():
+    msg = QuantumManagerMessage(QuantumManagerMsgType.RELOCATE, KEYS, [3])
+    received = unpack_messages(pack_messages([msg], {}), {})[0]
+    assert received.type == QuantumManagerMsgType.RELOCATE
+    assert received.keys == KEYS
+    assert received.args == [3]
+    received = QuantumManagerMessage(None, [], [])
+    received.deserialize(msg.serialize())
+    assert received.args == [3]
+
+
+def test_checked_requests():
+    qm = QuantumManagerKet()
+    locations = {}
+    keys = [qm.new(), qm.new()]
+    qm.set(keys, [0, 0, 0, 1])
+
+    # requests on keys not held are not run on checked connections
+    msg = QuantumManagerMessage(QuantumManagerMsgType.GET, [keys[1] + 1], [])
+    assert _execute_checked(qm, locations, msg, True) == (False, None)
+    msg = QuantumManagerMessage(QuantumManagerMsgType.SYNC, [], [])
+    assert _execute_checked(qm, locations, msg, True) == (None, True)
+
+    # TAKE removes the whole group, which is moving until set again
+    msg = QuantumManagerMessage(QuantumManagerMsgType.TAKE, keys[:1], [])
+    ran, state = _execute_checked(qm, locations, msg, True)
+    assert ran
+    assert state.keys == keys
+    assert len(qm.states) == 0
+    assert locations == {key: LOCATION_MOVING for key in keys}
+    assert _execute_checked(qm, locations, msg, True) == (False, None)
+    msg = QuantumManagerMessage(QuantumManagerMsgType.SET, keys, [state.state])
+    assert _execute_checked(qm, locations, msg, True) == (None, None)
+    assert locations == {}
@@ -1,35 +1,25 @@
 import logging
-import multiprocessing
-import papermill as pm
+
+from sequence.experiments import ExperimentRunner, parameter_grid
+
 
 def setup_logging():
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def run_script(iteration):
-    notebook_path = 'example/Multi_Node_Framework_CSV.ipynb'
-    output_path = f'example/outputs/Multi_Node_Framework_WORKING_output_{iteration}.ipynb'
-
-    try:
-        logging.info(f"Starting execution of notebook for iteration {iteration}")
-        pm.execute_notebook(
-            notebook_path,
-            output_path,
-            parameters={'run_cycle': iteration}
-        )
-        logging.info(f"Completed execution of notebook for iteration {iteration}")
-    except Exception as e:
-        logging.error(f"Error executing notebook for iteration {iteration}: {e}")
 
 if __name__ == "__main__":
     setup_logging()
-    processes = []
-
-    for i in range(4):
-        p = multiprocessing.Process(target=run_script, args=(i,))
-        p.start()
-        processes.append(p)
-        logging.info(f"Process for iteration {i} started")
+    grid = parameter_grid({
+        "config": ["example/star_network.json"],
+        "seed": list(range(4)),
+        "stop_time": [2e12],
+        "end_time": [2e12],
+    })
 
-    for p in processes:
-        p.join()
-        logging.info("Process joined")
+    with ExperimentRunner(processes=4) as runner:
+        logging.info(f"Starting {len(grid)} runs")
+        results = runner.run(grid, output="example/outputs/Multi_Node_Framework_results.parquet")
+        for run, error in results.groupby("run")["error"].first().items():
+            if error:
+                logging.error(f"Error in run {run}: {error}")
+        logging.info("Completed all runs")
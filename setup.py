@@ -17,7 +17,6 @@ setup(
         'numpy>=1.22',
         'matplotlib',
         'pandas',
-        'qutip>=4.6.0',
         'dash>=1.20.0',
         'dash-core-components',
         'dash-html-components',
@@ -28,4 +27,7 @@ setup(
         'dash-cytoscape',
         'plotly',
     ],
+    extras_require={
+        'columnar': ['pyarrow<26'],
+    },
 )
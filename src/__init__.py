@@ -1,5 +1,5 @@
 __all__ = ['app', 'components', 'entanglement_management', 'kernel', 'network_management', 'qkd', 'resource_management',
-           'topology', 'utils', 'message', 'protocol', 'gui']
+           'topology', 'utils', 'message', 'protocol', 'gui', 'experiments']
 
 __version__ = '0.2.3_dev_GUI'
 
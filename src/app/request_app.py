@@ -82,9 +82,10 @@ class RequestApp:
         self.reserve_res = result
         if result:
             self.schedule_reservation(reservation)
-            log.logger.info("Successful reservation of resources for request app on node {}".format(
-                self.node.name
-            ))
+            if log.is_enabled("request_app"):
+                log.logger.info("Successful reservation of resources for request app on node {}".format(
+                    self.node.name
+                ))
 
     def add_memo_reserve_map(self, index: int, reservation: "Reservation") -> None:
         self.memo_to_reserve[index] = reservation
@@ -115,9 +116,10 @@ class RequestApp:
                 self.node.resource_manager.update(None, info.memory, "RAW")
             elif info.remote_node == reservation.responder and info.fidelity >= reservation.fidelity:
                 self.memory_counter += 1
-                log.logger.info("Successfully generated entanglement. Counter is at {}.".format(
-                    self.memory_counter
-                ))
+                if log.is_enabled("request_app"):
+                    log.logger.info("Successfully generated entanglement. Counter is at {}.".format(
+                        self.memory_counter
+                    ))
                 self.node.resource_manager.update(None, info.memory, "RAW")
 
     def get_throughput(self) -> float:
@@ -11,7 +11,7 @@ if TYPE_CHECKING:
     from ..kernel.quantum_manager import QuantumManager
     from ..kernel.quantum_state import State
 
-from numpy import outer, add, zeros, array_equal
+from numpy import outer, add, zeros, array_equal, allclose
 
 from .circuit import Circuit
 from .detector import Detector
@@ -19,7 +19,8 @@ from .photon import Photon
 from ..kernel.entity import Entity
 from ..kernel.event import Event
 from ..kernel.process import Process
-from ..kernel.quantum_manager import KET_STATE_FORMALISM, DENSITY_MATRIX_FORMALISM
+from ..kernel.quantum_manager import (KET_STATE_FORMALISM, DENSITY_MATRIX_FORMALISM, STABILIZER_FORMALISM,
+                                      BELL_DIAGONAL_FORMALISM)
 from ..utils.encoding import *
 from ..utils import log
 
@@ -52,13 +53,13 @@ def _set_state_with_fidelity(keys: List[int], desired_state: List[complex], fide
                        BSM._psi_plus, BSM._psi_minus]
     assert desired_state in possible_states
 
-    if qm.formalism == KET_STATE_FORMALISM:
+    if qm.formalism == KET_STATE_FORMALISM or qm.formalism == STABILIZER_FORMALISM:
         probabilities = [(1 - fidelity) / 3] * 4
         probabilities[possible_states.index(desired_state)] = fidelity
         state_ind = rng.choice(4, p=probabilities)
         qm.set(keys, possible_states[state_ind])
 
-    elif qm.formalism == DENSITY_MATRIX_FORMALISM:
+    elif qm.formalism == DENSITY_MATRIX_FORMALISM or qm.formalism == BELL_DIAGONAL_FORMALISM:
         multipliers = [(1 - fidelity) / 3] * 4
         multipliers[possible_states.index(desired_state)] = fidelity
         state = zeros((4, 4))
@@ -71,9 +72,9 @@ def _set_state_with_fidelity(keys: List[int], desired_state: List[complex], fide
 
 
 def _set_pure_state(keys: List[int], ket_state: List[complex], qm: "QuantumManager"):
-    if qm.formalism == KET_STATE_FORMALISM:
+    if qm.formalism == KET_STATE_FORMALISM or qm.formalism == STABILIZER_FORMALISM:
         qm.set(keys, ket_state)
-    elif qm.formalism == DENSITY_MATRIX_FORMALISM:
+    elif qm.formalism == DENSITY_MATRIX_FORMALISM or qm.formalism == BELL_DIAGONAL_FORMALISM:
         state = outer(ket_state, ket_state)
         qm.set(keys, state)
     else:
@@ -88,6 +89,10 @@ def _eq_psi_plus(state: "State", formalism: str):
     elif formalism == DENSITY_MATRIX_FORMALISM:
         d_state = outer(BSM._phi_plus, BSM._psi_plus)
         return array_equal(state.state, d_state)
+    elif formalism == STABILIZER_FORMALISM:
+        return allclose(state.to_ket(), BSM._psi_plus)
+    elif formalism == BELL_DIAGONAL_FORMALISM:
+        return allclose(state.state, outer(BSM._psi_plus, BSM._psi_plus))
     else:
         raise NotImplementedError("formalism of quantum state {} is not "
                                   "implemented in the eq_phi_plus "
@@ -452,7 +457,8 @@ class SingleAtomBSM(BSM):
         """
 
         super().get(photon)
-        log.logger.debug(self.name + " received photon")
+        if log.is_enabled("bsm", log.DEBUG):
+            log.logger.debug(self.name + " received photon")
 
         if len(self.photons) == 2:
             qm = self.timeline.quantum_manager
@@ -464,14 +470,16 @@ class SingleAtomBSM(BSM):
                                            self.get_generator().random())[key]
                             for key in keys]
 
-            log.logger.debug(self.name + " measured photons as {}, {}".format(meas0, meas1))
+            if log.is_enabled("bsm", log.DEBUG):
+                log.logger.debug(self.name + " measured photons as {}, {}".format(meas0, meas1))
 
             if meas0 ^ meas1:
                 detector_num = self.get_generator().choice([0, 1])
                 if len(state0.keys) == 1:
                     # if we're in stage 1: we set state to psi+/psi- to mark the
                     # first triggered detector
-                    log.logger.info(self.name + " passed stage 1")
+                    if log.is_enabled("bsm"):
+                        log.logger.info(self.name + " passed stage 1")
                     if detector_num == 0:
                         _set_pure_state(keys, BSM._psi_minus, qm)
                     else:
@@ -479,7 +487,8 @@ class SingleAtomBSM(BSM):
                 elif len(state0.keys) == 2:
                     # if we're in stage 2: check if the same detector is triggered
                     # twice to assign state to psi+ or psi-
-                    log.logger.info(self.name + " passed stage 2")
+                    if log.is_enabled("bsm"):
+                        log.logger.info(self.name + " passed stage 2")
                     if _eq_psi_plus(state0, qm.formalism) ^ detector_num:
                         _set_state_with_fidelity(keys, BSM._psi_minus,
                                                  p0.encoding_type["raw_fidelity"],
@@ -495,7 +504,8 @@ class SingleAtomBSM(BSM):
 
                 photon = p0 if meas0 else p1
                 if self.get_generator().random() > photon.loss:
-                    log.logger.info("Triggering detector {}".format(detector_num))
+                    if log.is_enabled("bsm"):
+                        log.logger.info("Triggering detector {}".format(detector_num))
                     self.detectors[detector_num].get()
 
             else:
@@ -533,6 +543,7 @@ class AbsorptiveBSM(BSM):
         name (str): label for BSM instance
         timeline (Timeline): timeline for simulation
         detectors (List[Detector]): list of attached photon detection devices (length 2).
+        partner_keys (Dict[int, List[int]]): keys entangled with the received photons, indexed by photon key.
     """
 
     def __init__(self, name, timeline, phase_error=0, detectors=None):
@@ -542,6 +553,7 @@ class AbsorptiveBSM(BSM):
             detectors = [{}, {}]
         super().__init__(name, timeline, phase_error, detectors)
         self.encoding = "absorptive"
+        self.partner_keys: Dict[int, List[int]] = {}
         assert len(self.detectors) == 2
 
     def get(self, photon, **kwargs):
@@ -554,6 +566,10 @@ class AbsorptiveBSM(BSM):
         state = self.timeline.quantum_manager.get(key)
         other_keys = state.keys[:]
         other_keys.remove(key)
+        # record the partners, as setting their state separates them from the photon
+        if self.photons == [photon]:
+            self.partner_keys = {}
+        self.partner_keys[key] = other_keys
         if photon.is_null:
             self.timeline.quantum_manager.set(other_keys, [complex(1), complex(0)])
         else:
@@ -569,14 +585,8 @@ class AbsorptiveBSM(BSM):
             # check if we can set to entangled Psi+ state
             if is_valid:
                 # get other photons to entangle
-                key_0 = self.photons[0].quantum_state
-                key_1 = self.photons[1].quantum_state
-                state_0 = self.timeline.quantum_manager.get(key_0)
-                state_1 = self.timeline.quantum_manager.get(key_1)
-                other_keys_0 = state_0.keys[:]
-                other_keys_1 = state_1.keys[:]
-                other_keys_0.remove(key_0)
-                other_keys_1.remove(key_1)
+                other_keys_0 = self.partner_keys[self.photons[0].quantum_state]
+                other_keys_1 = self.partner_keys[self.photons[1].quantum_state]
                 assert len(other_keys_0) == 1 and len(other_keys_1) == 1
 
                 # set to Psi+ state
@@ -1,47 +1,84 @@
 """Models for simulation of quantum circuit.
 
-This module introduces the QuantumCircuit class. The qutip library is used to calculate the unitary matrix of a circuit.
+This module introduces the QuantumCircuit class.
+Circuits are compiled into a list of small gate matrices, which a quantum manager applies only to the qubits they act on.
 """
 
 from math import e, pi
-from typing import List, Dict, Union, Optional
+from typing import List, Dict, Union, Optional, Tuple
 
 import numpy as np
-from qutip.qip.circuit import QubitCircuit
-from qutip.qip.operations import gate_sequence_product
-from qutip import Qobj
+
+from ..kernel.quantum_utils import apply_gate
 
 GATE_INFO_TYPE = List[Union[str, List[int], float]]
 
 
+def _tidyup(mat: np.ndarray) -> np.ndarray:
+    # remove rounding errors from gate matrices (e.g. the imaginary part of exp(i pi))
+    mat = np.array(mat, dtype=complex)
+    mat.real[abs(mat.real) < 1e-14] = 0
+    mat.imag[abs(mat.imag) < 1e-14] = 0
+    return mat
+
+
+def h_gate():
+    return np.array([[1, 1],
+                     [1, -1]]) / np.sqrt(2)
+
+
 def x_gate():
-    mat = np.array([[0, 1],
-                    [1, 0]])
-    return Qobj(mat, dims=[[2], [2]])
+    return np.array([[0, 1],
+                     [1, 0]])
 
 
 def y_gate():
-    mat = np.array([[0, -1.j],
-                    [1.j, 0]])
-    return Qobj(mat, dims=[[2], [2]])
+    return np.array([[0, -1.j],
+                     [1.j, 0]])
 
 
 def z_gate():
-    mat = np.array([[1, 0],
-                    [0, -1]])
-    return Qobj(mat, dims=[[2], [2]])
+    return np.array([[1, 0],
+                     [0, -1]])
 
 
 def s_gate():
-    mat = np.array([[1.,   0],
-                    [0., 1.j]])
-    return Qobj(mat, dims=[[2], [2]])
+    return np.array([[1.,   0],
+                     [0., 1.j]])
 
 
 def t_gate():
-    mat = np.array([[1.,   0],
-                    [0., e ** (1.j * (pi / 4))]])
-    return Qobj(mat, dims=[[2], [2]])
+    return np.array([[1.,   0],
+                     [0., e ** (1.j * (pi / 4))]])
+
+
+def phase_gate(theta: float):
+    return _tidyup([[1, 0],
+                    [0, np.exp(1.j * theta)]])
+
+
+def cx_gate():
+    return np.array([[1, 0, 0, 0],
+                     [0, 1, 0, 0],
+                     [0, 0, 0, 1],
+                     [0, 0, 1, 0]])
+
+
+def ccx_gate():
+    mat = np.identity(8)
+    mat[6:, 6:] = x_gate()
+    return mat
+
+
+def swap_gate():
+    return np.array([[1, 0, 0, 0],
+                     [0, 0, 1, 0],
+                     [0, 1, 0, 0],
+                     [0, 0, 0, 1]])
+
+
+GATES = {"h": h_gate(), "x": x_gate(), "y": y_gate(), "z": z_gate(), "s": s_gate(), "t": t_gate(),
+         "cx": cx_gate(), "ccx": ccx_gate(), "swap": swap_gate()}
 
 
 def validator(func):
@@ -52,6 +89,7 @@ def validator(func):
                 assert q not in self.measured_qubits, 'qubit has been measured'
         if func.__name__ != 'measure':
             self._cache = None
+            self._compiled = None
         return func(self, *args, **kwargs)
 
     return wrapper
@@ -77,10 +115,41 @@ class Circuit:
         self.gates: List[GATE_INFO_TYPE] = []
         self.measured_qubits: List[int] = []
         self._cache: Optional[np.ndarray] = None
+        self._compiled: Optional[List[Tuple[np.ndarray, List[int]]]] = None
+
+    def compile(self) -> List[Tuple[np.ndarray, List[int]]]:
+        """Method to get the gates of the circuit as matrices.
+
+        Consecutive gates on the same qubits are merged into one matrix.
+        The result is cached until the circuit is modified.
+
+        Returns:
+            List[Tuple[np.ndarray, List[int]]]: (matrix, qubit indices) of each gate, in order of application.
+                The first qubit of a gate is the most significant in its matrix.
+        """
+
+        if self._compiled is None:
+            compiled = []
+            for name, indices, arg in self.gates:
+                if name == 'phase':
+                    mat = phase_gate(arg)
+                elif name in GATES:
+                    mat = GATES[name]
+                else:
+                    raise NotImplementedError
+                if compiled and compiled[-1][1] == indices:
+                    compiled[-1] = (mat @ compiled[-1][0], compiled[-1][1])
+                else:
+                    compiled.append((mat, list(indices)))
+            self._compiled = compiled
+
+        return self._compiled
 
     def get_unitary_matrix(self) -> np.ndarray:
         """Method to get unitary matrix of circuit without measurement.
 
+        Quantum managers do not use this matrix; they apply the gates given by `compile`.
+
         Returns:
             np.ndarray: the matrix for the circuit operations.
         """
@@ -90,37 +159,11 @@ class Circuit:
                 self._cache = np.identity(2 ** self.size)
                 return self._cache
 
-            qc = QubitCircuit(self.size)
-            qc.user_gates = {"X": x_gate,
-                             "Y": y_gate,
-                             "Z": z_gate,
-                             "S": s_gate,
-                             "T": t_gate}
-            for gate in self.gates:
-                name, indices, arg = gate
-                if name == 'h':
-                    qc.add_gate('SNOT', indices[0])
-                elif name == 'x':
-                    qc.add_gate('X', indices[0])
-                elif name == 'y':
-                    qc.add_gate('Y', indices[0])
-                elif name == 'z':
-                    qc.add_gate('Z', indices[0])
-                elif name == 'cx':
-                    qc.add_gate('CNOT', controls=indices[0], targets=indices[1])
-                elif name == 'ccx':
-                    qc.add_gate('TOFFOLI', controls=indices[:2], targets=indices[2])
-                elif name == 'swap':
-                    qc.add_gate('SWAP', indices)
-                elif name == 't':
-                    qc.add_gate('T', indices[0])
-                elif name == 's':
-                    qc.add_gate('S', indices[0])
-                elif name == 'phase':
-                    qc.add_gate('PHASEGATE', indices[0], arg_value=arg)
-                else:
-                    raise NotImplementedError
-            self._cache = gate_sequence_product(qc.propagators()).full()
+            # apply gates to the columns of the identity matrix
+            unitary = np.identity(2 ** self.size, dtype=complex).reshape([2] * self.size + [2 ** self.size])
+            for mat, indices in self.compile():
+                unitary = apply_gate(unitary, mat, indices)
+            self._cache = unitary.reshape(2 ** self.size, 2 ** self.size)
 
         return self._cache
 
@@ -139,6 +182,7 @@ class Circuit:
             self.gates.append([name, indices, arg])
         self.measured_qubits = json_data["measured_qubits"]
         self._cache = None
+        self._compiled = None
 
     @validator
     def h(self, qubit: int):
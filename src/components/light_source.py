@@ -73,7 +73,8 @@ class LightSource(Entity):
             state_list (List[List[complex]]): list of complex coefficient arrays to send as photon-encoded qubits.
         """
 
-        log.logger.info("{} emitting {} photons".format(self.name, len(state_list)))
+        if log.is_enabled("light_source"):
+            log.logger.info("{} emitting {} photons".format(self.name, len(state_list)))
 
         time = self.timeline.now()
         period = int(round(1e12 / self.frequency))
@@ -166,7 +167,8 @@ class SPDCSource(LightSource):
                 For these encoding types only the length of list matters and elements can be arbitrary.
         """
 
-        log.logger.info("SPDC sourcee {} emitting {} photons".format(self.name, len(state_list)))
+        if log.is_enabled("light_source"):
+            log.logger.info("SPDC sourcee {} emitting {} photons".format(self.name, len(state_list)))
 
         time = self.timeline.now()
 
@@ -263,9 +265,10 @@ class SPDCSource(LightSource):
                 time += 1e12 / self.frequency
 
     def send_photons(self, time, photons: List["Photon"]):
-        log.logger.debug("SPDC source {} sending photons to {} at time {}".format(
-            self.name, self._receivers, time
-        ))
+        if log.is_enabled("light_source", log.DEBUG):
+            log.logger.debug("SPDC source {} sending photons to {} at time {}".format(
+                self.name, self._receivers, time
+            ))
 
         assert len(photons) == 2
         for dst, photon in zip(self._receivers, photons):
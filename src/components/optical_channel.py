@@ -46,7 +46,8 @@ class OpticalChannel(Entity):
             polarization_fidelity (float): probability of no polarization error for a transmitted qubit.
             light_speed (float): speed of light within the fiber (in m/ps).
         """
-        log.logger.info("Create channel {}".format(name))
+        if log.is_enabled("optical_channel"):
+            log.logger.info("Create channel {}".format(name))
 
         Entity.__init__(self, name, timeline)
         self.sender = None
@@ -117,10 +118,11 @@ class QuantumChannel(OpticalChannel):
             receiver (str): name of node receiving qubits.
         """
 
-        log.logger.info(
-            "Set {} {} as ends of quantum channel {}".format(sender.name,
-                                                             receiver,
-                                                             self.name))
+        if log.is_enabled("optical_channel"):
+            log.logger.info(
+                "Set {} {} as ends of quantum channel {}".format(sender.name,
+                                                                 receiver,
+                                                                 self.name))
         self.sender = sender
         self.receiver = receiver
         sender.assign_qchannel(self, receiver)
@@ -136,10 +138,11 @@ class QuantumChannel(OpticalChannel):
             Receiver node may receive the qubit (via the `receive_qubit` method).
         """
 
-        log.logger.info(
-            "{} send qubit with state {} to {} by Channel {}".format(
-                self.sender.name, qubit.quantum_state, self.receiver,
-                self.name))
+        if log.is_enabled("optical_channel"):
+            log.logger.info(
+                "{} send qubit with state {} to {} by Channel {}".format(
+                    self.sender.name, qubit.quantum_state, self.receiver,
+                    self.name))
 
         assert self.delay >= 0 and self.loss < 1, \
             "QuantumChannel init() function has not been run for {}".format(self.name)
@@ -264,10 +267,11 @@ class ClassicalChannel(OpticalChannel):
             receiver (str): name of node receiving classical messages.
         """
 
-        log.logger.info(
-            "Set {} {} as ends of classical channel {}".format(sender.name,
-                                                               receiver,
-                                                               self.name))
+        if log.is_enabled("optical_channel"):
+            log.logger.info(
+                "Set {} {} as ends of classical channel {}".format(sender.name,
+                                                                   receiver,
+                                                                   self.name))
         self.sender = sender
         self.receiver = receiver
         sender.assign_cchannel(self, receiver)
@@ -284,11 +288,12 @@ class ClassicalChannel(OpticalChannel):
             Receiver node may receive the qubit (via the `receive_qubit` method).
         """
 
-        log.logger.info(
-            "{} send message {} to {} by Channel {}".format(self.sender.name,
-                                                            message,
-                                                            self.receiver,
-                                                            self.name))
+        if log.is_enabled("optical_channel"):
+            log.logger.info(
+                "{} send message {} to {} by Channel {}".format(self.sender.name,
+                                                                message,
+                                                                self.receiver,
+                                                                self.name))
         assert source == self.sender
 
         future_time = round(self.timeline.now() + int(self.delay))
@@ -230,30 +230,33 @@ class EntanglementGenerationA(EntanglementProtocol):
             return
 
         self.ent_round += 1
-        log.logger.info("%s update_memory round %s", self.own.name, self.ent_round)
+        if log.is_enabled("generation"):
+            log.logger.info("%s update_memory round %s", self.own.name, self.ent_round)
         
         if self.ent_round == 1:
             return True
 
         elif self.ent_round == 2 and self.bsm_res[0] != -1:
-            self.own.timeline.quantum_manager.run_circuit(
+            # corrections are batched with those of other protocols at the same time
+            self.own.timeline.quantum_manager.defer_circuit(
                 EntanglementGenerationA._flip_circuit, [self._qstate_key])
 
         elif self.ent_round == 3 and self.bsm_res[1] != -1:
             # successful entanglement
             # state correction
             if self.primary:
-                self.own.timeline.quantum_manager.run_circuit(
+                self.own.timeline.quantum_manager.defer_circuit(
                     EntanglementGenerationA._flip_circuit, [self._qstate_key])
             elif self.bsm_res[0] != self.bsm_res[1]:
-                self.own.timeline.quantum_manager.run_circuit(
+                self.own.timeline.quantum_manager.defer_circuit(
                     EntanglementGenerationA._z_circuit, [self._qstate_key])
             self._successesA += 1
             self._entanglement_succeed()
 
         else:
             # entanglement failed
-            log.logger.info(self.ent_round)
+            if log.is_enabled("generation"):
+                log.logger.info(self.ent_round)
             self._entanglement_fail()
             self._failsA += 1
             return False
@@ -295,10 +298,11 @@ class EntanglementGenerationA(EntanglementProtocol):
 
         msg_type = msg.msg_type
 
-        log.logger.debug("{} EG protocol received_message of type {} from node"
-                         " {}, round={}".format(self.own.name,
-                                                msg.msg_type,
-                                                src, self.ent_round))
+        if log.is_enabled("generation", log.DEBUG):
+            log.logger.debug("{} EG protocol received_message of type {} from node"
+                             " {}, round={}".format(self.own.name,
+                                                    msg.msg_type,
+                                                    src, self.ent_round))
     
         if msg_type is GenerationMsgType.NEGOTIATE:
             # configure params
@@ -372,9 +376,10 @@ class EntanglementGenerationA(EntanglementProtocol):
             time = msg.time
             resolution = msg.resolution
             
-            log.logger.debug("{} received MEAS_RES {} at time {}, expected {},"
-                             " resolution={}, round={}".format(
-                self.own.name, detector, time, self.expected_time, resolution, self.ent_round))
+            if log.is_enabled("generation", log.DEBUG):
+                log.logger.debug("{} received MEAS_RES {} at time {}, expected {},"
+                                 " resolution={}, round={}".format(
+                    self.own.name, detector, time, self.expected_time, resolution, self.ent_round))
             
             if valid_trigger_time(time, self.expected_time, resolution):
                 # record result if we don't already have one
@@ -401,8 +406,16 @@ class EntanglementGenerationA(EntanglementProtocol):
             if event.time >= self.own.timeline.now():
                 self.own.timeline.remove_event(event)
 
+    def _link_name(self) -> str:
+        return "-".join(sorted([self.own.name, self.remote_node_name]))
+
     def _entanglement_succeed(self):
-        log.logger.info(self.own.name + " successful entanglement of memory {}".format(self.memory))
+        if log.is_enabled("generation"):
+            log.logger.info(self.own.name + " successful entanglement of memory {}".format(self.memory))
+        if self.primary:
+            metrics = self.own.timeline.metrics
+            metrics.inc("eg_attempts", self._link_name())
+            metrics.inc("eg_successes", self._link_name())
         self.memory.entangled_memory["node_id"] = self.remote_node_name
         self.memory.entangled_memory["memo_id"] = self.remote_memo_id
         self.memory.fidelity = self.memory.raw_fidelity
@@ -412,7 +425,10 @@ class EntanglementGenerationA(EntanglementProtocol):
     def _entanglement_fail(self):
         for event in self.scheduled_events:
             self.own.timeline.remove_event(event)
-        log.logger.info(self.own.name + " failed entanglement of memory HHHH {}".format(self.memory))
+        if log.is_enabled("generation"):
+            log.logger.info(self.own.name + " failed entanglement of memory HHHH {}".format(self.memory))
+        if self.primary:
+            self.own.timeline.metrics.inc("eg_attempts", self._link_name())
         
         self.update_resource_manager(self.memory, 'RAW')
         
@@ -17,6 +17,7 @@ from ..message import Message
 from .entanglement_protocol import EntanglementProtocol
 from ..utils import log
 from ..components.circuit import Circuit
+from ..kernel.quantum_manager import BELL_DIAGONAL_FORMALISM
 
 
 class BBPSSWMsgType(Enum):
@@ -134,7 +135,8 @@ class BBPSSW(EntanglementProtocol):
             Will send message to other protocol instance.
         """
 
-        log.logger.info(f"{self.own.name} protocol start with partner {self.remote_node_name}")
+        if log.is_enabled("purification"):
+            log.logger.info(f"{self.own.name} protocol start with partner {self.remote_node_name}")
 
         assert self.is_ready(), "other protocol is not set; please use set_others function to set it."
         kept_memo_ent = self.kept_memo.entangled_memory["node_id"]
@@ -167,14 +169,25 @@ class BBPSSW(EntanglementProtocol):
             Will call `update_resource_manager` method.
         """
 
-        log.logger.info(
-            self.own.name + " received result message, succeeded: {}".format(
-                self.meas_res == msg.meas_res))
+        if log.is_enabled("purification"):
+            log.logger.info(
+                self.own.name + " received result message, succeeded: {}".format(
+                    self.meas_res == msg.meas_res))
         assert src == self.remote_node_name
 
         self.update_resource_manager(self.meas_memo, "RAW")
+        metrics = self.own.timeline.metrics
+        metrics.inc("purification_attempts", self.own.name)
         if self.meas_res == msg.meas_res:
-            self.kept_memo.fidelity = BBPSSW.improved_fidelity(self.kept_memo.fidelity)
+            qm = self.own.timeline.quantum_manager
+            fidelity = None
+            if qm.formalism == BELL_DIAGONAL_FORMALISM:
+                # Bell diagonal states give the fidelity of the purified pair exactly
+                fidelity = qm.get_fidelity(self.kept_memo.qstate_key)
+            if fidelity is None:
+                fidelity = BBPSSW.improved_fidelity(self.kept_memo.fidelity)
+            self.kept_memo.fidelity = fidelity
+            metrics.inc("purification_successes", self.own.name)
             self.update_resource_manager(self.kept_memo, state="ENTANGLED")
         else:
             self.update_resource_manager(self.kept_memo, state="RAW")
@@ -23,6 +23,7 @@ from ..message import Message
 from .entanglement_protocol import EntanglementProtocol
 from ..utils import log
 from ..components.circuit import Circuit
+from ..kernel.quantum_manager import BELL_DIAGONAL_FORMALISM
 
 
 class SwappingMsgType(Enum):
@@ -152,28 +153,43 @@ class EntanglementSwappingA(EntanglementProtocol):
             Will send messages to other protocols.
         """
 
-        log.logger.info(f"{self.own.name} middle protocol start with ends "
-                        f"{self.left_protocol_name}, "
-                        f"{self.right_protocol_name}")
+        if log.is_enabled("swapping"):
+            log.logger.info(f"{self.own.name} middle protocol start with ends "
+                            f"{self.left_protocol_name}, "
+                            f"{self.right_protocol_name}")
 
         assert self.left_memo.fidelity > 0 and self.right_memo.fidelity > 0
         assert self.left_memo.entangled_memory["node_id"] == self.left_node
         assert self.right_memo.entangled_memory["node_id"] == self.right_node
 
+        metrics = self.own.timeline.metrics
+        metrics.inc("swap_attempts", self.own.name)
         if self.own.get_generator().random() < self.success_probability():
-            fidelity = self.updated_fidelity(self.left_memo.fidelity, self.right_memo.fidelity)
             self.is_success = True
-
             expire_time = min(self.left_memo.get_expire_time(), self.right_memo.get_expire_time())
 
+            qm = self.own.timeline.quantum_manager
+            left_key = self.left_memo.qstate_key
+            remote_keys = []
+            if qm.formalism == BELL_DIAGONAL_FORMALISM:
+                # keys entangled with the left memory, before the swap
+                remote_keys = [key for key in qm.get(left_key).keys if key != left_key]
             meas_samp = self.own.get_generator().random()
-            meas_res = self.own.timeline.quantum_manager.run_circuit(
-                self.circuit, [self.left_memo.qstate_key,
-                               self.right_memo.qstate_key], meas_samp)
-            meas_res = [meas_res[self.left_memo.qstate_key], meas_res[self.right_memo.qstate_key]]
-            log.logger.info(f"{self.own.name} middle protocol start with ends "
-                        f"{self.left_protocol_name}, "
-                        f"{self.right_protocol_name}")
+            meas_res = qm.run_circuit(self.circuit, [left_key, self.right_memo.qstate_key], meas_samp)
+            meas_res = [meas_res[left_key], meas_res[self.right_memo.qstate_key]]
+
+            fidelity = None
+            if len(remote_keys) == 1:
+                # Bell diagonal states give the fidelity of the swapped pair exactly
+                fidelity = qm.get_fidelity(remote_keys[0])
+            if fidelity is None:
+                fidelity = self.updated_fidelity(self.left_memo.fidelity, self.right_memo.fidelity)
+            metrics.inc("swap_successes", self.own.name)
+            metrics.observe("swap_fidelity", fidelity, self.own.name)
+            if log.is_enabled("swapping"):
+                log.logger.info(f"{self.own.name} middle protocol start with ends "
+                            f"{self.left_protocol_name}, "
+                            f"{self.right_protocol_name}")
             msg_l = EntanglementSwappingMessage(SwappingMsgType.SWAP_RES,
                                                 self.left_protocol_name,
                                                 fidelity=fidelity,
@@ -333,18 +349,20 @@ class EntanglementSwappingB(EntanglementProtocol):
             Will invoke `update_resource_manager` method.
         """
 
-        log.logger.debug(
-            self.own.name + " protocol received_message from node {}, fidelity={}".format(src, msg.fidelity))
+        if log.is_enabled("swapping", log.DEBUG):
+            log.logger.debug(
+                self.own.name + " protocol received_message from node {}, fidelity={}".format(src, msg.fidelity))
 
         assert src == self.remote_node_name
 
         if msg.fidelity > 0 and self.own.timeline.now() < msg.expire_time:
+            # corrections are batched with those of other protocols at the same time
             if msg.meas_res == [1, 0]:
-                self.own.timeline.quantum_manager.run_circuit(self.z_cir, [self.memory.qstate_key])
+                self.own.timeline.quantum_manager.defer_circuit(self.z_cir, [self.memory.qstate_key])
             elif msg.meas_res == [0, 1]:
-                self.own.timeline.quantum_manager.run_circuit(self.x_cir, [self.memory.qstate_key])
+                self.own.timeline.quantum_manager.defer_circuit(self.x_cir, [self.memory.qstate_key])
             elif msg.meas_res == [1, 1]:
-                self.own.timeline.quantum_manager.run_circuit(self.x_z_cir, [self.memory.qstate_key])
+                self.own.timeline.quantum_manager.defer_circuit(self.x_z_cir, [self.memory.qstate_key])
 
             self.memory.fidelity = msg.fidelity
             self.memory.entangled_memory["node_id"] = msg.remote_node
@@ -355,7 +373,8 @@ class EntanglementSwappingB(EntanglementProtocol):
             self.update_resource_manager(self.memory, "RAW")
 
     def start(self) -> None:
-        log.logger.info(f"{self.own.name} end protocol start with partner {self.remote_node_name}")
+        if log.is_enabled("swapping"):
+            log.logger.info(f"{self.own.name} end protocol start with partner {self.remote_node_name}")
 
     def memory_expire(self, memory: "Memory") -> None:
         """Method to deal with expired memories.
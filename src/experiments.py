@@ -0,0 +1,230 @@
+"""Headless runner for parameter sweeps over network simulations.
+
+This module defines the ExperimentRunner class, which runs one experiment function per point of a parameter grid
+on a pool of worker processes.
+Workers are started once, import the simulator up front, and are reused between runs.
+Results are collected into a table and can be written to a columnar (parquet/feather) or CSV file.
+
+The default experiment, `router_experiment`, builds a RouterNetTopo network from a JSON configuration,
+sets memory, detector, channel and swapping parameters, requests entanglement between two routers,
+and reports the entangled memories at both ends.
+"""
+
+from importlib import import_module
+from itertools import product
+from multiprocessing import Pool
+from time import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+PRELOAD_MODULES = ["sequence.kernel.timeline", "sequence.kernel.quantum_manager", "sequence.topology.router_net_topo"]
+
+ROUTER_EXPERIMENT_DEFAULTS = {
+    "seed": 0,
+    "stop_time": 1e14,
+    "src": 0,
+    "dst": -1,
+    "start_time": 1e12,
+    "end_time": 1e14,
+    "memory_size": 6,
+    "target_fidelity": 0.9,
+    "memo_frequency": 2e3,
+    "memo_expire": 1.3,
+    "memo_efficiency": 0.75,
+    "memo_fidelity": 0.9349367588934053,
+    "detector_efficiency": 0.8,
+    "detector_count_rate": 5e7,
+    "detector_resolution": 100,
+    "qc_attenuation": 0.0002,
+    "qc_frequency": 1e11,
+    "swap_success_rate": 0.64,
+    "swap_degradation": 0.99,
+}
+
+
+def parameter_grid(grid: Dict[str, Iterable[Any]]) -> List[Dict[str, Any]]:
+    """Function to expand a parameter grid into a list of parameter sets.
+
+    Args:
+        grid (Dict[str, Iterable[Any]]): mapping of parameter name to the values to sweep.
+
+    Returns:
+        List[Dict[str, Any]]: one parameter set per point of the cartesian product of the grid.
+    """
+
+    names = list(grid)
+    return [dict(zip(names, values)) for values in product(*(grid[name] for name in names))]
+
+
+def router_experiment(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Function to run an entanglement request over a quantum router network.
+
+    Parameters not given in `params` are taken from `ROUTER_EXPERIMENT_DEFAULTS`.
+    `config` (path to a RouterNetTopo JSON file) is required.
+    `src` and `dst` index the list of quantum routers; node seeds are derived from `seed`.
+
+    Args:
+        params (Dict[str, Any]): parameters of the run.
+
+    Returns:
+        List[Dict[str, Any]]: one row (router, entangle_time, fidelity) per entangled memory of the end routers.
+    """
+
+    from .topology.router_net_topo import RouterNetTopo
+
+    p = dict(ROUTER_EXPERIMENT_DEFAULTS)
+    p.update(params)
+
+    topo = RouterNetTopo(p["config"])
+    tl = topo.get_timeline()
+    tl.stop_time = p["stop_time"]
+    routers = topo.get_nodes_by_type(RouterNetTopo.QUANTUM_ROUTER)
+    bsm_nodes = topo.get_nodes_by_type(RouterNetTopo.BSM_NODE)
+
+    seeds = np.random.SeedSequence(p["seed"]).generate_state(len(routers) + len(bsm_nodes))
+    for node, seed in zip(routers + bsm_nodes, seeds):
+        node.set_seed(int(seed))
+
+    for node in routers:
+        memory_array = node.get_components_by_type("MemoryArray")[0]
+        memory_array.update_memory_params("frequency", p["memo_frequency"])
+        memory_array.update_memory_params("coherence_time", p["memo_expire"])
+        memory_array.update_memory_params("efficiency", p["memo_efficiency"])
+        memory_array.update_memory_params("raw_fidelity", p["memo_fidelity"])
+        node.network_manager.protocol_stack[1].set_swapping_success_rate(p["swap_success_rate"])
+        node.network_manager.protocol_stack[1].set_swapping_degradation(p["swap_degradation"])
+
+    for node in bsm_nodes:
+        bsm = node.get_components_by_type("SingleAtomBSM")[0]
+        bsm.update_detectors_params("efficiency", p["detector_efficiency"])
+        bsm.update_detectors_params("count_rate", p["detector_count_rate"])
+        bsm.update_detectors_params("time_resolution", p["detector_resolution"])
+
+    for qc in topo.get_qchannels():
+        qc.attenuation = p["qc_attenuation"]
+        qc.frequency = p["qc_frequency"]
+
+    src, dst = routers[p["src"]], routers[p["dst"]]
+    tl.init()
+    src.network_manager.request(dst.name, p["start_time"], p["end_time"], p["memory_size"], p["target_fidelity"])
+    tl.run()
+
+    rows = []
+    for router in [src, dst]:
+        for info in router.resource_manager.memory_manager:
+            if info.entangle_time > 0:
+                rows.append({"router": router.name, "entangle_time": info.entangle_time, "fidelity": info.fidelity})
+    return rows
+
+
+def _init_worker(modules: List[str]) -> None:
+    for module in modules:
+        import_module(module)
+
+
+def _run_task(task: Tuple[Callable, int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    experiment, run_id, params = task
+    tick = time()
+    error = ""
+    try:
+        rows = experiment(params)
+    except Exception as e:
+        rows = []
+        error = f"{type(e).__name__}: {e}"
+    runtime = time() - tick
+
+    info = {"run": run_id, "runtime": runtime, "error": error}
+    info.update({name: value for name, value in params.items() if np.isscalar(value)})
+    if not rows:
+        return [info]
+    return [dict(info, **row) for row in rows]
+
+
+class ExperimentRunner:
+    """Class to run experiments over a parameter grid on a pool of persistent worker processes.
+
+    The worker pool is created on the first call to `run` and reused until `close` is called
+    (the runner can also be used as a context manager).
+    Each result row holds the run index, the scalar parameters of the run, its wall time in seconds,
+    an error message (empty on success) and the columns returned by the experiment function.
+
+    Attributes:
+        experiment (Callable[[Dict[str, Any]], List[Dict[str, Any]]]): function run for each parameter set.
+        processes (int): number of worker processes (None for one per CPU).
+        preload (List[str]): modules imported by each worker at startup.
+    """
+
+    def __init__(self, experiment: Callable[[Dict[str, Any]], List[Dict[str, Any]]] = router_experiment,
+                 processes: Optional[int] = None, preload: Optional[List[str]] = None):
+        """Constructor for the experiment runner.
+
+        Args:
+            experiment (Callable): module-level function taking a parameter set and returning a list of result rows
+                (default `router_experiment`).
+            processes (int): number of worker processes (default None, one per CPU).
+            preload (List[str]): modules imported by each worker at startup (default `PRELOAD_MODULES`).
+        """
+
+        self.experiment = experiment
+        self.processes = processes
+        self.preload = PRELOAD_MODULES if preload is None else preload
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def run(self, grid: List[Dict[str, Any]], output: Optional[str] = None) -> pd.DataFrame:
+        """Method to run the experiment for each parameter set.
+
+        Args:
+            grid (List[Dict[str, Any]]): parameter sets (e.g. from `parameter_grid`).
+            output (str): file to write results to; `.parquet` and `.feather` are written as columnar files
+                (requires the `columnar` extra), anything else as CSV (default None, not written).
+
+        Returns:
+            pd.DataFrame: result rows ordered by run index.
+        """
+
+        if self._pool is None:
+            self._pool = Pool(self.processes, _init_worker, (self.preload,))
+
+        tasks = [(self.experiment, i, params) for i, params in enumerate(grid)]
+        rows = []
+        for result in self._pool.imap_unordered(_run_task, tasks):
+            rows.extend(result)
+
+        results = pd.DataFrame(rows)
+        if len(results) > 0:
+            results = results.sort_values("run", kind="stable").reset_index(drop=True)
+        if output is not None:
+            write_results(results, output)
+        return results
+
+    def close(self) -> None:
+        """Method to shut down the worker pool."""
+
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+def write_results(results: pd.DataFrame, output: str) -> None:
+    """Function to write a result table to file, using the file extension to pick the format.
+
+    Args:
+        results (pd.DataFrame): result table.
+        output (str): `.parquet` or `.feather` for columnar output (requires the `columnar` extra), CSV otherwise.
+    """
+
+    if output.endswith(".parquet"):
+        results.to_parquet(output, index=False)
+    elif output.endswith(".feather"):
+        results.to_feather(output)
+    else:
+        results.to_csv(output, index=False)
@@ -1,4 +1,4 @@
-__all__ = ['entity', 'event', 'eventlist', 'process', 'quantum_manager', 'quantum_state', 'quantum_utils', 'timeline']
+__all__ = ['entity', 'event', 'eventlist', 'process', 'profiler', 'quantum_manager', 'quantum_state', 'quantum_utils', 'timeline']
 
 def __dir__():
     return sorted(__all__)
@@ -16,17 +16,21 @@ class Event:
 
     Events are sorted by their time and priority. Events with lower times come before events with higher times.
     Events with the same time are sorted by their priority from low to high.
+    Events with the same time and priority are executed in the order they were scheduled.
 
     Attributes:
         time (int): the execution time of the event.
         process (Process): the process encapsulated in the event.
         priority (int): the priority of the event, lower value denotes a higher priority.
         _is_removed (bool): the flag to denotes if it's a valid event
+        _seq (int): insertion counter of the current event list entry, used to break ties (0 if not in an event list).
     """
 
+    __slots__ = ("time", "priority", "process", "_is_removed", "_seq")
+
     def __init__(self, time: int, process: "Process", priority=inf):
         """Constructor for event class.
-        
+
         Args:
             time (int): the execution time of the event.
             process (Process): the process encapsulated in the event.
@@ -37,6 +41,7 @@ class Event:
         self.priority = priority
         self.process = process
         self._is_removed = False
+        self._seq = 0
 
     def __eq__(self, another):
         return (self.time == another.time) and (self.priority == another.priority)
@@ -45,10 +50,10 @@ class Event:
         return (self.time != another.time) or (self.priority != another.priority)
 
     def __gt__(self, another):
-        return (self.time > another.time) or (self.time == another.time and self.priority > another.priority)
+        return (self.time, self.priority, self._seq) > (another.time, another.priority, another._seq)
 
     def __lt__(self, another):
-        return (self.time < another.time) or (self.time == another.time and self.priority < another.priority)
+        return (self.time, self.priority, self._seq) < (another.time, another.priority, another._seq)
 
     def set_invalid(self):
         self._is_removed = True
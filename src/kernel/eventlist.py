@@ -2,79 +2,482 @@
 
 This module defines the EventList class, used by the timeline to order and execute events.
 EventList is implemented as a min heap ordered by simulation time.
+Calendar queue and ladder queue variants with the same interface and pop order are also provided.
 """
 
-from typing import TYPE_CHECKING, List
+from abc import ABC, abstractmethod
+from bisect import insort
+from heapq import heapify, heappush, heappop, nsmallest
+from math import inf
+from typing import TYPE_CHECKING, Iterator, List, Tuple
 
 if TYPE_CHECKING:
     from .event import Event
 
-from heapq import heappush, heappop
-
 
 class EventList:
     """Class of event list.
 
     This class is implemented as a min-heap. The event with the lowest time and priority is placed at the top of heap.
+    The heap stores plain tuples (time, priority, insertion counter, event), so heap comparisons run natively
+    and events with equal time and priority pop in insertion order.
+
+    Each event records the insertion counter of its current entry (`Event._seq`, 0 if not in the list).
+    Rescheduling an event pushes a new entry in O(log n) time; the outdated entry is skipped once it reaches the top.
+    Removed events are only marked invalid and stay in the heap until popped.
+    Once outdated and invalid entries exceed `compaction_ratio` of the heap, the heap is rebuilt from the valid events
+    (a ratio of 1 disables compaction).
 
     Attributes:
-        data (List[Event]): heap storing events.
+        data (List[Tuple]): heap storing (time, priority, insertion counter, event) entries.
+        compaction_ratio (float): fraction of outdated or invalid entries that triggers a rebuild of the heap.
+        dead_count (int): number of invalid events still stored in the heap.
+        compaction_count (int): number of heap rebuilds performed.
     """
 
-    def __init__(self):
+    def __init__(self, compaction_ratio: float = 0.5):
+        """Constructor for event list.
+
+        Args:
+            compaction_ratio (float): fraction of outdated or invalid entries that triggers a rebuild (default 0.5).
+        """
+
+        assert 0 <= compaction_ratio <= 1
         self.data = []
+        self._seq = 0
+        self._size = 0  # entries that are not outdated by a reschedule
+        self._stale = 0  # entries outdated by a reschedule
+        self.compaction_ratio = compaction_ratio
+        self.dead_count = 0
+        self.compaction_count = 0
 
     def __len__(self):
-        return len(self.data)
+        return self._size
 
     def __iter__(self):
-        for data in self.data:
-            yield data
+        for entry in self._entries():
+            if entry[3]._seq == entry[2]:
+                yield entry[3]
 
-    def push(self, event: "Event") -> "None":
-        heappush(self.data, event)
+    def push(self, event: "Event") -> None:
+        self._seq += 1
+        event._seq = self._seq
+        self._size += 1
+        heappush(self.data, (event.time, event.priority, self._seq, event))
 
     def pop(self) -> "Event":
-        return heappop(self.data)
+        data = self.data
+        while True:
+            entry = heappop(data)
+            event = entry[3]
+            if event._seq == entry[2]:
+                break
+            self._stale -= 1
+        self._size -= 1
+        event._seq = 0
+        if event._is_removed:
+            self.dead_count -= 1
+        return event
 
     def top(self) -> "Event":
-        return self.data[0]
+        data = self.data
+        while data[0][3]._seq != data[0][2]:
+            heappop(data)
+            self._stale -= 1
+        return data[0][3]
 
     def isempty(self) -> bool:
-        return len(self.data) == 0
+        return self._size == 0
 
     def remove(self, event: "Event") -> None:
         """Method to remove events from heap.
 
         The event is set as the invalid state to save the time of removing event from heap.
+        The heap is compacted if the fraction of outdated and invalid entries exceeds `compaction_ratio`.
         """
 
+        if event._is_removed:
+            return
         event.set_invalid()
+        if event._seq > 0:
+            self.dead_count += 1
+            self._check_compaction()
+
+    def live_count(self) -> int:
+        """Method to get the number of valid events in the event list."""
+
+        return self._size - self.dead_count
 
     def update_event_time(self, event: "Event", time: int):
-        """Method to update the timestamp of event and maintain the min-heap structure.
+        """Method to update the timestamp of event and maintain the ordering of the event list.
+
+        A rescheduled event is ordered after events already scheduled with the same time and priority.
         """
+
         if time == event.time:
             return
 
-        def _pop_updated_event(heap: "List", index: int):
-            parent_i = (index - 1) // 2
-            while index > 0 and event < self.data[parent_i]:
-                heap[index], heap[parent_i] = heap[parent_i], heap[index]
-                index = parent_i
-                parent_i = (parent_i - 1) // 2
-
-        for i, e in enumerate(self.data):
-            if id(e) == id(event):
-                if event.time > time:
-                    event.time = time
-                    _pop_updated_event(self.data, i)
-
-                elif event.time < time:
-                    event.time = -1
-                    _pop_updated_event(self.data, i)
-                    self.pop()
-                    event.time = time
-                    self.push(event)
+        event.time = time
+        if event._seq == 0:
+            return
+
+        self._seq += 1
+        event._seq = self._seq
+        self._stale += 1
+        self._add((time, event.priority, self._seq, event))
+        self._check_compaction()
+
+    def compact(self) -> None:
+        """Method to rebuild the event list from valid, up-to-date entries only."""
+
+        entries = []
+        for entry in list(self._entries()):
+            event = entry[3]
+            if event._seq != entry[2]:
+                continue
+            if event._is_removed:
+                event._seq = 0
+            else:
+                entries.append(entry)
+        self._size = len(entries)
+        self._stale = 0
+        self.dead_count = 0
+        self.compaction_count += 1
+        self._rebuild(entries)
+
+    def _check_compaction(self) -> None:
+        if self.dead_count + self._stale > self.compaction_ratio * (self._size + self._stale):
+            self.compact()
+
+    def _add(self, entry: Tuple) -> None:
+        heappush(self.data, entry)
+
+    def _entries(self) -> Iterator[Tuple]:
+        """Method to iterate over all stored entries (including outdated entries), in no particular order."""
+
+        return iter(self.data)
+
+    def _rebuild(self, entries: List[Tuple]) -> None:
+        heapify(entries)
+        self.data = entries
+
+
+class BucketEventList(EventList, ABC):
+    """Base class of bucket-based event lists (abstract).
+
+    Subclasses store the (time, priority, insertion counter, event) entries in time buckets instead of a single heap.
+    Pop order, removal and rescheduling behave as in `EventList`.
+    Entries at infinite time are kept in a separate sorted list, since they cannot be assigned a bucket.
+    """
+
+    def __init__(self, compaction_ratio: float = 0.5):
+        super().__init__(compaction_ratio)
+        self._far = []  # sorted entries at infinite time
+
+    def push(self, event: "Event") -> None:
+        self._seq += 1
+        event._seq = self._seq
+        self._size += 1
+        self._add((event.time, event.priority, self._seq, event))
 
+    def pop(self) -> "Event":
+        while True:
+            entry = self._next_entry(True)
+            event = entry[3]
+            if event._seq == entry[2]:
                 break
+            self._stale -= 1
+        self._size -= 1
+        event._seq = 0
+        if event._is_removed:
+            self.dead_count -= 1
+        return event
+
+    def top(self) -> "Event":
+        while True:
+            entry = self._next_entry(False)
+            if entry[3]._seq == entry[2]:
+                return entry[3]
+            self._next_entry(True)
+            self._stale -= 1
+
+    def _add(self, entry: Tuple) -> None:
+        if entry[0] == inf:
+            insort(self._far, entry)
+        else:
+            self._insert(entry)
+
+    def _next_entry(self, remove: bool) -> Tuple:
+        if self._count() > 0:
+            return self._extract(remove)
+        if remove:
+            return self._far.pop(0)
+        return self._far[0]
+
+    def _entries(self) -> Iterator[Tuple]:
+        yield from self._far
+        yield from self._bucket_entries()
+
+    def _rebuild(self, entries: List[Tuple]) -> None:
+        self._far = sorted(entry for entry in entries if entry[0] == inf)
+        self._rebuild_buckets([entry for entry in entries if entry[0] != inf])
+
+    @abstractmethod
+    def _count(self) -> int:
+        """Method to get the number of finite-time entries (including outdated entries) (abstract)."""
+
+        pass
+
+    @abstractmethod
+    def _bucket_entries(self) -> Iterator[Tuple]:
+        """Method to iterate over all finite-time entries, in no particular order (abstract)."""
+
+        pass
+
+    @abstractmethod
+    def _insert(self, entry: Tuple) -> None:
+        """Method to store a finite-time entry (abstract)."""
+
+        pass
+
+    @abstractmethod
+    def _extract(self, remove: bool) -> Tuple:
+        """Method to get (and optionally remove) the smallest finite-time entry (abstract)."""
+
+        pass
+
+    @abstractmethod
+    def _rebuild_buckets(self, entries: List[Tuple]) -> None:
+        """Method to replace all finite-time entries (abstract)."""
+
+        pass
+
+
+class CalendarEventList(BucketEventList):
+    """Class of event list implemented as a calendar queue.
+
+    Events are hashed into `len(buckets)` sorted buckets by `time // width`, like days of a year in a calendar.
+    Dequeuing scans the buckets from the current day, so enqueue and dequeue take O(1) time on average
+    when the bucket width matches the typical separation of event times.
+    The calendar is resized (and the width re-estimated) when the number of entries grows or shrinks by a factor of two.
+
+    Attributes:
+        buckets (List[List[Tuple]]): sorted buckets of entries.
+        width (float): time width of a bucket.
+    """
+
+    MIN_BUCKETS = 2
+    SAMPLE_SIZE = 25
+
+    def __init__(self, compaction_ratio: float = 0.5, width: float = 1):
+        """Constructor for calendar event list.
+
+        Args:
+            compaction_ratio (float): fraction of outdated entries that triggers a rebuild (default 0.5).
+            width (float): initial bucket width (default 1).
+        """
+
+        super().__init__(compaction_ratio)
+        self.buckets = [[] for _ in range(self.MIN_BUCKETS)]
+        self.width = width
+        self._n = 0
+        self._set_position(0)
+
+    def _count(self) -> int:
+        return self._n
+
+    def _bucket_entries(self) -> Iterator[Tuple]:
+        for bucket in self.buckets:
+            yield from bucket
+
+    def _set_position(self, time: float) -> None:
+        self._last_time = time
+        self._day = int(time // self.width)
+
+    def _insert(self, entry: Tuple) -> None:
+        time = entry[0]
+        insort(self.buckets[int(time // self.width) % len(self.buckets)], entry)
+        self._n += 1
+        if time < self._last_time:
+            self._set_position(time)
+        if self._n > 2 * len(self.buckets):
+            self._resize(2 * len(self.buckets))
+
+    def _extract(self, remove: bool) -> Tuple:
+        buckets = self.buckets
+        n_buckets = len(buckets)
+        width = self.width
+        day = self._day
+        for _ in range(n_buckets):
+            bucket = buckets[day % n_buckets]
+            if bucket and int(bucket[0][0] // width) <= day:
+                break
+            day += 1
+        else:
+            # no entry in the current year: jump directly to the smallest entry
+            entry = min(bucket[0] for bucket in buckets if bucket)
+            self._set_position(entry[0])
+            day = self._day
+
+        self._day = day
+        bucket = buckets[day % n_buckets]
+        self._last_time = bucket[0][0]
+        if not remove:
+            return bucket[0]
+
+        entry = bucket.pop(0)
+        self._n -= 1
+        if self._n < n_buckets // 2 and n_buckets > self.MIN_BUCKETS:
+            self._resize(n_buckets // 2)
+        return entry
+
+    def _resize(self, n_buckets: int) -> None:
+        entries = list(self._bucket_entries())
+        self.width = self._estimate_width(entries)
+        self.buckets = [[] for _ in range(n_buckets)]
+        for entry in entries:
+            self.buckets[int(entry[0] // self.width) % n_buckets].append(entry)
+        for bucket in self.buckets:
+            bucket.sort()
+        self._set_position(self._last_time)
+
+    def _estimate_width(self, entries: List[Tuple]) -> float:
+        """Method to estimate bucket width from the separation of the earliest entries (Brown, 1988)."""
+
+        times = sorted(set(entry[0] for entry in nsmallest(self.SAMPLE_SIZE, entries)))
+        if len(times) < 2:
+            return self.width
+        gaps = [t2 - t1 for t1, t2 in zip(times, times[1:])]
+        mean_gap = sum(gaps) / len(gaps)
+        small_gaps = [gap for gap in gaps if gap <= 2 * mean_gap]
+        return 3 * sum(small_gaps) / len(small_gaps)
+
+    def _rebuild_buckets(self, entries: List[Tuple]) -> None:
+        self._n = len(entries)
+        n_buckets = self.MIN_BUCKETS
+        while n_buckets < self._n // 2:
+            n_buckets *= 2
+        self.buckets = [entries]
+        self._resize(n_buckets)
+
+
+class LadderEventList(BucketEventList):
+    """Class of event list implemented as a ladder queue (Tang, Goh and Thng, 2005).
+
+    New events far in the future are appended to the unsorted `top_entries` list.
+    When the sorted `bottom_entries` list runs empty, `top_entries` is spread into a rung of buckets;
+    buckets holding more than `THRESHOLD` entries are spread into a finer rung, otherwise they are sorted into `bottom_entries`.
+    This gives O(1) amortized enqueue and dequeue without tuning a bucket width.
+
+    Attributes:
+        top_entries (List[Tuple]): unsorted entries later than all entries in rungs and bottom.
+        rungs (List[List]): rungs of buckets, each stored as [start, width, buckets, current bucket].
+        bottom_entries (List[Tuple]): sorted entries earlier than all entries in rungs.
+    """
+
+    THRESHOLD = 50
+    MAX_RUNGS = 8
+
+    def __init__(self, compaction_ratio: float = 0.5):
+        super().__init__(compaction_ratio)
+        self._reset([])
+
+    def _reset(self, top: List[Tuple]) -> None:
+        self.top_entries = top
+        self._top_min = min(top)[0] if top else inf
+        self._top_max = max(top)[0] if top else -inf
+        self._top_start = -inf  # entries with time above this are added to top
+        self.rungs = []
+        self.bottom_entries = []
+        self._n = len(top)
+
+    def _count(self) -> int:
+        return self._n
+
+    def _bucket_entries(self) -> Iterator[Tuple]:
+        yield from self.top_entries
+        for rung in self.rungs:
+            for bucket in rung[2]:
+                yield from bucket
+        yield from self.bottom_entries
+
+    def _insert(self, entry: Tuple) -> None:
+        time = entry[0]
+        self._n += 1
+        if time > self._top_start:
+            self.top_entries.append(entry)
+            if time < self._top_min:
+                self._top_min = time
+            if time > self._top_max:
+                self._top_max = time
+            return
+
+        for start, width, buckets, current in self.rungs:
+            i = min(max(int((time - start) // width), 0), len(buckets) - 1)
+            if i >= current:
+                buckets[i].append(entry)
+                return
+
+        insort(self.bottom_entries, entry)
+
+    def _extract(self, remove: bool) -> Tuple:
+        if not self.bottom_entries:
+            self._fill_bottom()
+        if remove:
+            self._n -= 1
+            return self.bottom_entries.pop(0)
+        return self.bottom_entries[0]
+
+    def _fill_bottom(self) -> None:
+        while not self.bottom_entries:
+            if not self.rungs:
+                self._spawn_rung(self.top_entries, self._top_min, self._top_max)
+                self._top_start = self._top_max
+                self.top_entries = []
+                self._top_min = inf
+                self._top_max = -inf
+                continue
+
+            rung = self.rungs[-1]
+            start, width, buckets, current = rung
+            while current < len(buckets) and not buckets[current]:
+                current += 1
+            if current == len(buckets):
+                self.rungs.pop()
+                continue
+
+            bucket = buckets[current]
+            buckets[current] = []
+            rung[3] = current + 1
+            if len(bucket) > self.THRESHOLD and len(self.rungs) < self.MAX_RUNGS:
+                bucket_start = start + current * width
+                times = [entry[0] for entry in bucket]
+                if min(times) != max(times):
+                    self._spawn_rung(bucket, bucket_start, bucket_start + width)
+                    continue
+            bucket.sort()
+            self.bottom_entries = bucket
+
+    def _spawn_rung(self, entries: List[Tuple], start: float, end: float) -> None:
+        if start == end:
+            entries.sort()
+            self.bottom_entries = entries
+            return
+
+        width = (end - start) / len(entries)
+        buckets = [[] for _ in range(len(entries) + 1)]
+        last = len(buckets) - 1
+        for entry in entries:
+            buckets[min(max(int((entry[0] - start) // width), 0), last)].append(entry)
+        self.rungs.append([start, width, buckets, 0])
+
+    def _rebuild_buckets(self, entries: List[Tuple]) -> None:
+        self._reset(entries)
+
+
+HEAP_EVENT_QUEUE = "heap"
+CALENDAR_EVENT_QUEUE = "calendar"
+LADDER_EVENT_QUEUE = "ladder"
+EVENT_QUEUES = {HEAP_EVENT_QUEUE: EventList,
+                CALENDAR_EVENT_QUEUE: CalendarEventList,
+                LADDER_EVENT_QUEUE: LadderEventList}
@@ -9,18 +9,36 @@ class Process:
     """Class of process.
 
     The process claims the object of process, the function of object, and the arguments for the function.
+    The function is bound to the owner once, when the process is created;
+    if the owner is given by name, it is bound when the process is scheduled on the timeline of the owner.
 
     Attributes:
-        owner (Any): the object of process.
+        owner (Any): the object of process (or its name, before the process is bound).
         activation_method (str): the function of object.
         act_params (List[Any]): the arguments of object.
+        _func (Callable): the bound function of object (None if owner is given by name and not bound yet).
     """
 
+    __slots__ = ("owner", "activation", "act_params", "act_kwargs", "_func")
+
     def __init__(self, owner: Any, activation_method: str, act_params: List[Any], act_kwargs={}):
         self.owner = owner
         self.activation = activation_method
         self.act_params = act_params
         self.act_kwargs = act_kwargs
+        self._func = None if type(owner) is str else getattr(owner, activation_method)
+
+    def bind(self, owner: Any) -> None:
+        """Method to bind the process to its owner object.
+
+        Used by the timeline to resolve processes created with the name of their owner.
+
+        Args:
+            owner (Any): the object of process.
+        """
+
+        self.owner = owner
+        self._func = getattr(owner, self.activation)
 
     def run(self) -> None:
         """Method to execute process.
@@ -28,4 +46,4 @@ class Process:
         Will run the `activation_method` method of `owner` with `act_params` passed as args.
         """
 
-        return getattr(self.owner, self.activation)(*self.act_params, **self.act_kwargs)
+        return self._func(*self.act_params, **self.act_kwargs)
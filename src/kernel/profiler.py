@@ -0,0 +1,99 @@
+"""Definition of the EventProfiler class.
+
+This module defines the EventProfiler class, which records the wall time spent executing events.
+Events are grouped by the class of their owner and their activation method (e.g. `Memory.expire`).
+A profiler is attached to a timeline with `Timeline.enable_profiling`.
+
+Attributes:
+    NUM_BUCKETS (int): number of latency histogram buckets; bucket i holds latencies in [2^(i-1), 2^i) ns.
+"""
+
+import json
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from .process import Process
+
+NUM_BUCKETS = 64
+
+
+class EventProfiler:
+    """Class to collect execution time statistics per event type.
+
+    Attributes:
+        counts (Dict[Tuple[str, str], int]): number of executed events, indexed by (owner class, activation method).
+        total_ns (Dict[Tuple[str, str], int]): total wall time (ns) of executed events.
+        histograms (Dict[Tuple[str, str], List[int]]): latency histograms with power of 2 bucket bounds (ns).
+    """
+
+    def __init__(self):
+        self.counts: Dict[Tuple[str, str], int] = {}
+        self.total_ns: Dict[Tuple[str, str], int] = {}
+        self.histograms: Dict[Tuple[str, str], List[int]] = {}
+
+    @staticmethod
+    def event_type(process: "Process") -> Tuple[str, str]:
+        """Method to get the (owner class, activation method) pair of a process."""
+
+        owner = getattr(process._func, "__self__", process.owner)
+        return type(owner).__name__, process.activation
+
+    def record(self, process: "Process", elapsed_ns: int) -> None:
+        """Method to record the execution of an event.
+
+        Args:
+            process (Process): process of the executed event.
+            elapsed_ns (int): wall time of the execution (ns).
+        """
+
+        key = self.event_type(process)
+        if key not in self.counts:
+            self.counts[key] = 0
+            self.total_ns[key] = 0
+            self.histograms[key] = [0] * NUM_BUCKETS
+        self.counts[key] += 1
+        self.total_ns[key] += elapsed_ns
+        self.histograms[key][min(elapsed_ns.bit_length(), NUM_BUCKETS - 1)] += 1
+
+    def reset(self) -> None:
+        """Method to clear all statistics."""
+
+        self.__init__()
+
+    def summary(self) -> List[Dict]:
+        """Method to summarize the statistics, sorted by decreasing total time.
+
+        Returns:
+            List[Dict]: one entry per event type with the owner class, activation method, count, total and mean time (s),
+                fraction of the total profiled time, and the latency histogram as a mapping of bucket upper bound (ns)
+                to count (empty buckets omitted).
+        """
+
+        total = sum(self.total_ns.values()) or 1
+        rows = []
+        for key in sorted(self.counts, key=lambda k: self.total_ns[k], reverse=True):
+            count = self.counts[key]
+            rows.append({"owner": key[0],
+                         "activation": key[1],
+                         "count": count,
+                         "total_time": self.total_ns[key] / 1e9,
+                         "mean_time": self.total_ns[key] / count / 1e9,
+                         "fraction": self.total_ns[key] / total,
+                         "histogram": {2 ** i: c for i, c in enumerate(self.histograms[key]) if c > 0}})
+        return rows
+
+    def table(self) -> str:
+        """Method to format the summary as a text table."""
+
+        lines = ["{:<45} {:>10} {:>12} {:>12} {:>7}".format("event", "count", "total (s)", "mean (us)", "%")]
+        for row in self.summary():
+            lines.append("{:<45} {:>10} {:>12.4f} {:>12.2f} {:>7.2f}".format(
+                row["owner"] + "." + row["activation"], row["count"], row["total_time"], row["mean_time"] * 1e6,
+                row["fraction"] * 100))
+        return "\n".join(lines)
+
+    def to_json(self, filename: str) -> None:
+        """Method to write the summary to a JSON file."""
+
+        with open(filename, "w") as fh:
+            json.dump(self.summary(), fh, indent=2)
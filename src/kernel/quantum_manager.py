@@ -1,32 +1,40 @@
 """This module defines the quantum manager class, to track quantum states.
 
-The states may currently be defined in two possible ways:
+The states may currently be defined in three possible ways:
     - KetState (with the QuantumManagerKet class)
     - DensityMatrix (with the QuantumManagerDensity class)
+    - StabilizerState (with the QuantumManagerStabilizer class, for Clifford circuits only)
+    - BellDiagonalState (with the QuantumManagerBellDiagonal class, for entangled pairs of repeater protocols)
 
 The manager defines an API for interacting with quantum states.
+Ket vector and density matrix managers may keep states as objects in a dictionary (the default),
+or keep states of one and two subsystems in preallocated arrays (with the StateArena class).
+They also apply a circuit to many independent groups of keys at once (see `run_circuit_batch` and `defer_circuit`).
 """
 
 from __future__ import annotations
 from abc import abstractmethod
-from typing import List, Dict, TYPE_CHECKING
+from typing import Callable, List, Dict, Optional, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from ..components.circuit import Circuit
     from .quantum_state import State
 
-from qutip.qip.circuit import QubitCircuit, Gate
-from qutip.qip.operations import gate_sequence_product
-from numpy import log, array, cumsum, base_repr, zeros
+from numpy import log, array, cumsum, base_repr, zeros, arange
 from scipy.sparse import csr_matrix
-from scipy.special import binom
 
-from .quantum_state import KetState, DensityState
+from .quantum_state import KetState, DensityState, StabilizerState, BellDiagonalState, PurificationState
+from .state_arena import StateArena
 from .quantum_utils import *
 
 KET_STATE_FORMALISM = "ket_vector"
 DENSITY_MATRIX_FORMALISM = "density_matrix"
 FOCK_DENSITY_MATRIX_FORMALISM = "fock_density"
+STABILIZER_FORMALISM = "stabilizer"
+BELL_DIAGONAL_FORMALISM = "bell_diagonal"
+
+DICT_STATE_STORAGE = "dict"
+ARENA_STATE_STORAGE = "arena"
 
 
 class QuantumManager:
@@ -35,18 +43,24 @@ class QuantumManager:
     All states stored are of a single formalism (by default as a ket vector).
 
     Attributes:
-        states (Dict[int, State]): mapping of state keys to quantum state objects.
+        states (Dict[int, State]): mapping of state keys to quantum state objects (may be a `StateArena`).
         truncation (int): maximally allowed number of excited states for elementary subsystems.
                 Default is 1 for qubit.
         dim (int): subsystem Hilbert space dimension. dim = truncation + 1
+        max_group_size (int): largest number of subsystems that have shared a state object.
+        deferred (List[Tuple[Circuit, List[int], float, Callable]]): circuits waiting to be run (see `defer_circuit`).
     """
 
+    _batch_kernels = None  # (gate, measurement) functions for stacked states, None to run batches sequentially
+
     def __init__(self, formalism: str, truncation: int = 1):
         self.states: Dict[int, State] = {}
         self._least_available: int = 0
         self.formalism: str = formalism
         self.truncation = truncation
         self.dim = self.truncation + 1
+        self.max_group_size: int = 0
+        self.deferred: List[Tuple[Circuit, List[int], float, Callable]] = []
 
     @abstractmethod
     def new(self, state: any) -> int:
@@ -69,6 +83,8 @@ class QuantumManager:
         Returns:
             State: quantum state at supplied key.
         """
+        if self.deferred:
+            self.flush()
         return self.states[key]
 
     @abstractmethod
@@ -84,10 +100,138 @@ class QuantumManager:
             Dict[int, int]: dictionary mapping qstate keys to measurement results.
         """
 
+        if self.deferred:
+            self.flush()
         assert len(keys) == circuit.size, "mismatch between circuit size and supplied qubits"
         if len(circuit.measured_qubits) > 0:
             assert meas_samp, "must specify random sample when measuring qubits"
 
+    def run_circuit_batch(self, circuit: Circuit, keys_list: List[List[int]],
+                          meas_samps: List[float] = None) -> List[Dict[int, int]]:
+        """Method to run a circuit on many groups of keys.
+
+        The result is the same as calling `run_circuit` for each group of keys in order.
+        If the groups do not share states, the ket vector and density matrix managers stack the states
+        of each size into one array and apply the gates and measurement once to the whole stack.
+
+        Args:
+            circuit (Circuit): quantum circuit to apply.
+            keys_list (List[List[int]]): keys to apply the circuit to, for each run.
+            meas_samps (List[float]): random sample used for measurement, for each run
+                (may be None if the circuit does not measure qubits).
+
+        Returns:
+            List[Dict[int, int]]: measurement results of each run.
+        """
+
+        if meas_samps is None:
+            meas_samps = [None] * len(keys_list)
+        assert len(meas_samps) == len(keys_list), "mismatch between number of key groups and samples"
+
+        if self.deferred:
+            self.flush()
+        if self._batch_kernels is None or len(keys_list) < 2 or not self._independent(keys_list):
+            return [self.run_circuit(circuit, keys, meas_samp) for keys, meas_samp in zip(keys_list, meas_samps)]
+
+        if len(circuit.measured_qubits) > 0:
+            assert all(meas_samps), "must specify random sample when measuring qubits"
+
+        # group runs by the number of qubits of their (compound) states
+        sizes: Dict[int, List[int]] = {}
+        prepared = []
+        for i, keys in enumerate(keys_list):
+            assert len(keys) == circuit.size, "mismatch between circuit size and supplied qubits"
+            new_state, all_keys = self._prepare_circuit(circuit, keys)
+            prepared.append((new_state, all_keys))
+            sizes.setdefault(len(all_keys), []).append(i)
+
+        apply_gates, measure = self._batch_kernels
+        gates = circuit.compile()
+        results: List[Dict[int, int]] = [{} for _ in keys_list]
+        for runs in sizes.values():
+            new_states = apply_gates(array([prepared[i][0] for i in runs]), gates)
+            if len(circuit.measured_qubits) == 0:
+                for i, new_state in zip(runs, new_states):
+                    self._store(new_state, prepared[i][1])
+                continue
+
+            outcomes, remaining = measure(new_states, circuit.measured_qubits, [meas_samps[i] for i in runs])
+            for i, outcome, new_state in zip(runs, outcomes.tolist(), remaining):
+                all_keys = prepared[i][1]
+                keys = [all_keys[j] for j in circuit.measured_qubits]
+                result_digits = [int(x) for x in base_repr(outcome).zfill(len(keys))]
+                for res, key in zip(result_digits, keys):
+                    self._store(self._basis_states[res], [key])
+                rest = [key for key in all_keys if key not in keys]
+                if rest:
+                    self._set_factorized(new_state, rest)
+                results[i] = dict(zip(keys, result_digits))
+
+        return results
+
+    def _independent(self, keys_list: List[List[int]]) -> bool:
+        # check that no state is used by two groups of keys
+        seen = set()
+        for keys in keys_list:
+            ids = {id(self.states[key]) for key in keys}
+            if not seen.isdisjoint(ids):
+                return False
+            seen |= ids
+        return True
+
+    def defer_circuit(self, circuit: Circuit, keys: List[int], meas_samp=None,
+                      callback: Callable[[Dict[int, int]], None] = None) -> None:
+        """Method to run a circuit later, together with other deferred circuits.
+
+        Deferred circuits are run by `flush`, with one `run_circuit_batch` call per circuit.
+        The timeline flushes deferred circuits before advancing simulation time,
+        so protocols handling events at the same time (e.g. corrections on many memories) share one batch.
+        Methods of the manager that access states also flush deferred circuits first.
+        Managers without batched kernels run the circuit immediately.
+
+        Args:
+            circuit (Circuit): quantum circuit to apply.
+            keys (List[int]): list of keys for quantum states to apply circuit to.
+            meas_samp (float): random sample used for measurement.
+            callback (Callable[[Dict[int, int]], None]): function called with the measurement results (optional).
+        """
+
+        if self._batch_kernels is None:
+            result = self.run_circuit(circuit, keys, meas_samp)
+            if callback is not None:
+                callback(result)
+        else:
+            self.deferred.append((circuit, keys, meas_samp, callback))
+
+    def flush(self) -> None:
+        """Method to run all deferred circuits (see `defer_circuit`).
+
+        Runs are grouped by circuit if they do not share states; otherwise, they are run one by one in order.
+        Callbacks are called after all circuits have been run, in the order the circuits were deferred.
+        """
+
+        deferred = self.deferred
+        self.deferred = []
+        if not deferred:
+            return
+
+        if self._independent([keys for _, keys, _, _ in deferred]):
+            circuits: Dict[int, List[int]] = {}
+            for i, (circuit, _, _, _) in enumerate(deferred):
+                circuits.setdefault(id(circuit), []).append(i)
+            results = [None] * len(deferred)
+            for runs in circuits.values():
+                circuit = deferred[runs[0]][0]
+                batch = self.run_circuit_batch(circuit, [deferred[i][1] for i in runs], [deferred[i][2] for i in runs])
+                for i, result in zip(runs, batch):
+                    results[i] = result
+        else:
+            results = [self.run_circuit(circuit, keys, meas_samp) for circuit, keys, meas_samp, _ in deferred]
+
+        for (_, _, _, callback), result in zip(deferred, results):
+            if callback is not None:
+                callback(result)
+
     def _prepare_circuit(self, circuit: Circuit, keys: List[int]):
         old_states = []
         all_keys = []
@@ -100,34 +244,36 @@ class QuantumManager:
                 all_keys += qstate.keys
 
         # construct compound state; order qubits
-        new_state = [1]
-        for state in old_states:
+        new_state = old_states[0]
+        for state in old_states[1:]:
             new_state = kron(new_state, state)
 
-        # get circuit matrix; expand if necessary
-        circ_mat = circuit.get_unitary_matrix()
-        if circuit.size < len(all_keys):
-            # pad size of circuit matrix if necessary
-            diff = len(all_keys) - circuit.size
-            circ_mat = kron(circ_mat, identity(2 ** diff))
-
-        # apply any necessary swaps
+        # move circuit qubits to the front (gates are then applied to the first qubits)
         if not all([all_keys.index(key) == i for i, key in enumerate(keys)]):
-            all_keys, swap_mat = self._swap_qubits(all_keys, keys)
-            circ_mat = circ_mat @ swap_mat
+            all_keys, order = self._swap_qubits(all_keys, keys)
+            if new_state.ndim == 1:
+                new_state = permute_ket(new_state, order)
+            else:
+                new_state = permute_density(new_state, order)
+
+        return new_state, all_keys
+
+    @staticmethod
+    def _swap_qubits(all_keys: List[int], keys: List[int], start: int = 0):
+        """Method to get the subsystem order moving `keys` to consecutive positions from `start`.
 
-        return new_state, all_keys, circ_mat
+        Returns:
+            Tuple[List[int], Tuple[int]]: reordered keys, and the new order of subsystems (see `permute_ket`).
+        """
 
-    def _swap_qubits(self, all_keys, keys):
-        swap_circuit = QubitCircuit(N=len(all_keys))
-        for i, key in enumerate(keys):
+        all_keys = list(all_keys)
+        order = list(range(len(all_keys)))
+        for i, key in enumerate(keys, start):
             j = all_keys.index(key)
             if j != i:
-                gate = Gate("SWAP", targets=[i, j])
-                swap_circuit.add_gate(gate)
                 all_keys[i], all_keys[j] = all_keys[j], all_keys[i]
-        swap_mat = gate_sequence_product(swap_circuit.propagators()).full()
-        return all_keys, swap_mat
+                order[i], order[j] = order[j], order[i]
+        return all_keys, tuple(order)
 
     @abstractmethod
     def set(self, keys: List[int], amplitudes: any) -> None:
@@ -138,6 +284,9 @@ class QuantumManager:
             amplitudes (any): Amplitudes to set state to, type determined by type of subclass.
         """
 
+        if self.deferred:
+            self.flush()
+
         # num_subsystems = log(len(amplitudes)) / log(self.dim)
         # assert self.dim ** int(round(num_subsystems)) == len(amplitudes),\
         #     "Length of amplitudes should be d ** n, " \
@@ -157,35 +306,93 @@ class QuantumManager:
 
     def remove(self, key: int) -> None:
         """Method to remove state stored at key."""
+        if self.deferred:
+            self.flush()
         del self.states[key]
 
+    def _use_storage(self, storage: str, matrix: bool) -> None:
+        # select storage of states (dictionary of state objects, or arena of arrays)
+        if storage == ARENA_STATE_STORAGE:
+            self.states = StateArena(self._state_class, self.truncation, matrix)
+        elif storage != DICT_STATE_STORAGE:
+            raise ValueError(f"Invalid state storage {storage}")
+
+    def _assign(self, state: "State") -> None:
+        # point all keys of the state to it
+        if isinstance(self.states, StateArena) and len(state.keys) <= self.states.max_size:
+            self.states.assign(state.keys, state.state)
+        else:
+            for key in state.keys:
+                self.states[key] = state
+        if len(state.keys) > self.max_group_size:
+            self.max_group_size = len(state.keys)
+
+    def _store(self, state: array, keys: List[int]) -> None:
+        # store a state computed by the manager (arena storage does not create a state object)
+        if isinstance(self.states, StateArena):
+            self.states.assign(keys, state)
+            if len(keys) > self.max_group_size:
+                self.max_group_size = len(keys)
+        else:
+            self._assign(self._state_class.trusted(state, keys, self.truncation))
+
+    def _shared_states(self, keys: List[int]) -> List[Tuple["State", List[int]]]:
+        """Method to get the states at `keys` that are shared with other keys.
+
+        Returns:
+            List[Tuple[State, List[int]]]: each shared state, with its other keys that still point to it.
+        """
+
+        shared = []
+        for key in keys:
+            state = self.states.get(key)
+            if state is None or len(state.keys) == 1 or any(state is old for old, _ in shared):
+                continue
+            rest = [k for k in state.keys if k not in keys and self.states.get(k) is state]
+            if rest:
+                shared.append((state, rest))
+        return shared
+
     def set_states(self, states: Dict):
         self.states = states
 
 
 class QuantumManagerKet(QuantumManager):
-    """Class to track and manage quantum states with the ket vector formalism."""
+    """Class to track and manage quantum states with the ket vector formalism.
+
+    After measurements, and for qubits left behind by `set`, states are split into products of states of fewer qubits
+    where possible.
+    """
+
+    _state_class = KetState
+    _batch_kernels = (apply_gates_ket_batch, measure_ket_batch)
+    _basis_states = (array([1, 0], dtype=complex), array([0, 1], dtype=complex))
+
+    def __init__(self, storage: str = DICT_STATE_STORAGE):
+        """Constructor of the ket vector quantum manager.
+
+        Args:
+            storage (str): storage of states, "dict" (state objects) or "arena" (see `StateArena`) (default "dict").
+        """
 
-    def __init__(self):
         super().__init__(KET_STATE_FORMALISM)
+        self._use_storage(storage, matrix=False)
 
     def new(self, state=(complex(1), complex(0))) -> int:
         key = self._least_available
         self._least_available += 1
-        self.states[key] = KetState(state, [key])
+        self._assign(KetState(state, [key]))
         return key
 
     def run_circuit(self, circuit: Circuit, keys: List[int], meas_samp=None) -> Dict[int, int]:
         super().run_circuit(circuit, keys, meas_samp)
-        new_state, all_keys, circ_mat = self._prepare_circuit(circuit, keys)
+        new_state, all_keys = self._prepare_circuit(circuit, keys)
 
-        new_state = circ_mat @ new_state
+        new_state = apply_gates_ket(new_state, circuit.compile())
 
         if len(circuit.measured_qubits) == 0:
             # set state, return no measurement result
-            new_ket = KetState(new_state, all_keys)
-            for key in all_keys:
-                self.states[key] = new_ket
+            self._store(new_state, all_keys)
             return {}
         else:
             # measure state (state reassignment done in _measure method)
@@ -193,10 +400,28 @@ class QuantumManagerKet(QuantumManager):
             return self._measure(new_state, keys, all_keys, meas_samp)
 
     def set(self, keys: List[int], amplitudes: List[complex]) -> None:
+        """Method to set the quantum state at the given keys.
+
+        The keys share the new state object, even if it is a product state.
+        Other qubits sharing a state with the keys keep their part of the state where it is separable from the keys;
+        otherwise, their (entangled) state is left unchanged.
+
+        Args:
+            keys (List[int]): list of quantum manager keys to modify.
+            amplitudes (List[complex]): state vector to set input keys to.
+        """
+
         super().set(keys, amplitudes)
         new_state = KetState(amplitudes, keys)
-        for key in keys:
-            self.states[key] = new_state
+
+        for old_state, rest in self._shared_states(keys):
+            # the other keys only have a state vector if they are separable from the keys being set
+            for indices, factor in factorize_ket(old_state.state, len(old_state.keys)):
+                factor_keys = [old_state.keys[i] for i in indices]
+                if all(key in rest for key in factor_keys):
+                    self._store(factor, factor_keys)
+
+        self._assign(new_state)
 
     def set_to_zero(self, key: int):
         self.set([key], [complex(1), complex(0)])
@@ -204,6 +429,11 @@ class QuantumManagerKet(QuantumManager):
     def set_to_one(self, key: int):
         self.set([key], [complex(0), complex(1)])
 
+    def _set_factorized(self, state: array, keys: List[int]) -> None:
+        # store state split into its separable factors
+        for indices, factor in factorize_ket(state, len(keys)):
+            self._store(factor, [keys[i] for i in indices])
+
     def _measure(self, state: List[complex], keys: List[int],
                  all_keys: List[int], meas_samp: float) -> Dict[int, int]:
         """Method to measure qubits at given keys.
@@ -223,7 +453,7 @@ class QuantumManagerKet(QuantumManager):
 
         if len(keys) == 1:
             if len(all_keys) == 1:
-                prob_0 = measure_state_with_cache_ket(tuple(state))
+                prob_0 = measure_state_ket(state)
                 if meas_samp < prob_0:
                     result = 0
                 else:
@@ -233,7 +463,7 @@ class QuantumManagerKet(QuantumManager):
                 key = keys[0]
                 num_states = len(all_keys)
                 state_index = all_keys.index(key)
-                state_0, state_1, prob_0 = measure_entangled_state_with_cache_ket(tuple(state), state_index, num_states)
+                state_0, state_1, prob_0 = measure_entangled_state_ket(array(state), state_index, num_states)
                 if meas_samp < prob_0:
                     new_state = array(state_0, dtype=complex)
                     result = 0
@@ -247,13 +477,12 @@ class QuantumManagerKet(QuantumManager):
             # swap states into correct position
             if not all(
                     [all_keys.index(key) == i for i, key in enumerate(keys)]):
-                all_keys, swap_mat = self._swap_qubits(all_keys, keys)
-                state = swap_mat @ state
+                all_keys, order = self._swap_qubits(all_keys, keys)
+                state = permute_ket(array(state), order)
 
             # calculate meas probabilities and projected states
             len_diff = len(all_keys) - len(keys)
-            new_states, probabilities = measure_multiple_with_cache_ket(
-                tuple(state), len(keys), len_diff)
+            new_states, probabilities = measure_multiple_ket(array(state), len(keys), len_diff)
 
             # choose result, set as new state
             for i in range(int(2 ** len(keys))):
@@ -265,48 +494,58 @@ class QuantumManagerKet(QuantumManager):
             for key in keys:
                 all_keys.remove(key)
 
-        result_states = [array([1, 0]), array([0, 1])]
+        result_states = self._basis_states
         result_digits = [int(x) for x in bin(result)[2:]]
         while len(result_digits) < len(keys):
             result_digits.insert(0, 0)
 
         for res, key in zip(result_digits, keys):
             # set to state measured
-            new_state_obj = KetState(result_states[res], [key])
-            self.states[key] = new_state_obj
-        
+            self._store(result_states[res], [key])
+
         if len(all_keys) > 0:
-            new_state_obj = KetState(new_state, all_keys)
-            for key in all_keys:
-                self.states[key] = new_state_obj
-        
+            self._set_factorized(new_state, all_keys)
+
         return dict(zip(keys, result_digits))
 
 
 class QuantumManagerDensity(QuantumManager):
-    """Class to track and manage states with the density matrix formalism."""
+    """Class to track and manage states with the density matrix formalism.
+
+    After measurements, and for qubits left behind by `set`, states are split into products of states of fewer qubits
+    where possible.
+    """
+
+    _state_class = DensityState
+    _batch_kernels = (apply_gates_density_batch, measure_density_batch)
+    _basis_states = (array([[1, 0], [0, 0]], dtype=complex), array([[0, 0], [0, 1]], dtype=complex))
+
+    def __init__(self, storage: str = DICT_STATE_STORAGE):
+        """Constructor of the density matrix quantum manager.
+
+        Args:
+            storage (str): storage of states, "dict" (state objects) or "arena" (see `StateArena`) (default "dict").
+        """
 
-    def __init__(self):
         super().__init__(DENSITY_MATRIX_FORMALISM)
+        self._use_storage(storage, matrix=True)
 
     def new(self,
             state=([complex(1), complex(0)], [complex(0), complex(0)])) -> int:
         key = self._least_available
         self._least_available += 1
-        self.states[key] = DensityState(state, [key])
+        self._assign(DensityState(state, [key]))
         return key
 
     def run_circuit(self, circuit: Circuit, keys: List[int], meas_samp=None) -> Dict[int, int]:
         super().run_circuit(circuit, keys, meas_samp)
-        new_state, all_keys, circ_mat = super()._prepare_circuit(circuit, keys)
+        new_state, all_keys = super()._prepare_circuit(circuit, keys)
 
-        new_state = circ_mat @ new_state @ circ_mat.conj().T
+        new_state = apply_gates_density(new_state, circuit.compile())
 
         if len(circuit.measured_qubits) == 0:
             # set state, return no measurement result
-            new_state_obj = DensityState(new_state, all_keys)
-            for key in all_keys:
-                self.states[key] = new_state_obj
+            self._store(new_state, all_keys)
             return {}
         else:
             # measure state (state reassignment done in _measure method)
@@ -319,6 +558,8 @@ class QuantumManagerDensity(QuantumManager):
         The `state` argument should be passed as List[List[complex]], where each internal list is a row.
         However, the `state` may also be given as a one-dimensional pure state.
         If the list is one-dimensional, will be converted to matrix with the outer product operation.
+        The keys share the new state object, even if it is a product state.
+        Other qubits sharing a state with the keys keep their reduced state.
 
         Args:
             keys (List[int]): list of quantum manager keys to modify.
@@ -327,8 +568,8 @@ class QuantumManagerDensity(QuantumManager):
 
         super().set(keys, state)
         new_state = DensityState(state, keys)
-        for key in keys:
-            self.states[key] = new_state
+        self._detach(keys)
+        self._assign(new_state)
 
     def set_to_zero(self, key: int):
         self.set([key], [[complex(1), complex(0)], [complex(0), complex(0)]])
@@ -336,6 +577,18 @@ class QuantumManagerDensity(QuantumManager):
     def set_to_one(self, key: int):
         self.set([key], [[complex(0), complex(0)], [complex(0), complex(1)]])
 
+    def _detach(self, keys: List[int]) -> None:
+        # trace keys out of the states they share with other keys
+        for old_state, rest in self._shared_states(keys):
+            traced = tuple(i for i, key in enumerate(old_state.keys) if key not in rest)
+            remaining = density_partial_trace(old_state.state, traced, len(old_state.keys), self.truncation)
+            self._set_factorized(remaining, rest)
+
+    def _set_factorized(self, state: array, keys: List[int]) -> None:
+        # store state split into its separable factors
+        for indices, factor in factorize_density(state, len(keys), self.dim):
+            self._store(factor, [keys[i] for i in indices])
+
     def _measure(self, state: List[List[complex]], keys: List[int],
                  all_keys: List[int], meas_samp: float) -> Dict[int, int]:
         """Method to measure qubits at given keys.
@@ -355,7 +608,7 @@ class QuantumManagerDensity(QuantumManager):
 
         if len(keys) == 1:
             if len(all_keys) == 1:
-                prob_0 = measure_state_with_cache_density(tuple(map(tuple, state)))
+                prob_0 = measure_state_density(state)
                 if meas_samp < prob_0:
                     result = 0
                     new_state = [[1, 0], [0, 0]]
@@ -368,7 +621,7 @@ class QuantumManagerDensity(QuantumManager):
                 num_states = len(all_keys)
                 state_index = all_keys.index(key)
                 state_0, state_1, prob_0 =\
-                    measure_entangled_state_with_cache_density(tuple(map(tuple, state)), state_index, num_states)
+                    measure_entangled_state_density(array(state), state_index, num_states)
                 if meas_samp < prob_0:
                     new_state = array(state_0, dtype=complex)
                     result = 0
@@ -380,14 +633,12 @@ class QuantumManagerDensity(QuantumManager):
             # swap states into correct position
             if not all(
                     [all_keys.index(key) == i for i, key in enumerate(keys)]):
-                all_keys, swap_mat = self._swap_qubits(all_keys, keys)
-                state = swap_mat @ state @ swap_mat.T
+                all_keys, order = self._swap_qubits(all_keys, keys)
+                state = permute_density(array(state), order)
 
             # calculate meas probabilities and projected states
             len_diff = len(all_keys) - len(keys)
-            state_to_measure = tuple(map(tuple, state))
-            new_states, probabilities = measure_multiple_with_cache_density(
-                state_to_measure, len(keys), len_diff)
+            new_states, probabilities = measure_multiple_density(array(state), len(keys), len_diff)
 
             # choose result, set as new state
             for i in range(int(2 ** len(keys))):
@@ -400,19 +651,287 @@ class QuantumManagerDensity(QuantumManager):
         while len(result_digits) < len(keys):
             result_digits.insert(0, 0)
 
-        new_state_obj = DensityState(new_state, all_keys)
-        for key in all_keys:
-            self.states[key] = new_state_obj
+        self._set_factorized(array(new_state, dtype=complex), all_keys)
 
         return dict(zip(keys, result_digits))
 
 
+class QuantumManagerStabilizer(QuantumManager):
+    """Class to track and manage stabilizer states with the stabilizer tableau formalism.
+
+    States are given and set as ket vectors (which must be stabilizer states), and stored as tableaus.
+    Only Clifford circuits (h, s, x, y, z, cx, swap and phase gates with multiples of pi/2) are supported.
+    Gates and measurements take polynomial time in the number of qubits of the affected state.
+    """
+
+    def __init__(self):
+        super().__init__(STABILIZER_FORMALISM)
+
+    def new(self, state=(complex(1), complex(0))) -> int:
+        key = self._least_available
+        self._least_available += 1
+        self._assign(StabilizerState(ket_to_stabilizer(state), [key]))
+        return key
+
+    def run_circuit(self, circuit: Circuit, keys: List[int], meas_samp=None) -> Dict[int, int]:
+        super().run_circuit(circuit, keys, meas_samp)
+
+        # get all unique states and combine them
+        tableaus = []
+        all_keys = []
+        for key in keys:
+            qstate = self.states[key]
+            if qstate.keys[0] not in all_keys:
+                tableaus.append(qstate.state)
+                all_keys += qstate.keys
+        if len(tableaus) == 1:
+            tableau = tableaus[0].copy()
+        else:
+            tableau = stabilizer_direct_sum(tableaus)
+
+        indices = [all_keys.index(key) for key in keys]
+        for name, gate_indices, arg in circuit.gates:
+            stabilizer_apply_gate(tableau, name, [indices[i] for i in gate_indices], arg)
+
+        if len(circuit.measured_qubits) == 0:
+            # set state, return no measurement result
+            self._assign(StabilizerState(tableau, all_keys))
+            return {}
+
+        # measure qubits in order, removing each from the tableau
+        results = {}
+        for i in circuit.measured_qubits:
+            key = keys[i]
+            result, tableau, meas_samp = stabilizer_measure(tableau, all_keys.index(key), meas_samp)
+            all_keys = [k for k in all_keys if k != key]
+            results[key] = result
+            self.set([key], [complex(1 - result), complex(result)])
+
+        if len(all_keys) > 0:
+            self._assign(StabilizerState(tableau, all_keys))
+        return results
+
+    def set(self, keys: List[int], amplitudes: List[complex]) -> None:
+        """Method to set the quantum state at the given keys.
+
+        Args:
+            keys (List[int]): list of quantum manager keys to modify.
+            amplitudes (List[complex]): state vector of a stabilizer state.
+
+        Raises:
+            ValueError: if the state is not a stabilizer state.
+        """
+
+        super().set(keys, amplitudes)
+        self._assign(StabilizerState(ket_to_stabilizer(amplitudes), keys))
+
+    def set_to_zero(self, key: int):
+        self.set([key], [complex(1), complex(0)])
+
+    def set_to_one(self, key: int):
+        self.set([key], [complex(0), complex(1)])
+
+
+class QuantumManagerBellDiagonal(QuantumManagerDensity):
+    """Class to track and manage entangled qubit pairs as Bell diagonal states.
+
+    Two-qubit states diagonal in the Bell basis are stored as four coefficients (see `BellDiagonalState`).
+    The circuits of repeater protocols are applied to the coefficients in closed form:
+        - Pauli gates on one qubit of a pair (e.g. swapping corrections) permute the coefficients;
+        - Bell state measurement of qubits from two pairs (entanglement swapping) convolves the coefficients;
+        - BBPSSW purification (CNOT and measurement on each side) is resolved when both sides have measured.
+    Pauli noise on a qubit of a pair (see `apply_pauli_noise`) is also applied in closed form.
+    All other operations fall back to the density matrix formalism;
+    afterwards, measured qubits are split from their states and Bell diagonal pairs are converted back.
+    """
+
+    _swap_gates = [["cx", [0, 1], None], ["h", [0], None]]
+    _purification_gates = [["cx", [0, 1], None]]
+    _pauli_indices = {"x": 2, "y": 3, "z": 1}  # XOR applied to Bell state indices
+    _batch_kernels = None
+
+    def __init__(self):
+        QuantumManager.__init__(self, BELL_DIAGONAL_FORMALISM)
+
+    def run_circuit(self, circuit: Circuit, keys: List[int], meas_samp=None) -> Dict[int, int]:
+        QuantumManager.run_circuit(self, circuit, keys, meas_samp)
+        states = [self.states[key] for key in keys]
+
+        if circuit.size == 1 and not circuit.measured_qubits and isinstance(states[0], BellDiagonalState) \
+                and all(gate[0] in self._pauli_indices for gate in circuit.gates):
+            flip = 0
+            for gate in circuit.gates:
+                flip ^= self._pauli_indices[gate[0]]
+            self._set_pair(states[0].diag[arange(4) ^ flip], states[0].keys)
+            return {}
+
+        if circuit.size == 2 and states[0] is not states[1]:
+            if circuit.gates == self._swap_gates and circuit.measured_qubits == [0, 1] \
+                    and isinstance(states[0], BellDiagonalState) and isinstance(states[1], BellDiagonalState):
+                return self._swap(states[0], states[1], keys, meas_samp)
+            if circuit.gates == self._purification_gates and circuit.measured_qubits == [1] \
+                    and isinstance(states[0], BellDiagonalState) and isinstance(states[1], BellDiagonalState):
+                return self._purify_first(states[0], states[1], keys, meas_samp)
+
+        if circuit.size == 2 and isinstance(states[0], PurificationState) and states[0] is states[1] \
+                and keys == states[0].keys[1:] and circuit.gates == self._purification_gates \
+                and circuit.measured_qubits == [1]:
+            return self._purify_second(states[0], meas_samp)
+
+        # density matrix fallback
+        all_keys = []
+        for state in states:
+            all_keys += [key for key in state.keys if key not in all_keys]
+        results = super().run_circuit(circuit, keys, meas_samp)
+        self._compress(all_keys)
+        return results
+
+    def _swap(self, state0: BellDiagonalState, state1: BellDiagonalState, keys: List[int],
+              meas_samp: float) -> Dict[int, int]:
+        # Bell state measurement of keys[0], keys[1]; the outcome (m0, m1) identifies Bell state index 2 * m1 + m0
+        result = min(int(meas_samp * 4), 3)
+        m0, m1 = result >> 1, result & 1
+        outcome = 2 * m1 + m0
+        indices = arange(4)
+        diag = array([state0.diag @ state1.diag[indices ^ i ^ outcome] for i in range(4)])
+
+        remote = [self._partner(state0, keys[0]), self._partner(state1, keys[1])]
+        self._set_pair(diag, remote)
+        super().set([keys[0]], [complex(1 - m0), complex(m0)])
+        super().set([keys[1]], [complex(1 - m1), complex(m1)])
+        return {keys[0]: m0, keys[1]: m1}
+
+    def _purify_first(self, kept: BellDiagonalState, meas: BellDiagonalState, keys: List[int],
+                      meas_samp: float) -> Dict[int, int]:
+        # the first side of a purification round measures 0 or 1 with equal probability
+        result = 0 if meas_samp < 0.5 else 1
+        pending = PurificationState(kept.diag, meas.diag, result,
+                                    [keys[0], self._partner(kept, keys[0]), self._partner(meas, keys[1])])
+        self._assign(pending)
+        super().set([keys[1]], [complex(1 - result), complex(result)])
+        return {keys[1]: result}
+
+    def _purify_second(self, pending: PurificationState, meas_samp: float) -> Dict[int, int]:
+        # results agree with probability p_same (the X components of the two pairs agree)
+        x = arange(4) >> 1
+        joint = pending.diag_kept[:, None] * pending.diag_meas[None, :]
+        p_same = joint[x[:, None] == x[None, :]].sum()
+        prob_0 = p_same if pending.result == 0 else 1 - p_same
+        result = 0 if meas_samp < prob_0 else 1
+
+        # kept pair has X component of the kept pair and Z component (z_kept XOR z_meas)
+        parity = pending.result ^ result
+        diag = zeros(4)
+        for i in range(4):
+            for j in range(4):
+                if x[i] ^ x[j] == parity:
+                    diag[(i & 2) | ((i ^ j) & 1)] += joint[i, j]
+        self._set_pair(diag / diag.sum(), pending.keys[:2])
+        super().set([pending.keys[2]], [complex(1 - result), complex(result)])
+        return {pending.keys[2]: result}
+
+    def _compress(self, keys: List[int]) -> None:
+        # convert Bell diagonal pairs (measured qubits are already split from their states)
+        for key in keys:
+            state = self.states[key]
+            if isinstance(state, DensityState) and len(state.keys) == 2:
+                diag = density_to_bell_diagonal(state.state)
+                if diag is not None:
+                    self._set_pair(diag, state.keys)
+
+    def _resolve(self, keys: List[int]) -> None:
+        # replace pending purification states at keys with density matrices
+        for key in keys:
+            state = self.states.get(key)
+            if isinstance(state, PurificationState):
+                new_state = DensityState.trusted(state.state, state.keys)
+                for k in state.keys:
+                    if self.states[k] is state:
+                        self.states[k] = new_state
+
+    def _set_pair(self, diag, keys: List[int]) -> None:
+        self._assign(BellDiagonalState(diag, keys))
+
+    @staticmethod
+    def _partner(state: BellDiagonalState, key: int) -> int:
+        return state.keys[1] if state.keys[0] == key else state.keys[0]
+
+    def set(self, keys: List[int], state: List[List[complex]]) -> None:
+        """Method to set the quantum state at the given keys.
+
+        Two-qubit states diagonal in the Bell basis are stored as `BellDiagonalState` objects;
+        other states are stored as density matrices.
+
+        Args:
+            keys (List[int]): list of quantum manager keys to modify.
+            state: density matrix (or state vector) to set input keys to.
+        """
+
+        self._resolve(keys)
+        if len(keys) == 2:
+            diag = density_to_bell_diagonal(state)
+            if diag is not None:
+                self._detach(keys)
+                self._set_pair(diag, keys)
+                return
+        super().set(keys, state)
+
+    def apply_pauli_noise(self, key: int, probabilities: List[float]) -> None:
+        """Method to apply a Pauli channel to a qubit.
+
+        The channel maps rho to (1 - px - py - pz) rho + px X rho X + py Y rho Y + pz Z rho Z.
+
+        Args:
+            key (int): key of the qubit.
+            probabilities (List[float]): probabilities (px, py, pz) of the Pauli errors.
+        """
+
+        state = self.states[key]
+        p_x, p_y, p_z = probabilities
+        if isinstance(state, BellDiagonalState):
+            diag = state.diag
+            indices = arange(4)
+            self._set_pair((1 - p_x - p_y - p_z) * diag + p_x * diag[indices ^ 2] + p_y * diag[indices ^ 3]
+                           + p_z * diag[indices ^ 1], state.keys)
+            return
+
+        num = len(state.keys)
+        index = state.keys.index(key)
+        rho = array(state.state)
+        new_rho = (1 - p_x - p_y - p_z) * rho
+        for prob, op in zip(probabilities, [[[0, 1], [1, 0]], [[0, -1j], [1j, 0]], [[1, 0], [0, -1]]]):
+            op = kron(kron(identity(2 ** index), op), identity(2 ** (num - index - 1)))
+            new_rho = new_rho + prob * (op @ rho @ op.conj().T)
+        self.set(state.keys, new_rho)
+
+    def get_fidelity(self, key: int) -> Optional[float]:
+        """Method to get the fidelity of the pair containing a qubit to the closest Bell state.
+
+        Args:
+            key (int): key of one qubit of the pair.
+
+        Returns:
+            float: largest Bell state coefficient of the pair (None if the qubit is not part of a two-qubit state).
+        """
+
+        state = self.states[key]
+        if isinstance(state, BellDiagonalState):
+            return float(state.diag.max())
+        if len(state.keys) != 2:
+            return None
+        rho = array(state.state)
+        return float(max((b @ rho @ b).real for b in BELL_BASIS))
+
+
 class QuantumManagerDensityFock(QuantumManager):
     """Class to track and manage Fock states with the density matrix formalism."""
 
-    def __init__(self, truncation: int = 1):
+    _state_class = DensityState
+
+    def __init__(self, truncation: int = 1, storage: str = DICT_STATE_STORAGE):
         # default truncation is 1 for 2-d Fock space.
         super().__init__(DENSITY_MATRIX_FORMALISM, truncation=truncation)
+        self._use_storage(storage, matrix=True)
 
     def new(self, state=None) -> int:
         """Method to create a new state with key
@@ -427,9 +946,9 @@ class QuantumManagerDensityFock(QuantumManager):
         self._least_available += 1
         if state is None:
             gnd = [1] + [0]*self.truncation
-            self.states[key] = DensityState(gnd, [key], truncation=self.truncation)
+            self._assign(DensityState(gnd, [key], truncation=self.truncation))
         else:
-            self.states[key] = DensityState(state, [key], truncation=self.truncation)
+            self._assign(DensityState(state, [key], truncation=self.truncation))
 
         return key
 
@@ -439,30 +958,6 @@ class QuantumManagerDensityFock(QuantumManager):
         """
         raise Exception("run_circuit method of class QuantumManagerDensityFock called")
 
-    def _generate_swap_operator(self, num_systems: int, i: int, j: int):
-        """Helper function to generate swapping unitary.
-
-        Args:
-            num_systems (int): number of subsystems in state
-            i (int): index of first subsystem to swap
-            j (int): index of second subsystem to swap
-
-        Returns:
-            Array[int]: unitary swapping operator
-        """
-
-        size = self.dim ** num_systems
-        swap_unitary = zeros((size, size))
-
-        for old_index in range(size):
-            old_str = base_repr(old_index, self.dim)
-            old_str = old_str.zfill(num_systems)
-            new_str = ''.join((old_str[:i], old_str[j], old_str[i+1:j], old_str[i], old_str[j+1:]))
-            new_index = int(new_str, base=self.dim)
-            swap_unitary[new_index, old_index] = 1
-
-        return swap_unitary
-
     def _prepare_state(self, keys: List[int]):
         """Function to prepare states at given keys for operator application.
 
@@ -489,46 +984,32 @@ class QuantumManagerDensityFock(QuantumManager):
                 all_keys += qstate.keys
 
         # construct compound state
-        new_state = [1]
-        for state in old_states:
+        new_state = old_states[0]
+        for state in old_states[1:]:
             new_state = kron(new_state, state)
 
-        # apply any necessary swaps to order keys
+        # reorder subsystems so that keys are consecutive
         if len(keys) > 1:
-
-            # generate desired key order
             start_idx = all_keys.index(keys[0])
             if start_idx + len(keys) > len(all_keys):
                 start_idx = len(all_keys) - len(keys)
 
-            for i, key in enumerate(keys):
-                i = i + start_idx
-                j = all_keys.index(key)
-                if j != i:
-                    swap_unitary = self._generate_swap_operator(len(all_keys), i, j)
-                    new_state = swap_unitary @ new_state @ swap_unitary.T
-                    all_keys[i], all_keys[j] = all_keys[j], all_keys[i]
+            if not all([all_keys.index(key) == i for i, key in enumerate(keys, start_idx)]):
+                all_keys, order = self._swap_qubits(all_keys, keys, start_idx)
+                new_state = permute_density(new_state, order, self.dim)
 
         return new_state, all_keys
 
-    def _prepare_operator(self, all_keys: List[int], keys: List[int], operator) -> array:
-        # pad operator with identity
-        left_dim = self.dim ** all_keys.index(keys[0])
-        right_dim = self.dim ** (len(all_keys) - all_keys.index(keys[-1]) - 1)
-        prepared_operator = operator
-
-        if left_dim > 0:
-            prepared_operator = kron(identity(left_dim), prepared_operator)
-        if right_dim > 0:
-            prepared_operator = kron(prepared_operator, identity(right_dim))
-
-        return prepared_operator
-
     def apply_operator(self, operator: array, keys: List[int]):
         prepared_state, all_keys = self._prepare_state(keys)
-        prepared_operator = self._prepare_operator(all_keys, keys, operator)
-        new_state = prepared_operator @ prepared_state @ prepared_operator.conj().T
-        self.set(all_keys, new_state)
+
+        # apply operator to the row and column axes of keys only
+        num_systems = len(all_keys)
+        axes = [all_keys.index(key) for key in keys]
+        tensor = prepared_state.reshape([self.dim] * 2 * num_systems)
+        tensor = apply_gate(tensor, array(operator), axes, self.dim)
+        tensor = apply_gate(tensor, array(operator).conj(), [i + num_systems for i in axes], self.dim)
+        self._store(tensor.reshape(prepared_state.shape), all_keys)
 
     def set(self, keys: List[int], state: List[List[complex]]) -> None:
         """Method to set the quantum state at the given keys.
@@ -536,6 +1017,8 @@ class QuantumManagerDensityFock(QuantumManager):
         The `state` argument should be passed as List[List[complex]], where each internal list is a row.
         However, the `state` may also be given as a one-dimensional pure state.
         If the list is one-dimensional, will be converted to matrix with the outer product operation.
+        The keys share the new state object, even if it is a product state.
+        Other subsystems sharing a state with the keys keep their reduced state.
 
         Args:
             keys (List[int]): list of quantum manager keys to modify.
@@ -544,8 +1027,16 @@ class QuantumManagerDensityFock(QuantumManager):
 
         super().set(keys, state)
         new_state = DensityState(state, keys, truncation=self.truncation)
-        for key in keys:
-            self.states[key] = new_state
+        for old_state, rest in self._shared_states(keys):
+            traced = tuple(i for i, key in enumerate(old_state.keys) if key not in rest)
+            remaining = density_partial_trace(old_state.state, traced, len(old_state.keys), self.truncation)
+            self._set_factorized(remaining, rest)
+        self._assign(new_state)
+
+    def _set_factorized(self, state: array, keys: List[int]) -> None:
+        # store state split into its separable factors
+        for indices, factor in factorize_density(state, len(keys), self.dim):
+            self._store(factor, [keys[i] for i in indices])
 
     def set_to_zero(self, key: int):
         """set the state to ground (zero) state."""
@@ -598,29 +1089,25 @@ class QuantumManagerDensityFock(QuantumManager):
             int: measurement as index of matching POVM in supplied tuple.
         """
 
-        state_tuple = tuple(map(tuple, state))
-        povm_tuple = tuple([tuple(map(tuple, povm)) for povm in povms])
         new_state = None
         result = 0
 
         # calculate meas probabilities and projected states
         if len(keys) == 1:
             if len(all_keys) == 1:
-                states, probs = measure_state_with_cache_fock_density(state_tuple, povm_tuple)
+                states, probs = measure_state_fock_density(state, povms)
 
             else:
                 key = keys[0]
                 num_states = len(all_keys)
                 state_index = all_keys.index(key)
                 states, probs = \
-                    measure_entangled_state_with_cache_fock_density(state_tuple, state_index, num_states, povm_tuple,
-                                                                    self.truncation)
+                    measure_entangled_state_fock_density(state, state_index, num_states, povms, self.truncation)
 
         else:
             indices = tuple([all_keys.index(key) for key in keys])
             states, probs = \
-                measure_multiple_with_cache_fock_density(state_tuple, indices, len(all_keys), povm_tuple,
-                                                         self.truncation)
+                measure_multiple_fock_density(state, indices, len(all_keys), povms, self.truncation)
 
         # calculate result based on measurement sample.
         prob_sum = cumsum(probs)
@@ -649,57 +1136,23 @@ class QuantumManagerDensityFock(QuantumManager):
         # assign remaining state
         if len(keys) < len(all_keys):
             indices = tuple([all_keys.index(key) for key in keys])
-            new_state_tuple = tuple(map(tuple, new_state))
-            remaining_state = density_partial_trace(new_state_tuple, indices, len(all_keys), self.truncation)
+            remaining_state = density_partial_trace(new_state, indices, len(all_keys), self.truncation)
             remaining_keys = [key for key in all_keys if key not in keys]
             self.set(remaining_keys, remaining_state)
 
         return result
 
-    def _build_loss_kraus_operators(self, loss_rate: float, all_keys: List[int], key: int) -> List[array]:
-        """Method to build Kraus operators of a generalized amplitude damping channel.
-
-        This represents the effect of photon loss.
-
-        Args:
-            loss_rate (float): loss rate for the quantum channel.
-            all_keys (List[int]): list of all keys in affected state.
-            key (int): key for subsystem experiencing loss.
-
-        Returns:
-            List[array]: list of generated Kraus operators.
-        """
-
-        assert 0 <= loss_rate <= 1
-        kraus_ops = []
-
-        for k in range(self.dim):
-            total_kraus_op = zeros((self.dim ** len(all_keys), self.dim ** len(all_keys)))
-
-            for n in range(k, self.dim):
-                coeff = sqrt(binom(n, k)) * sqrt(((1-loss_rate) ** (n-k)) * (loss_rate ** k))
-                single_op = zeros((self.dim, self.dim))
-                single_op[n-k, n] = 1
-                total_op = self._prepare_operator(all_keys, [key], single_op)
-                total_kraus_op += coeff * total_op
-
-            kraus_ops.append(total_kraus_op)
-
-        return kraus_ops
-
     def add_loss(self, key, loss_rate):
         """Method to apply generalized amplitude damping channel on a *single* subspace corresponding to `key`.
 
+        The single-mode Kraus operators (see `loss_kraus_operators`) are applied to the axes of the subspace only.
+
         Args:
             key (int): key for the subspace experiencing loss.
             loss_rate (float): loss rate for the quantum channel.
         """
 
         prepared_state, all_keys = self._prepare_state([key])
-        kraus_ops = self._build_loss_kraus_operators(loss_rate, all_keys, key)
-        output_state = zeros(prepared_state.shape, dtype=complex)
-
-        for kraus_op in kraus_ops:
-            output_state += kraus_op @ prepared_state @ kraus_op.conj().T
-
-        self.set(all_keys, output_state)
+        kraus_ops = loss_kraus_operators(loss_rate, self.truncation)
+        output_state = apply_kraus_density(prepared_state, kraus_ops, all_keys.index(key), len(all_keys), self.dim)
+        self._store(output_state, all_keys)
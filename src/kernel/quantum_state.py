@@ -1,11 +1,14 @@
 """Definition of the quantum state classes.
 
 This module defines the classes used to track quantum states in SeQUeNCe.
-These include 2 classes used by a quantum manager, and one used for individual photons:
+These include 5 classes used by a quantum manager, and one used for individual photons:
 
 1. The `KetState` class represents the ket vector formalism and is used by a quantum manager.
 2. The `DensityState` class represents the density matrix formalism and is also used by a quantum manager.
-3. The `FreeQuantumState` class uses the ket vector formalism, and is used by individual photons (not the quantum manager).
+3. The `StabilizerState` class represents stabilizer states as a tableau and is also used by a quantum manager.
+4. The `BellDiagonalState` class represents Bell diagonal states of qubit pairs and is also used by a quantum manager.
+5. The `PurificationState` class represents pairs mid-way through a BBPSSW round, and is used by the same quantum manager.
+6. The `FreeQuantumState` class uses the ket vector formalism, and is used by individual photons (not the quantum manager).
 """
 
 from abc import ABC
@@ -17,6 +20,24 @@ from numpy.random import Generator
 from .quantum_utils import *
 
 
+_validate_trusted = False
+
+
+def set_validation(enabled: bool) -> None:
+    """Function to enable validation of states constructed by quantum managers (for debugging).
+
+    States given to a quantum manager (with `new` or `set`) are always validated.
+    States computed by the manager (e.g. results of circuits and measurements) are constructed with the `trusted`
+    methods of `KetState` and `DensityState`, which only validate states if enabled here.
+
+    Args:
+        enabled (bool): if states constructed with `trusted` should be validated.
+    """
+
+    global _validate_trusted
+    _validate_trusted = enabled
+
+
 def swap_bits(num, pos1, pos2):
     """Swaps bits in num at positions 1 and 2.
 
@@ -119,6 +140,27 @@ class KetState(State):
         self.state = array(amplitudes, dtype=complex)
         self.keys = keys
 
+    @classmethod
+    def trusted(cls, amplitudes: array, keys: List[int], truncation: int = 1) -> "KetState":
+        """Method to construct a state computed by a quantum manager, without validation (see `set_validation`).
+
+        Args:
+            amplitudes (array): complex array of amplitudes, of length d ** len(keys).
+            keys (List[int]): list of keys (subsystems) associated with this state.
+            truncation (int): maximally allowed number of excited states for elementary subsystems (default 1).
+
+        Returns:
+            KetState: new state using the `amplitudes` array.
+        """
+
+        if _validate_trusted:
+            return cls(amplitudes, keys, truncation)
+        state = cls.__new__(cls)
+        state.state = amplitudes
+        state.keys = keys
+        state.truncation = truncation
+        return state
+
 
 class DensityState(State):
     """Class to represent an individual quantum state as a density matrix.
@@ -173,6 +215,148 @@ class DensityState(State):
         self.state = state
         self.keys = keys
 
+    @classmethod
+    def trusted(cls, state: array, keys: List[int], truncation: int = 1) -> "DensityState":
+        """Method to construct a state computed by a quantum manager, without validation (see `set_validation`).
+
+        Args:
+            state (array): complex density matrix, of shape (d ** len(keys), d ** len(keys)).
+            keys (List[int]): list of keys (subsystems) associated with this state.
+            truncation (int): maximally allowed number of excited states for elementary subsystems (default 1).
+
+        Returns:
+            DensityState: new state using the `state` array.
+        """
+
+        if _validate_trusted:
+            return cls(state, keys, truncation)
+        density = cls.__new__(cls)
+        density.state = state
+        density.keys = keys
+        density.truncation = truncation
+        return density
+
+
+class StabilizerState(State):
+    """Class to represent an individual stabilizer state with a stabilizer tableau.
+
+    Attributes:
+        state (np.array): stabilizer tableau as an int8 array of shape (n, 2n + 1), for n = len(keys).
+            Row i gives stabilizer generator i as X bits, Z bits and a sign bit (1 for a -1 phase).
+        keys (List[int]): list of keys (subsystems) associated with this state.
+    """
+
+    def __init__(self, tableau, keys: List[int]):
+        """Constructor for stabilizer state class.
+
+        Args:
+            tableau (np.array): stabilizer tableau (see `quantum_utils.ket_to_stabilizer` to convert a state vector).
+            keys (List[int]): list of keys to this state in quantum manager.
+        """
+
+        super().__init__()
+        tableau = array(tableau, dtype="int8")
+        assert tableau.shape == (len(keys), 2 * len(keys) + 1), \
+            "Stabilizer tableau should have shape (n, 2n + 1) for n keys. " \
+            "Tableau shape: {}, num keys: {}".format(tableau.shape, len(keys))
+
+        self.state = tableau
+        self.keys = keys
+
+    def to_ket(self):
+        """Method to get the state vector of the state (up to a global phase)."""
+
+        return stabilizer_to_ket(self.state)
+
+    def serialize(self) -> Dict:
+        return {"keys": self.keys, "state": self.state.tolist()}
+
+    def deserialize(self, json_data) -> None:
+        self.keys = json_data["keys"]
+        self.state = array(json_data["state"], dtype="int8")
+
+    def __str__(self):
+        n = len(self.keys)
+        generators = ["-+"[1 - row[-1]] + "".join("IXZY"[row[i] + 2 * row[n + i]] for i in range(n))
+                      for row in self.state]
+        return "\n".join(["Keys:", str(self.keys), "Stabilizers:", str(generators)])
+
+
+class BellDiagonalState(State):
+    """Class to represent a two-qubit Bell diagonal state by its Bell state coefficients.
+
+    The coefficients are ordered as (Phi+, Phi-, Psi+, Psi-).
+    The density matrix is computed when `state` is accessed.
+
+    Attributes:
+        diag (np.array): coefficients (probabilities) of the Bell states.
+        keys (List[int]): list of keys (subsystems) associated with this state.
+    """
+
+    def __init__(self, diag: List[float], keys: List[int]):
+        """Constructor for Bell diagonal state class.
+
+        Args:
+            diag (List[float]): coefficients of the Bell states.
+            keys (List[int]): list of keys to this state in quantum manager (length 2).
+        """
+
+        # the density matrix is a property, so the base constructor (which sets `state`) is not called
+        diag = array(diag, dtype=float)
+        assert len(keys) == 2, "Bell diagonal state must have 2 keys"
+        assert diag.shape == (4,) and abs(diag.sum() - 1) < 0.01, "Bell state coefficients must sum to 1"
+
+        self.diag = diag
+        self.keys = keys
+
+    @property
+    def state(self):
+        return bell_diagonal_to_density(self.diag)
+
+    def serialize(self) -> Dict:
+        return {"keys": self.keys, "diag": self.diag.tolist()}
+
+    def deserialize(self, json_data) -> None:
+        self.keys = json_data["keys"]
+        self.diag = array(json_data["diag"], dtype=float)
+
+    def __str__(self):
+        return "\n".join(["Keys:", str(self.keys), "Bell state coefficients:", str(self.diag)])
+
+
+class PurificationState(State):
+    """Class to represent two Bell diagonal pairs after one side of a BBPSSW purification round.
+
+    The pairs are (a, b) (kept) and (c, d) (measured); qubit c has been measured after a CNOT gate from a to c.
+    The density matrix of qubits (a, b, d) is computed when `state` is accessed.
+
+    Attributes:
+        diag_kept (np.array): Bell state coefficients of the kept pair.
+        diag_meas (np.array): Bell state coefficients of the measured pair.
+        result (int): measurement result of qubit c.
+        keys (List[int]): keys of qubits (a, b, d).
+    """
+
+    def __init__(self, diag_kept: List[float], diag_meas: List[float], result: int, keys: List[int]):
+        self.diag_kept = array(diag_kept, dtype=float)
+        self.diag_meas = array(diag_meas, dtype=float)
+        self.result = result
+        self.keys = keys
+
+    @property
+    def state(self):
+        return bell_diagonal_purification_density(self.diag_kept, self.diag_meas, self.result)
+
+    def serialize(self) -> Dict:
+        return {"keys": self.keys, "diag_kept": self.diag_kept.tolist(), "diag_meas": self.diag_meas.tolist(),
+                "result": self.result}
+
+    def deserialize(self, json_data) -> None:
+        self.keys = json_data["keys"]
+        self.diag_kept = array(json_data["diag_kept"], dtype=float)
+        self.diag_meas = array(json_data["diag_meas"], dtype=float)
+        self.result = json_data["result"]
+
 
 class FreeQuantumState(State):
     """Class used by photons to track internal quantum states.
@@ -296,7 +480,7 @@ class FreeQuantumState(State):
         if len(self.entangled_states) > 1:
             num_states = len(self.entangled_states)
             state_index = self.entangled_states.index(self)
-            state0, state1, prob = measure_entangled_state_with_cache(self.state, basis, state_index, num_states)
+            state0, state1, prob = measure_entangled_state(self.state, basis, state_index, num_states)
             if rng.random() < prob:
                 new_state = state0
                 result = 0
@@ -369,7 +553,7 @@ class FreeQuantumState(State):
         # math for probability calculations
         length_diff = len(entangled_list) - len(states)
 
-        new_states, probabilities = measure_multiple_with_cache(state, basis, length_diff)
+        new_states, probabilities = measure_multiple(state, basis, length_diff)
 
         possible_results = arange(0, basis_dimension, 1)
         # result gives index of the basis vector that will be projected to
@@ -6,10 +6,12 @@ These should not be used directly, but accessed by a QuantumManager instance or
 
 from functools import lru_cache
 from typing import List, Tuple
-from math import sqrt
+from math import sqrt, pi
 
-from numpy import array, kron, identity, zeros, trace, outer, eye
+from numpy import array, kron, identity, zeros, trace, outer, eye, tensordot, moveaxis, vdot, frombuffer, einsum, allclose, \
+    arange, asarray, cumsum, minimum
 from scipy.linalg import sqrtm
+from scipy.special import binom
 
 
 a = array([[0, 1], [0, 0]])
@@ -19,6 +21,126 @@ povm_0 = (1/2) * (kron(a_dag @ a, eye(2)) - 1j*kron(a, a_dag) + 1j*kron(a_dag, a
 povm_1 = (1/2) * (kron(a_dag @ a, eye(2)) + 1j*kron(a, a_dag) - 1j*kron(a_dag, a) + kron(eye(2), a_dag @ a))
 
 
+def apply_gate(tensor: array, gate: array, axes: List[int], dim: int = 2) -> array:
+    """Function to apply a gate (or other operator) to some axes of a state tensor.
+
+    Args:
+        tensor (array): state with one axis of dimension `dim` per subsystem (other axes are left unchanged).
+        gate (array): dim^k x dim^k gate matrix.
+        axes (List[int]): the k axes of `tensor` the gate acts on, most significant first.
+        dim (int): dimension of each subsystem (default 2).
+
+    Returns:
+        array: tensor with the gate applied, with the same shape as `tensor`.
+    """
+
+    k = len(axes)
+    gate = gate.reshape([dim] * 2 * k)
+    tensor = tensordot(gate, tensor, axes=(list(range(k, 2 * k)), axes))
+    return moveaxis(tensor, list(range(k)), axes)
+
+
+@lru_cache(maxsize=1000)
+def _density_axes(order: Tuple[int]) -> Tuple[int]:
+    num_systems = len(order)
+    return order + tuple(i + num_systems for i in order)
+
+
+def permute_ket(state: array, order: Tuple[int], dim: int = 2) -> array:
+    """Function to reorder the subsystems of a state vector.
+
+    Args:
+        state (array): state vector.
+        order (Tuple[int]): new order of subsystems; subsystem `order[i]` is moved to position i.
+        dim (int): dimension of each subsystem (default 2).
+
+    Returns:
+        array: reordered state vector.
+    """
+
+    return state.reshape((dim,) * len(order)).transpose(order).reshape(-1)
+
+
+def permute_density(state: array, order: Tuple[int], dim: int = 2) -> array:
+    """Function to reorder the subsystems of a density matrix (see `permute_ket`)."""
+
+    size = len(state)
+    return state.reshape((dim,) * 2 * len(order)).transpose(_density_axes(order)).reshape(size, size)
+
+
+def apply_gates_ket(state: array, gates: List[Tuple[array, List[int]]]) -> array:
+    """Function to apply gates (see `Circuit.compile`) to a state vector.
+
+    Gate qubit i acts on qubit i of the state.
+    """
+
+    num_qubits = len(state).bit_length() - 1
+    tensor = array(state, dtype=complex).reshape([2] * num_qubits)
+    for gate, indices in gates:
+        tensor = apply_gate(tensor, gate, indices)
+    return tensor.reshape(-1)
+
+
+def apply_gates_density(state: array, gates: List[Tuple[array, List[int]]]) -> array:
+    """Function to apply gates (see `Circuit.compile`) to a density matrix.
+
+    Gate qubit i acts on qubit i of the state.
+    """
+
+    dim = len(state)
+    num_qubits = dim.bit_length() - 1
+    tensor = array(state, dtype=complex).reshape([2] * 2 * num_qubits)
+    for gate, indices in gates:
+        tensor = apply_gate(tensor, gate, indices)
+        tensor = apply_gate(tensor, gate.conj(), [i + num_qubits for i in indices])
+    return tensor.reshape(dim, dim)
+
+
+def apply_gates_ket_batch(states: array, gates: List[Tuple[array, List[int]]]) -> array:
+    """Function to apply gates (see `Circuit.compile`) to a batch of state vectors.
+
+    Args:
+        states (array): state vectors of the same number of qubits, one per row.
+        gates (List[Tuple[array, List[int]]]): compiled gates; gate qubit i acts on qubit i of each state.
+
+    Returns:
+        array: states with the gates applied, one per row.
+    """
+
+    batch, size = states.shape
+    num_qubits = size.bit_length() - 1
+    tensor = asarray(states, dtype=complex).reshape([batch] + [2] * num_qubits)
+    for gate, indices in gates:
+        tensor = apply_gate(tensor, gate, [i + 1 for i in indices])
+    return tensor.reshape(batch, size)
+
+
+def apply_gates_density_batch(states: array, gates: List[Tuple[array, List[int]]]) -> array:
+    """Function to apply gates (see `Circuit.compile`) to a batch of density matrices.
+
+    Args:
+        states (array): density matrices of the same number of qubits, stacked along the first axis.
+        gates (List[Tuple[array, List[int]]]): compiled gates; gate qubit i acts on qubit i of each state.
+
+    Returns:
+        array: states with the gates applied, stacked along the first axis.
+    """
+
+    batch, dim, _ = states.shape
+    num_qubits = dim.bit_length() - 1
+    tensor = asarray(states, dtype=complex).reshape([batch] + [2] * 2 * num_qubits)
+    for gate, indices in gates:
+        tensor = apply_gate(tensor, gate, [i + 1 for i in indices])
+        tensor = apply_gate(tensor, gate.conj(), [i + 1 + num_qubits for i in indices])
+    return tensor.reshape(batch, dim, dim)
+
+
+# Measurement kernels
+# Outcome probabilities and post-measurement states are computed by reshaping states and slicing (or contracting)
+# the measured axes. States rarely repeat, so results are not cached, except for `measure_state_with_cache`
+# (single photons measured in a few fixed bases) and POVM measurement operators (fixed per detector).
+
+
 @lru_cache(maxsize=1000)
 def measure_state_with_cache(state: Tuple[complex, complex], basis: Tuple[Tuple[complex]]) -> float:
 
@@ -32,247 +154,268 @@ def measure_state_with_cache(state: Tuple[complex, complex], basis: Tuple[Tuple[
     return prob_0
 
 
-@lru_cache(maxsize=1000)
-def measure_entangled_state_with_cache(state: Tuple[complex], basis: Tuple[Tuple[complex]], state_index: int,
-                                       num_states: int) -> \
-        Tuple[array, array, float]:
+def measure_entangled_state(state: Tuple[complex], basis: Tuple[Tuple[complex]], state_index: int,
+                            num_states: int) -> Tuple[array, array, float]:
 
-    state = array(state)
+    state = array(state, dtype=complex).reshape(2 ** state_index, 2, -1)
     u = array(basis[0], dtype=complex)
     v = array(basis[1], dtype=complex)
-    # measurement operator
-    M0 = outer(u.conj(), u)
-    M1 = outer(v.conj(), v)
-
-    # generate projectors
-    projector0 = [1]
-    projector1 = [1]
-    for i in range(num_states):
-        if i == state_index:
-            projector0 = kron(projector0, M0)
-            projector1 = kron(projector1, M1)
-        else:
-            projector0 = kron(projector0, identity(2))
-            projector1 = kron(projector1, identity(2))
+    # measurement operators applied to the measured axis
+    projected0 = tensordot(outer(u.conj(), u), state, axes=(1, 1)).transpose(1, 0, 2).reshape(-1)
+    projected1 = tensordot(outer(v.conj(), v), state, axes=(1, 1)).transpose(1, 0, 2).reshape(-1)
 
     # probability of measuring basis[0]
-    prob_0 = (state.conj().transpose() @ projector0.conj().transpose() @ projector0 @ state).real
+    prob_0 = vdot(projected0, projected0).real
 
     if prob_0 >= 1:
         state1 = None
     else:
-        state1 = (projector1 @ state) / sqrt(1 - prob_0)
+        state1 = projected1 / sqrt(1 - prob_0)
 
     if prob_0 <= 0:
         state0 = None
     else:
-        state0 = (projector0 @ state) / sqrt(prob_0)
+        state0 = projected0 / sqrt(prob_0)
 
     return state0, state1, prob_0
 
 
-@lru_cache(maxsize=1000)
-def measure_multiple_with_cache(state: Tuple[complex], basis: Tuple[Tuple[complex]], length_diff: int) \
+def measure_multiple(state: Tuple[complex], basis: Tuple[Tuple[complex]], length_diff: int) \
         -> Tuple[List[array], List[float]]:
 
-    state = array(state)
-    # construct measurement operators, projectors, and probabilities of measurement
-    projectors = [None] * len(basis)
+    state = array(state, dtype=complex).reshape(len(basis), 2 ** length_diff)
+    # measurement operators applied to the measured subsystems, and probabilities of measurement
+    return_states = [None] * len(basis)
     probabilities = [0] * len(basis)
     for i, vector in enumerate(basis):
         vector = array(vector, dtype=complex)
-        M = outer(vector.conj(), vector)  # measurement operator
-        projectors[i] = kron(M, identity(2 ** length_diff))  # projector
-        probabilities[i] = (state.conj().transpose() @ projectors[i].conj().transpose() @ projectors[i] @ state).real
-        if probabilities[i] < 0:
-            probabilities[i] = 0
-
-    return_states = [None] * len(projectors)
-    for i, proj in enumerate(projectors):
-        # project to new state
+        projected = (outer(vector.conj(), vector) @ state).reshape(-1)
+        probabilities[i] = max(vdot(projected, projected).real, 0)
         if probabilities[i] > 0:
-            new_state = (proj @ state) / sqrt(probabilities[i])
-            return_states[i] = new_state
+            return_states[i] = projected / sqrt(probabilities[i])
 
     return return_states, probabilities
 
 
-@lru_cache(maxsize=1000)
-def measure_state_with_cache_ket(state: Tuple[complex, complex]) -> float:
+def measure_state_ket(state: array) -> float:
 
-    state = array(state)
-    M0 = array([[1, 0], [0, 0]], dtype=complex)
+    # probability of measuring |0>
+    return abs(state[0]) ** 2
 
-    # probability of measuring basis[0]
-    prob_0 = (state.conj().T @ M0 @ state).real
-    return prob_0
 
+def measure_entangled_state_ket(state: array, state_index: int, num_states: int) -> Tuple[array, array, float]:
+    """Function to measure one qubit of a state vector.
 
-@lru_cache(maxsize=1000)
-def measure_entangled_state_with_cache_ket(state: Tuple[complex], state_index: int, num_states: int) \
-        -> Tuple[array, array, float]:
-
-    state = array(state)
+    Returns:
+        Tuple[array, array, float]: normalized states of the other qubits for results 0 and 1
+            (None if the result is impossible), and the probability of result 0.
+    """
 
-    # generate projectors
-    projector0 = [1]
-    projector1 = [1]
-    for i in range(num_states):
-        if i == state_index:
-            projector0 = kron(projector0, [1, 0])
-            projector1 = kron(projector1, [0, 1])
-        else:
-            projector0 = kron(projector0, identity(2))
-            projector1 = kron(projector1, identity(2))
+    state = state.reshape(2 ** state_index, 2, -1)
+    projected0 = state[:, 0, :].reshape(-1)
+    projected1 = state[:, 1, :].reshape(-1)
 
-    # probability of measuring basis[0]
-    prob_0 = (state.conj().T @ projector0.T @ projector0 @ state).real
+    # probability of measuring |0>
+    prob_0 = vdot(projected0, projected0).real
 
     if prob_0 >= 1:
         state1 = None
     else:
-        state1 = (projector1 @ state) / sqrt(1 - prob_0)
+        state1 = projected1 / sqrt(1 - prob_0)
 
     if prob_0 <= 0:
         state0 = None
     else:
-        state0 = (projector0 @ state) / sqrt(prob_0)
+        state0 = projected0 / sqrt(prob_0)
 
     return state0, state1, prob_0
 
 
-@lru_cache(maxsize=1000)
-def measure_multiple_with_cache_ket(state: Tuple[complex], num_states: int, length_diff: int) \
-        -> Tuple[List[array], List[float]]:
+def measure_multiple_ket(state: array, num_states: int, length_diff: int) -> Tuple[List[array], List[float]]:
+    """Function to measure the first `num_states` qubits of a state vector.
 
-    state = array(state)
-    basis_count = 2 ** num_states
-
-    # construct measurement operators, projectors, and probabilities of measurement
-    projectors = [None] * basis_count
-    probabilities = [0] * basis_count
-    for i in range(basis_count):
-        M = zeros((1, basis_count), dtype=complex)  # measurement operator
-        M[0, i] = 1
-        projectors[i] = kron(M, identity(2 ** length_diff))  # projector
-        probabilities[i] = (state.conj().T @ projectors[i].T @ projectors[i] @ state).real
-        if probabilities[i] < 0:
-            probabilities[i] = 0
-        if probabilities[i] > 1:
-            probabilities[i] = 1
-
-    return_states = [None] * len(projectors)
-    for i, proj in enumerate(projectors):
-        # project to new state
-        if probabilities[i] > 0:
-            new_state = (proj @ state) / sqrt(probabilities[i])
-            new_state = tuple(new_state)
-            return_states[i] = new_state
+    Returns:
+        Tuple[List[array], List[float]]: normalized states of the other qubits for each result
+            (None if the result is impossible), and the probability of each result.
+    """
 
-    return return_states, probabilities
+    state = state.reshape(2 ** num_states, 2 ** length_diff)
+    probabilities = (abs(state) ** 2).sum(axis=1).clip(0, 1)
+    return_states = [row / sqrt(prob) if prob > 0 else None for row, prob in zip(state, probabilities)]
+    return return_states, probabilities.tolist()
 
 
-@lru_cache(maxsize=1000)
-def measure_state_with_cache_density(state: Tuple[Tuple[complex, complex]]) -> float:
+def measure_state_density(state: array) -> float:
 
-    state = array(state)
-    M0 = array([[1, 0], [0, 0]], dtype=complex)
+    # probability of measuring |0>
+    return state[0][0].real
 
-    # probability of measuring basis[0]
-    prob_0 = trace(state @ M0).real
-    return prob_0
 
+def measure_entangled_state_density(state: array, state_index: int, num_states: int) -> Tuple[array, array, float]:
+    """Function to measure one qubit of a density matrix.
 
-@lru_cache(maxsize=1000)
-def measure_entangled_state_with_cache_density(state: Tuple[Tuple[complex]], state_index: int, num_states: int) \
-        -> Tuple[array, array, float]:
+    Returns:
+        Tuple[array, array, float]: normalized post-measurement states (of all qubits) for results 0 and 1
+            (None if the result is impossible), and the probability of result 0.
+    """
 
-    state = array(state)
+    dim = len(state)
+    left = 2 ** state_index
+    tensor = state.reshape(left, 2, -1, left, 2, dim // left // 2)
+    projected = []
+    for result in range(2):
+        new_tensor = zeros(tensor.shape, dtype=complex)
+        new_tensor[:, result, :, :, result, :] = tensor[:, result, :, :, result, :]
+        projected.append(new_tensor.reshape(dim, dim))
 
-    # generate projectors
-    projector0 = [1]
-    projector1 = [1]
-    for i in range(num_states):
-        if i == state_index:
-            projector0 = kron(projector0, [[1, 0], [0, 0]])
-            projector1 = kron(projector1, [[0, 0], [0, 1]])
-        else:
-            projector0 = kron(projector0, identity(2))
-            projector1 = kron(projector1, identity(2))
-
-    # probability of measuring basis[0]
-    prob_0 = trace(state @ projector0).real
+    # probability of measuring |0>
+    prob_0 = trace(projected[0]).real
 
     if prob_0 >= 1:
         state1 = None
     else:
-        state1 = (projector1 @ state @ projector1) / (1 - prob_0)
+        state1 = projected[1] / (1 - prob_0)
 
     if prob_0 <= 0:
         state0 = None
     else:
-        state0 = (projector0 @ state @ projector0) / prob_0
+        state0 = projected[0] / prob_0
 
     return state0, state1, prob_0
 
 
-@lru_cache(maxsize=1000)
-def measure_multiple_with_cache_density(state: Tuple[Tuple[complex]], num_states: int, length_diff: int) \
-        -> Tuple[List[array], List[float]]:
+def measure_multiple_density(state: array, num_states: int, length_diff: int) -> Tuple[List[array], List[float]]:
+    """Function to measure the first `num_states` qubits of a density matrix.
 
-    state = array(state)
+    Returns:
+        Tuple[List[array], List[float]]: normalized post-measurement states (of all qubits) for each result
+            (None if the result is impossible), and the probability of each result.
+    """
+
+    dim = len(state)
     basis_count = 2 ** num_states
+    tensor = state.reshape(basis_count, 2 ** length_diff, basis_count, 2 ** length_diff)
 
-    # construct measurement operators, projectors, and probabilities of measurement
-    projectors = [None] * basis_count
+    return_states = [None] * basis_count
     probabilities = [0] * basis_count
     for i in range(basis_count):
-        M = zeros((basis_count, basis_count), dtype=complex)  # measurement operator
-        M[i, i] = 1
-        projectors[i] = kron(M, identity(2 ** length_diff))  # projector
-        probabilities[i] = trace(state @ projectors[i]).real
-        if probabilities[i] < 0:
-            probabilities[i] = 0
-        if probabilities[i] > 1:
-            probabilities[i] = 1
-
-    return_states = [None] * len(projectors)
-    for i, proj in enumerate(projectors):
-        # project to new state
+        block = tensor[i, :, i, :]
+        probabilities[i] = min(max(trace(block).real, 0), 1)
         if probabilities[i] > 0:
-            new_state = (proj @ state @ proj) / probabilities[i]
-            new_state = tuple(new_state)
-            return_states[i] = new_state
+            new_state = zeros(tensor.shape, dtype=complex)
+            new_state[i, :, i, :] = block / probabilities[i]
+            return_states[i] = new_state.reshape(dim, dim)
 
     return return_states, probabilities
 
 
-@lru_cache(maxsize=1000)
-def measure_state_with_cache_fock_density(state: Tuple[Tuple[complex]], povms: Tuple[Tuple[Tuple[complex]]]) \
+def _choose_results(probabilities: array, meas_samps: array) -> array:
+    # result i is chosen if the sum of probabilities of results before i <= sample < the sum up to i
+    counts = (cumsum(probabilities, axis=1) <= asarray(meas_samps, dtype=float)[:, None]).sum(axis=1)
+    return minimum(counts, probabilities.shape[1] - 1)
+
+
+def measure_ket_batch(states: array, indices: List[int], meas_samps: List[float]) -> Tuple[array, array]:
+    """Function to measure the same qubits of a batch of state vectors.
+
+    Args:
+        states (array): state vectors of the same number of qubits, one per row.
+        indices (List[int]): qubits to measure; the first is the most significant bit of the result.
+        meas_samps (List[float]): random sample used to choose the result, for each state.
+
+    Returns:
+        Tuple[array, array]: result of each measurement, and the normalized states of the other qubits
+            (in their original order), one per row.
+    """
+
+    batch, size = states.shape
+    num_qubits = size.bit_length() - 1
+    num_measured = len(indices)
+    tensor = states.reshape([batch] + [2] * num_qubits)
+    tensor = moveaxis(tensor, [i + 1 for i in indices], list(range(1, num_measured + 1)))
+    tensor = tensor.reshape(batch, 2 ** num_measured, -1)
+
+    probabilities = einsum('bij,bij->bi', tensor.conj(), tensor).real
+    results = _choose_results(probabilities, meas_samps)
+    rows = arange(batch)
+    new_states = tensor[rows, results] / (probabilities[rows, results] ** 0.5)[:, None]
+    return results, new_states
+
+
+def measure_density_batch(states: array, indices: List[int], meas_samps: List[float]) -> Tuple[array, array]:
+    """Function to measure the same qubits of a batch of density matrices.
+
+    Args:
+        states (array): density matrices of the same number of qubits, stacked along the first axis.
+        indices (List[int]): qubits to measure; the first is the most significant bit of the result.
+        meas_samps (List[float]): random sample used to choose the result, for each state.
+
+    Returns:
+        Tuple[array, array]: result of each measurement, and the normalized states of the other qubits
+            (in their original order), stacked along the first axis.
+    """
+
+    batch, dim, _ = states.shape
+    num_qubits = dim.bit_length() - 1
+    num_measured = len(indices)
+    basis_count = 2 ** num_measured
+    tensor = states.reshape([batch] + [2] * 2 * num_qubits)
+    axes = [i + 1 for i in indices] + [i + 1 + num_qubits for i in indices]
+    tensor = moveaxis(tensor, axes, list(range(1, num_measured + 1)) +
+                      list(range(num_qubits + 1, num_qubits + num_measured + 1)))
+    tensor = tensor.reshape(batch, basis_count, dim // basis_count, basis_count, dim // basis_count)
+
+    blocks = einsum('bixiy->bixy', tensor)
+    probabilities = einsum('bixx->bi', blocks).real
+    results = _choose_results(probabilities, meas_samps)
+    rows = arange(batch)
+    new_states = blocks[rows, results] / probabilities[rows, results][:, None, None]
+    return results, new_states
+
+
+@lru_cache(maxsize=128)
+def _measurement_operator(povm: bytes, dim: int) -> array:
+    # square root of a POVM operator, cached by the operator data (detectors reuse the same POVMs)
+    return sqrtm(frombuffer(povm, dtype=complex).reshape(dim, dim))
+
+
+def _measure_povms_density(state: array, axes: List[int], num_systems: int, povms: List[array], dim: int) \
         -> Tuple[List[array], List[float]]:
-    state = array(state)
-    povms = [array(povm) for povm in povms]
+    # measure subsystems at `axes` (consecutive) of a density matrix with POVM operators acting on those subsystems
+    size = len(state)
+    tensor = state.reshape([dim] * 2 * num_systems)
+    col_axes = [i + num_systems for i in axes]
 
-    # probabilities of getting different outcomes according to POVM operators
-    prob_list = [trace(state @ povm).real for povm in povms]
+    prob_list = []
     state_list = []
-
-    # get output states
-    for i in range(len(prob_list)):
-        if prob_list[i] <= 0:
-            state_post_meas = None
+    for povm in povms:
+        povm = array(povm, dtype=complex)
+        prob = trace(apply_gate(tensor, povm, axes, dim).reshape(size, size)).real
+        prob_list.append(prob)
+        if prob <= 0:
+            state_list.append(None)
         else:
-            measure_op = sqrtm(povms[i])
-            state_post_meas = (measure_op @ state @ measure_op) / prob_list[i]
-
-        state_list.append(state_post_meas)
+            measure_op = _measurement_operator(povm.tobytes(), len(povm))
+            new_tensor = apply_gate(tensor, measure_op, axes, dim)
+            new_tensor = apply_gate(new_tensor, measure_op.T, col_axes, dim)
+            state_list.append(new_tensor.reshape(size, size) / prob)
 
     return state_list, prob_list
 
 
-@lru_cache(maxsize=1000)
-def measure_entangled_state_with_cache_fock_density(state: Tuple[Tuple[complex]], system_index: int, num_systems: int,
-                                                    povms: Tuple[Tuple[Tuple[complex]]], truncation: int = 1) \
+def measure_state_fock_density(state: array, povms: List[array]) -> Tuple[List[array], List[float]]:
+    """Function to measure a single subsystem with POVM operators.
+
+    Returns:
+        Tuple[List[array], List[float]]: post-measurement states and probabilities for each POVM operator.
+    """
+
+    state = array(state, dtype=complex)
+    return _measure_povms_density(state, [0], 1, povms, len(state))
+
+
+def measure_entangled_state_fock_density(state: array, system_index: int, num_systems: int,
+                                         povms: List[array], truncation: int = 1) \
         -> Tuple[List[array], List[float]]:
 
     """Measure one subsystem of a larger composite system.
@@ -281,10 +424,10 @@ def measure_entangled_state_with_cache_fock_density(state: Tuple[Tuple[complex]]
     operators on the subsystem's Hilbert space alone.
 
     Args:
-        state (Tuple[Tuple[complex]]): state to measure
+        state (array): state to measure
         system_index (int): index of measured subsystem within state.
         num_systems (int): number of total systems in the state.
-        povms (Tuple[Tuple[Tuple[complex]]]): tuple listing all POVM operators to use for measurement
+        povms (List[array]): list of all POVM operators to use for measurement
         truncation (int): fock space truncation, 1 for qubit system (default 1).
 
     Returns:
@@ -293,36 +436,11 @@ def measure_entangled_state_with_cache_fock_density(state: Tuple[Tuple[complex]]
             The second lists the probability for each measurement.
     """
 
-    state = array(state)
-    povms = [array(povm) for povm in povms]
+    return _measure_povms_density(array(state, dtype=complex), [system_index], num_systems, povms, truncation + 1)
 
-    # generate POVM operators on total Hilbert space
-    povm_list = []
-    left_dim = (truncation + 1) ** system_index
-    right_dim = (truncation + 1) ** (num_systems - system_index - 1)
-    for povm in povms:
-        povm_tot = kron(kron(identity(left_dim), povm), identity(right_dim))
-        povm_list.append(povm_tot)
 
-    # list of probabilities of getting different outcomes from POVM
-    prob_list = [trace(state @ povm).real for povm in povm_list]
-    state_list = []
-
-    for i in range(len(prob_list)):
-        if prob_list[i] <= 0:
-            state_post_meas = None
-        else:
-            measure_op = sqrtm(povm_list[i])
-            state_post_meas = (measure_op @ state @ measure_op) / prob_list[i]
-
-        state_list.append(state_post_meas)
-
-    return state_list, prob_list
-
-
-@lru_cache(maxsize=1000)
-def measure_multiple_with_cache_fock_density(state: Tuple[Tuple[complex]], indices: Tuple[int], num_systems: int,
-                                             povms: Tuple[Tuple[Tuple[complex]]], truncation: int = 1) \
+def measure_multiple_fock_density(state: array, indices: Tuple[int], num_systems: int,
+                                  povms: List[array], truncation: int = 1) \
         -> Tuple[List[array], List[float]]:
 
     """Measure multiple subsystems of a larger composite system.
@@ -330,21 +448,16 @@ def measure_multiple_with_cache_fock_density(state: Tuple[Tuple[complex]], indic
     Should be called by Quantum Managers.
     This function will facilitate entangling measurement, e.g. BSM with two photon detectors behind a beamsplitter.
     Such measurement operators are consisted of mixed operators on different subsystems' Hilbert spaces.
-    For current implementation, the Hilbert space on which those mixed operators act on is separated from the rest of
-    the total Hilbert space, and we assume that the involved subsystems have already been moved close in terms of keys.
+    For current implementation, we assume that the involved subsystems have already been moved close in terms of keys.
     i.e., elements in `indices` argument are no less than 0 and no greater than `num_systems`
     (relative indices w.r.t. the measured state), and the elements MUST BE consecutive.
-
-    E.g. For a total system consisted of 4 subsystems (0, 1, 2, 3) each with dimension d,
-    if the entangling measurement happens on (1, 2), then measurement operators on total space will be constructed as
-        O_tot = kron(kron(identity(d), O), identity(d)),
-    where the measurement operator on (1, 2) subspace needs to be generated beforehand to feed in the function.
+    The measurement operators (e.g. on subsystems (1, 2) of 4 subsystems) only act on the axes of those subsystems.
 
     Args:
-        state (Tuple[Tuple[complex]]): state to measure.
+        state (array): state to measure.
         indices (Tuple[int]): indices within combined state to measure.
         num_systems (int): number of total systems in the state.
-        povms (Tuple[Tuple[Tuple[complex]]]): tuple listing all POVM operators to use for measurement.
+        povms (List[array]): list of all POVM operators to use for measurement.
         truncation (int): fock space truncation, 1 for qubit system (default 1).
 
     Returns:
@@ -353,9 +466,6 @@ def measure_multiple_with_cache_fock_density(state: Tuple[Tuple[complex]], indic
             The second lists the probability for each measurement.
     """
 
-    state = array(state)
-    povms = [array(povm) for povm in povms]
-
     # judge if elements in `indices` are consecutive
     init_meas_sys_idx = min(indices)
     fin_meas_sys_idx = max(indices)
@@ -363,38 +473,68 @@ def measure_multiple_with_cache_fock_density(state: Tuple[Tuple[complex]], indic
     if (fin_meas_sys_idx - init_meas_sys_idx + 1 != num) or (list(indices) != sorted(indices)):
         raise ValueError("Indices should be consecutive; got {}".format(indices))
 
-    povm_list = []
-    left_dim = (truncation + 1) ** init_meas_sys_idx
-    right_dim = (truncation + 1) ** (num_systems - fin_meas_sys_idx - 1)
-    for povm in povms:
-        povm_tot = kron(kron(identity(left_dim), povm), identity(right_dim))
-        povm_list.append(povm_tot)
+    # return post-measurement states and measurement outcome probabilities in the order of fed-in POVM operators
+    return _measure_povms_density(array(state, dtype=complex), list(indices), num_systems, povms, truncation + 1)
 
-    # list of probabilities of getting different outcomes from POVM
-    prob_list = [trace(state @ povm).real for povm in povm_list]
-    state_list = []
 
-    for i in range(len(prob_list)):
-        if prob_list[i] <= 0:
-            state_post_meas = None
-        else:
-            measure_op = sqrtm(povm_list[i])
-            state_post_meas = (measure_op @ state @ measure_op) / prob_list[i]
+@lru_cache(maxsize=1000)
+def loss_kraus_operators(loss_rate: float, truncation: int = 1) -> array:
+    """Function to get the Kraus operators of the generalized amplitude damping channel on one mode.
 
-        state_list.append(state_post_meas)
+    This represents the effect of photon loss; Kraus operator k removes k photons.
+    Results are cached (loss rates are fixed per channel or component) and should not be modified.
 
-    # return post-measurement states and measurement outcome probabilities in the order of fed-in POVM operators
-    return state_list, prob_list
+    Args:
+        loss_rate (float): probability of losing each photon.
+        truncation (int): fock space truncation of the mode (default 1).
 
+    Returns:
+        array: Kraus operators of shape (truncation + 1, truncation + 1), stacked along the first axis.
+    """
 
-@lru_cache(maxsize=1000)
-def density_partial_trace(state: Tuple[Tuple[complex]], indices: Tuple[int], num_systems: int, truncation: int = 1) \
-        -> array:
+    assert 0 <= loss_rate <= 1
+    dim = truncation + 1
+    kraus_ops = zeros((dim, dim, dim))
+    for k in range(dim):
+        for n in range(k, dim):
+            kraus_ops[k, n - k, n] = sqrt(binom(n, k)) * sqrt(((1 - loss_rate) ** (n - k)) * (loss_rate ** k))
+    kraus_ops.setflags(write=False)
+    return kraus_ops
+
+
+def apply_kraus_density(state: array, kraus_ops: array, index: int, num_systems: int, dim: int = 2) -> array:
+    """Function to apply a channel to one subsystem of a density matrix.
+
+    The Kraus operators only act on the row and column axes of the subsystem.
+
+    Args:
+        state (array): density matrix.
+        kraus_ops (array): Kraus operators of the channel on one subsystem, stacked along the first axis.
+        index (int): index of the subsystem within the state.
+        num_systems (int): number of total subsystems in the state.
+        dim (int): dimension of each subsystem (default 2).
+
+    Returns:
+        array: density matrix after the channel.
+    """
+
+    size = len(state)
+    left = dim ** index
+    right = dim ** (num_systems - index - 1)
+    tensor = array(state, dtype=complex).reshape(left, dim, right, left, dim, right)
+
+    # superoperator (dim^4 entries) acting on the row and column axes of the subsystem together
+    superop = einsum('kab,kdc->adbc', kraus_ops, kraus_ops.conj())
+    tensor = tensordot(superop, tensor, axes=([2, 3], [1, 4]))  # (row, column, left, right, left, right)
+    return tensor.transpose(2, 0, 3, 4, 1, 5).reshape(size, size)
+
+
+def density_partial_trace(state: array, indices: Tuple[int], num_systems: int, truncation: int = 1) -> array:
 
     """Traces out subsystems systems at given indices.
 
     Args:
-        state (Tuple[Tuple[complex]]: input state.
+        state (array: input state.
         indices (Tuple[int]): indices of subsystems to trace out of state.
             should be sorted in increasing order.
         num_systems (int): number of total subsystems in the state.
@@ -414,3 +554,446 @@ def density_partial_trace(state: Tuple[Tuple[complex]], indices: Tuple[int], num
     output_dim = (truncation + 1) ** (num_systems - len(indices))
     output_state = temp.reshape((output_dim, output_dim))
     return output_state
+
+
+# state factorization utilities
+# States are split into groups of subsystems such that the state is the tensor product of the group states.
+# Candidate groups join subsystems whose two-subsystem reduced state is correlated,
+# and are accepted only if the product of the group states reproduces the state.
+
+SEPARABILITY_TOLERANCE = 1e-9
+
+
+def _ket_marginal(tensor: array, indices: List[int]) -> array:
+    # reduced density matrix of a state vector (reshaped with one axis per subsystem)
+    mat = moveaxis(tensor, indices, list(range(len(indices)))).reshape(tensor.shape[0] ** len(indices), -1)
+    return mat @ mat.conj().T
+
+
+def _density_marginal(tensor: array, indices: List[int]) -> array:
+    # reduced density matrix of a density matrix (reshaped with two axes per subsystem)
+    num_systems = tensor.ndim // 2
+    rows = list(range(num_systems))
+    cols = [i + num_systems if i in indices else i for i in range(num_systems)]
+    out = list(indices) + [i + num_systems for i in indices]
+    size = tensor.shape[0] ** len(indices)
+    return einsum(tensor, rows + cols, out).reshape(size, size)
+
+
+def _correlated_groups(marginal, num_systems: int, atol: float) -> Tuple[List[List[int]], List[array]]:
+    singles = [marginal([i]) for i in range(num_systems)]
+    # subsystems with a pure reduced state are uncorrelated with all others
+    pure = [abs(trace(rho @ rho) - 1) < atol for rho in singles]
+
+    parent = list(range(num_systems))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(num_systems):
+        for j in range(i + 1, num_systems):
+            if pure[i] or pure[j] or find(i) == find(j):
+                continue
+            if not allclose(marginal([i, j]), kron(singles[i], singles[j]), rtol=0, atol=atol):
+                parent[find(j)] = find(i)
+
+    groups = {}
+    for i in range(num_systems):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values()), singles
+
+
+def factorize_ket(state: array, num_systems: int, dim: int = 2, atol: float = SEPARABILITY_TOLERANCE) \
+        -> List[Tuple[List[int], array]]:
+    """Function to split a state vector into a product of states of fewer subsystems.
+
+    Args:
+        state (array): state vector.
+        num_systems (int): number of subsystems of the state.
+        dim (int): dimension of each subsystem (default 2).
+        atol (float): absolute tolerance on amplitudes (default `SEPARABILITY_TOLERANCE`).
+
+    Returns:
+        List[Tuple[List[int], array]]: (indices of subsystems, state vector) for each factor, ordered by first index.
+            The state is returned as a single factor if it cannot be split.
+    """
+
+    if num_systems == 1:
+        return [([0], state)]
+
+    tensor = state.reshape((dim,) * num_systems)
+    groups, _ = _correlated_groups(lambda indices: _ket_marginal(tensor, indices), num_systems, atol)
+    if len(groups) == 1:
+        return [(groups[0], state)]
+
+    # all columns of the group matrix are proportional to the group state; use the largest
+    factors = []
+    product = array([1])
+    for group in groups:
+        mat = moveaxis(tensor, group, list(range(len(group)))).reshape(dim ** len(group), -1)
+        column = mat[:, (abs(mat) ** 2).sum(axis=0).argmax()]
+        largest = column[abs(column).argmax()]
+        factor = column * (abs(largest) / largest) / sqrt(vdot(column, column).real)
+        factors.append(factor)
+        product = kron(product, factor)
+
+    # verify, and move the global phase to the first factor (other factors have a positive largest amplitude)
+    order = tuple(i for group in groups for i in group)
+    target = permute_ket(state, order, dim)
+    overlap = vdot(product, target)
+    phase = overlap / abs(overlap) if abs(overlap) > 0 else 1
+    if not allclose(phase * product, target, rtol=0, atol=atol):
+        return [(list(range(num_systems)), state)]
+    factors[0] = phase * factors[0]
+    return list(zip(groups, factors))
+
+
+def factorize_density(state: array, num_systems: int, dim: int = 2, atol: float = SEPARABILITY_TOLERANCE) \
+        -> List[Tuple[List[int], array]]:
+    """Function to split a density matrix into a product of density matrices of fewer subsystems.
+
+    Args:
+        state (array): density matrix.
+        num_systems (int): number of subsystems of the state.
+        dim (int): dimension of each subsystem (default 2).
+        atol (float): absolute tolerance on matrix elements (default `SEPARABILITY_TOLERANCE`).
+
+    Returns:
+        List[Tuple[List[int], array]]: (indices of subsystems, density matrix) for each factor, ordered by first index.
+            The state is returned as a single factor if it cannot be split.
+    """
+
+    if num_systems == 1:
+        return [([0], state)]
+
+    tensor = state.reshape((dim,) * 2 * num_systems)
+    groups, singles = _correlated_groups(lambda indices: _density_marginal(tensor, indices), num_systems, atol)
+    if len(groups) == 1:
+        return [(groups[0], state)]
+
+    factors = [singles[group[0]] if len(group) == 1 else _density_marginal(tensor, group) for group in groups]
+    product = array([[1]])
+    for factor in factors:
+        product = kron(product, factor)
+
+    order = tuple(i for group in groups for i in group)
+    if not allclose(product, permute_density(state, order, dim), rtol=0, atol=atol):
+        return [(list(range(num_systems)), state)]
+    return list(zip(groups, factors))
+
+
+# stabilizer tableau utilities
+# A tableau for n qubits is an int8 array of shape (n, 2n + 1).
+# Row i holds stabilizer generator i as X bits (columns 0..n-1), Z bits (columns n..2n-1) and a sign bit (column 2n),
+# where the sign bit is 1 for a -1 phase.
+
+_pauli_matrices = {(0, 0): identity(2),
+                   (1, 0): array([[0, 1], [1, 0]]),
+                   (1, 1): array([[0, -1j], [1j, 0]]),
+                   (0, 1): array([[1, 0], [0, -1]])}
+
+
+def _pauli_matrix(row) -> array:
+    n = (len(row) - 1) // 2
+    mat = array([[1]])
+    for i in range(n):
+        mat = kron(mat, _pauli_matrices[(int(row[i]), int(row[n + i]))])
+    return -mat if row[-1] else mat
+
+
+def _gf2_rank(rows: List[array]) -> int:
+    rows = [r.copy() for r in rows]
+    rank = 0
+    for col in range(len(rows[0]) if rows else 0):
+        pivot = next((i for i in range(rank, len(rows)) if rows[i][col]), None)
+        if pivot is None:
+            continue
+        rows[rank], rows[pivot] = rows[pivot], rows[rank]
+        for i in range(len(rows)):
+            if i != rank and rows[i][col]:
+                rows[i] ^= rows[rank]
+        rank += 1
+    return rank
+
+
+def ket_to_stabilizer(amplitudes: List[complex]) -> array:
+    """Function to get the stabilizer tableau of a pure state.
+
+    Uses a search over all Pauli operators, so should only be used for states of a few qubits.
+    Results are cached.
+
+    Args:
+        amplitudes (List[complex]): state vector of the state.
+
+    Returns:
+        array: stabilizer tableau of the state.
+
+    Raises:
+        ValueError: if the state is not a stabilizer state.
+    """
+
+    return _stabilizer_tableau(array(amplitudes, dtype=complex).tobytes()).copy()
+
+
+@lru_cache(maxsize=128)
+def _stabilizer_tableau(amplitudes: bytes) -> array:
+    # stabilizer tableau of a state vector, cached by the state data (protocols reuse the same states)
+    state = frombuffer(amplitudes, dtype=complex)
+    n = len(state).bit_length() - 1
+    assert 2 ** n == len(state), "length of amplitudes should be a power of 2"
+
+    generators = []
+    for index in range(1, 4 ** n):
+        row = zeros(2 * n + 1, dtype="int8")
+        for i in range(n):
+            x, z = [(0, 0), (1, 0), (1, 1), (0, 1)][(index >> (2 * (n - 1 - i))) & 3]
+            row[i], row[n + i] = x, z
+        expectation = (state.conj() @ _pauli_matrix(row) @ state).real
+        if abs(abs(expectation) - 1) > 1e-6:
+            continue
+        row[-1] = expectation < 0
+        if _gf2_rank([g[:-1] for g in generators] + [row[:-1]]) > len(generators):
+            generators.append(row)
+            if len(generators) == n:
+                break
+
+    if len(generators) < n:
+        raise ValueError("state {} is not a stabilizer state".format(state))
+
+    return array(generators, dtype="int8").reshape((n, 2 * n + 1))
+
+
+def stabilizer_to_ket(tableau: array) -> array:
+    """Function to get the state vector of a stabilizer tableau (up to a global phase).
+
+    The state is built with dense projectors, so should only be used for states of a few qubits.
+    The first nonzero amplitude of the returned state is real and positive.
+
+    Args:
+        tableau (array): stabilizer tableau.
+
+    Returns:
+        array: state vector.
+    """
+
+    n = len(tableau)
+    projector = identity(2 ** n, dtype=complex)
+    for row in tableau:
+        projector = projector @ (identity(2 ** n) + _pauli_matrix(row)) / 2
+
+    for column in projector.T:
+        norm = sqrt((column.conj() @ column).real)
+        if norm > 1e-6:
+            state = column / norm
+            first = state[abs(state) > 1e-6][0]
+            return state * abs(first) / first
+
+
+def stabilizer_direct_sum(tableaus: List[array]) -> array:
+    """Function to get the tableau of a product of stabilizer states.
+
+    Args:
+        tableaus (List[array]): tableaus of the states, in order of the qubits of the product state.
+
+    Returns:
+        array: tableau of the product state.
+    """
+
+    n = sum(len(t) for t in tableaus)
+    combined = zeros((n, 2 * n + 1), dtype="int8")
+    offset = 0
+    for t in tableaus:
+        m = len(t)
+        combined[offset:offset + m, offset:offset + m] = t[:, :m]
+        combined[offset:offset + m, n + offset:n + offset + m] = t[:, m:2 * m]
+        combined[offset:offset + m, -1] = t[:, -1]
+        offset += m
+    return combined
+
+
+def stabilizer_rowsum(tableau: array, h: int, i: int) -> None:
+    """Function to multiply generator `h` of a tableau by generator `i` (in place), tracking the phase."""
+
+    n = len(tableau)
+    x1, z1 = tableau[i, :n], tableau[i, n:2 * n]
+    x2, z2 = tableau[h, :n], tableau[h, n:2 * n]
+    # exponent of i picked up by multiplying each pair of single qubit Paulis
+    g = x1 * z1 * (z2 - x2) + x1 * (1 - z1) * z2 * (2 * x2 - 1) + (1 - x1) * z1 * x2 * (1 - 2 * z2)
+    total = 2 * int(tableau[h, -1]) + 2 * int(tableau[i, -1]) + int(g.sum())
+    tableau[h, :2 * n] ^= tableau[i, :2 * n]
+    tableau[h, -1] = (total % 4) // 2
+
+
+def stabilizer_apply_gate(tableau: array, name: str, indices: List[int], arg=None) -> None:
+    """Function to apply a Clifford gate to a stabilizer tableau (in place).
+
+    Args:
+        tableau (array): stabilizer tableau.
+        name (str): name of gate (as used by the `Circuit` class).
+        indices (List[int]): qubit indices of the gate.
+        arg (float): argument of parameterized gates (default None).
+
+    Raises:
+        ValueError: if the gate is not a Clifford gate.
+    """
+
+    n = len(tableau)
+    r = tableau[:, -1]
+    if name == 'h':
+        a = indices[0]
+        r ^= tableau[:, a] & tableau[:, n + a]
+        tableau[:, [a, n + a]] = tableau[:, [n + a, a]]
+    elif name == 's':
+        a = indices[0]
+        r ^= tableau[:, a] & tableau[:, n + a]
+        tableau[:, n + a] ^= tableau[:, a]
+    elif name == 'x':
+        r ^= tableau[:, n + indices[0]]
+    elif name == 'z':
+        r ^= tableau[:, indices[0]]
+    elif name == 'y':
+        r ^= tableau[:, indices[0]] ^ tableau[:, n + indices[0]]
+    elif name == 'cx':
+        a, b = indices
+        r ^= tableau[:, a] & tableau[:, n + b] & (tableau[:, b] ^ tableau[:, n + a] ^ 1)
+        tableau[:, b] ^= tableau[:, a]
+        tableau[:, n + a] ^= tableau[:, n + b]
+    elif name == 'swap':
+        a, b = indices
+        tableau[:, [a, b, n + a, n + b]] = tableau[:, [b, a, n + b, n + a]]
+    elif name == 'phase' and abs((arg / (pi / 2)) - round(arg / (pi / 2))) < 1e-9:
+        for _ in range(int(round(arg / (pi / 2))) % 4):
+            stabilizer_apply_gate(tableau, 's', indices)
+    else:
+        raise ValueError("gate {} is not supported by the stabilizer formalism".format(name))
+
+
+def stabilizer_measure(tableau: array, index: int, meas_samp: float) -> Tuple[int, array, float]:
+    """Function to measure a qubit of a stabilizer state in the computational basis.
+
+    The measured qubit is removed from the returned tableau (it is left in the state |result>).
+
+    Args:
+        tableau (array): stabilizer tableau (modified in place).
+        index (int): index of qubit to measure.
+        meas_samp (float): random sample in [0, 1) used for a random result.
+
+    Returns:
+        Tuple[int, array, float]: Tuple containing:
+            1. measurement result.
+            2. tableau of the remaining qubits.
+            3. unused part of the random sample, rescaled to [0, 1) (unchanged if the result was deterministic).
+    """
+
+    n = len(tableau)
+    a = index
+
+    rows = [i for i in range(n) if tableau[i, a]]
+    if rows:
+        # random result; replace an anticommuting generator with +-Z_a
+        p = rows[0]
+        for i in rows[1:]:
+            stabilizer_rowsum(tableau, i, p)
+        tableau[p, :] = 0
+        tableau[p, n + a] = 1
+        if meas_samp < 0.5:
+            meas_samp *= 2
+        else:
+            tableau[p, -1] = 1
+            meas_samp = meas_samp * 2 - 1
+
+    # all generators commute with Z_a: isolate +-Z_a in a single generator
+    rows = [i for i in range(n) if tableau[i, n + a]]
+    p = rows[0]
+    for i in rows[1:]:
+        stabilizer_rowsum(tableau, i, p)
+    others = [i for i in range(n) if i != p]
+    columns = [c for c in range(2 * n) if c != a and c != n + a]
+    pivot_row = 0
+    for c in columns:
+        pivot = next((others[j] for j in range(pivot_row, len(others)) if tableau[others[j], c]), None)
+        if pivot is None:
+            continue
+        j = others.index(pivot)
+        others[pivot_row], others[j] = others[j], others[pivot_row]
+        for i in others:
+            if i != pivot and tableau[i, c]:
+                stabilizer_rowsum(tableau, i, pivot)
+        if tableau[p, c]:
+            stabilizer_rowsum(tableau, p, pivot)
+        pivot_row += 1
+
+    result = int(tableau[p, -1])
+    keep = [i for i in range(n) if i != p]
+    keep_columns = [c for c in range(2 * n + 1) if c != a and c != n + a]
+    remaining = tableau[keep][:, keep_columns]
+    return result, remaining, meas_samp
+
+
+# Bell diagonal state utilities
+# Coefficients of Bell diagonal states are ordered as (Phi+, Phi-, Psi+, Psi-).
+# The index of a Bell state is 2x + z, where X^x Z^z applied to one qubit of Phi+ gives the state,
+# so Pauli operations and Bell measurements act on coefficients through XOR of indices.
+
+BELL_BASIS = array([[1, 0, 0, 1], [1, 0, 0, -1], [0, 1, 1, 0], [0, 1, -1, 0]]) / sqrt(2)
+_bell_projectors = [outer(b, b) for b in BELL_BASIS]
+
+
+def bell_diagonal_to_density(diag) -> array:
+    """Function to get the density matrix of a Bell diagonal state.
+
+    Args:
+        diag (array): coefficients of the Bell states.
+
+    Returns:
+        array: 4x4 density matrix.
+    """
+
+    return sum(c * p for c, p in zip(diag, _bell_projectors))
+
+
+def density_to_bell_diagonal(state) -> "array | None":
+    """Function to get the Bell state coefficients of a two-qubit density matrix.
+
+    Args:
+        state (array): 4x4 density matrix (or state vector of length 4).
+
+    Returns:
+        array: coefficients of the Bell states, or None if the state is not Bell diagonal.
+    """
+
+    state = array(state, dtype=complex)
+    if state.ndim == 1:
+        state = outer(state, state.conj())
+    diag = array([(b @ state @ b).real for b in BELL_BASIS])
+    if abs(state - bell_diagonal_to_density(diag)).max() > 1e-9:
+        return None
+    return diag
+
+
+def bell_diagonal_purification_density(diag_kept, diag_meas, result: int) -> array:
+    """Function to get the state of two Bell diagonal pairs after one side of a BBPSSW purification round.
+
+    The pairs are (a, b) (kept) and (c, d) (measured).
+    A CNOT gate is applied from qubit a to qubit c, and c is measured with the given result.
+
+    Args:
+        diag_kept (array): coefficients of the kept pair.
+        diag_meas (array): coefficients of the measured pair.
+        result (int): measurement result of qubit c.
+
+    Returns:
+        array: 8x8 density matrix of qubits (a, b, d).
+    """
+
+    rho = kron(bell_diagonal_to_density(diag_kept), bell_diagonal_to_density(diag_meas))
+    cnot = zeros((16, 16))
+    for i in range(16):
+        j = i ^ 2 if i & 8 else i  # qubit a (bit 3) controls qubit c (bit 1)
+        cnot[j, i] = 1
+    rho = (cnot @ rho @ cnot.T).reshape([2] * 8)
+    rho = rho[:, :, result, :, :, :, result, :].reshape(8, 8)
+    return rho / trace(rho).real
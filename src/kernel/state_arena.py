@@ -0,0 +1,164 @@
+"""Array-backed storage of quantum states.
+
+This module defines the StateArena class, which may be used by a quantum manager in place of a dictionary of states.
+States of few subsystems (single memories, entangled pairs) are kept as rows of preallocated arrays
+instead of individual state objects, which reduces the memory used per state and the objects created by the manager.
+State objects are only created when a state is accessed, and larger groups are stored as state objects.
+"""
+
+from typing import Dict, Iterator, List, Tuple, Type
+
+from numpy import zeros, empty, concatenate
+
+from .quantum_state import State
+
+
+class _StateTable:
+    """Class of preallocated rows for states of a fixed number of subsystems.
+
+    Attributes:
+        states (np.array): state of each row.
+        keys (np.array): keys of the state of each row.
+        refs (List[int]): number of keys pointing to each row (0 for free rows).
+        free (List[int]): indices of free rows.
+        views (List[State]): state objects created for each row (None if not created).
+    """
+
+    def __init__(self, size: int, shape: Tuple[int], capacity: int):
+        self.states = zeros((capacity,) + shape, dtype=complex)
+        self.keys = empty((capacity, size), dtype=int)
+        self.refs: List[int] = [0] * capacity
+        self.free: List[int] = list(range(capacity - 1, -1, -1))
+        self.views: List[State] = [None] * capacity
+
+    def allocate(self) -> int:
+        if not self.free:
+            capacity = len(self.refs)
+            self.states = concatenate([self.states, zeros(self.states.shape, dtype=complex)])
+            self.keys = concatenate([self.keys, empty(self.keys.shape, dtype=int)])
+            self.refs += [0] * capacity
+            self.views += [None] * capacity
+            self.free = list(range(2 * capacity - 1, capacity - 1, -1))
+        return self.free.pop()
+
+
+class StateArena:
+    """Class of array-backed storage of quantum states, indexed by key.
+
+    The arena supports the dictionary operations used with `QuantumManager.states`.
+    States of up to `max_size` subsystems are added with `assign` and kept in arrays;
+    accessing a key gives a state object (of `state_class`) created on first access and kept until the state changes.
+    Larger states and other objects are stored as given.
+
+    Attributes:
+        state_class (Type[State]): class of states in the arena (`KetState` or `DensityState`).
+        truncation (int): truncation of the subsystems of states.
+        max_size (int): largest number of subsystems of states kept in arrays.
+        tables (Dict[int, _StateTable]): storage for each number of subsystems.
+        rows (Dict[int, Tuple[int, int]]): number of subsystems and row of the state at each stored key.
+        objects (Dict[int, any]): objects stored at keys outside of the arrays.
+    """
+
+    def __init__(self, state_class: Type[State], truncation: int = 1, matrix: bool = False, max_size: int = 2,
+                 capacity: int = 1024):
+        """Constructor of the state arena.
+
+        Args:
+            state_class (Type[State]): class of states in the arena.
+            truncation (int): truncation of the subsystems of states (default 1 for qubits).
+            matrix (bool): if states are stored as density matrices (default False for state vectors).
+            max_size (int): largest number of subsystems of states kept in arrays (default 2).
+            capacity (int): initial number of rows for each number of subsystems (default 1024).
+        """
+
+        self.state_class = state_class
+        self.truncation = truncation
+        self.max_size = max_size
+        dim = truncation + 1
+        self.tables: Dict[int, _StateTable] = {}
+        for size in range(1, max_size + 1):
+            shape = (dim ** size, dim ** size) if matrix else (dim ** size,)
+            self.tables[size] = _StateTable(size, shape, capacity)
+        self.rows: Dict[int, Tuple[int, int]] = {}
+        self.objects: Dict[int, any] = {}
+
+    def assign(self, keys: List[int], state) -> None:
+        """Method to store a state of the given keys.
+
+        Args:
+            keys (List[int]): keys of the subsystems of the state.
+            state (array): state vector or density matrix.
+        """
+
+        size = len(keys)
+        if size > self.max_size:
+            state_obj = self.state_class.trusted(state, keys, self.truncation)
+            for key in keys:
+                self[key] = state_obj
+            return
+
+        table = self.tables[size]
+        row = table.allocate()
+        table.states[row] = state
+        table.keys[row] = keys
+        for key in keys:
+            self._release(key)
+            self.rows[key] = (size, row)
+        table.refs[row] = size
+
+    def _release(self, key: int) -> None:
+        location = self.rows.pop(key, None)
+        if location is None:
+            self.objects.pop(key, None)
+            return
+        table = self.tables[location[0]]
+        row = location[1]
+        table.refs[row] -= 1
+        if table.refs[row] == 0:
+            table.views[row] = None
+            table.free.append(row)
+
+    def __getitem__(self, key: int):
+        location = self.rows.get(key)
+        if location is None:
+            return self.objects[key]
+        table = self.tables[location[0]]
+        row = location[1]
+        view = table.views[row]
+        if view is None:
+            view = self.state_class.trusted(table.states[row].copy(), table.keys[row].tolist(), self.truncation)
+            table.views[row] = view
+        return view
+
+    def __setitem__(self, key: int, value) -> None:
+        self._release(key)
+        self.objects[key] = value
+
+    def __delitem__(self, key: int) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._release(key)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self.rows or key in self.objects
+
+    def __iter__(self) -> Iterator[int]:
+        yield from self.rows
+        yield from self.objects
+
+    def __len__(self) -> int:
+        return len(self.rows) + len(self.objects)
+
+    def get(self, key: int, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
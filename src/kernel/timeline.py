@@ -4,12 +4,14 @@ This module defines the Timeline class, which provides an interface for the simu
 All entities are required to have an attached timeline for simulation.
 """
 
+import os
 from _thread import start_new_thread
+from copy import deepcopy
 from datetime import timedelta
 from math import inf
 from sys import stdout
 from time import time_ns, sleep
-from typing import TYPE_CHECKING, Optional, Dict, Union
+from typing import TYPE_CHECKING, Any, Optional, Dict, List, Union
 
 from numpy import random
 
@@ -17,14 +19,21 @@ if TYPE_CHECKING:
     from .event import Event
     from .entity import Entity
 
-from .eventlist import EventList
+from .eventlist import EventList, EVENT_QUEUES, HEAP_EVENT_QUEUE
+from .profiler import EventProfiler
 from ..utils import log
+from ..utils.metrics import Metrics
 from .quantum_manager import (QuantumManagerKet,
                               QuantumManagerDensity,
                               QuantumManagerDensityFock,
                               KET_STATE_FORMALISM,
                               DENSITY_MATRIX_FORMALISM,
-                              FOCK_DENSITY_MATRIX_FORMALISM)
+                              QuantumManagerStabilizer,
+                              FOCK_DENSITY_MATRIX_FORMALISM,
+                              STABILIZER_FORMALISM,
+                              QuantumManagerBellDiagonal,
+                              BELL_DIAGONAL_FORMALISM,
+                              DICT_STATE_STORAGE)
 
 CARRIAGE_RETURN = '\r'
 SLEEP_SECONDS = 3
@@ -49,7 +58,7 @@ class Timeline:
     To monitor the progress of simulation, the Timeline.show_progress attribute can be modified to show/hide a progress bar.
 
     Attributes:
-        events (EventList): the event list of timeline.
+        events (EventList): the event list of timeline (heap, calendar queue or ladder queue).
         entities (List[Entity]): the entity list of timeline used for initialization.
         time (int): current simulation time (picoseconds).
         stop_time (int): the stop (simulation) time of the simulation.
@@ -58,17 +67,29 @@ class Timeline:
         is_running (bool): records if the simulation has stopped executing events.
         show_progress (bool): show/hide the progress bar of simulation.
         quantum_manager (QuantumManager): quantum state manager.
+        metrics (Metrics): registry of counters, histograms and time series updated by protocols.
+        metrics_file (str): file to export metrics to at the end of `run` (JSON if ending with ".json", else CSV).
+        profiler (EventProfiler): execution time statistics per event type (None unless profiling is enabled).
+        fork_pids (List[int]): process ids of children created by `fork`.
     """
 
-    def __init__(self, stop_time=inf, formalism=KET_STATE_FORMALISM, truncation=1):
+    def __init__(self, stop_time=inf, formalism=KET_STATE_FORMALISM, truncation=1, compaction_ratio=0.5,
+                 event_queue=HEAP_EVENT_QUEUE, state_storage=DICT_STATE_STORAGE):
         """Constructor for timeline.
 
         Args:
             stop_time (int): stop time (in ps) of simulation (default inf).
-            formalism (str): formalism of quantum state representation.
+            formalism (str): formalism of quantum state representation (ket vector, density matrix,
+                Fock density matrix, stabilizer or Bell diagonal).
             truncation (int): truncation of Hilbert space (currently only for Fock representation).
+            compaction_ratio (float): fraction of removed events in the event list that triggers compaction (default 0.5).
+            event_queue (str): event queue implementation, one of "heap", "calendar" or "ladder" (default "heap").
+            state_storage (str): storage of quantum states, "dict" or "arena" (default "dict").
+                Arena storage is only available for the ket vector, density matrix and Fock formalisms.
         """
-        self.events: EventList = EventList()
+        if event_queue not in EVENT_QUEUES:
+            raise ValueError(f"Invalid event queue {event_queue}")
+        self.events: EventList = EVENT_QUEUES[event_queue](compaction_ratio)
         self.entities: Dict[str, "Entity"] = {}
         self.time: Union[int, float] = 0
         self.stop_time: Union[int, float] = stop_time
@@ -76,13 +97,23 @@ class Timeline:
         self.run_counter: int = 0
         self.is_running: bool = False
         self.show_progress: bool = False
+        self.fork_pids: List[int] = []
+        self.metrics: Metrics = Metrics()
+        self.metrics_file: Optional[str] = None
+        self.profiler: Optional[EventProfiler] = None
 
         if formalism == KET_STATE_FORMALISM:
-            self.quantum_manager = QuantumManagerKet()
+            self.quantum_manager = QuantumManagerKet(storage=state_storage)
         elif formalism == DENSITY_MATRIX_FORMALISM:
-            self.quantum_manager = QuantumManagerDensity()
+            self.quantum_manager = QuantumManagerDensity(storage=state_storage)
         elif formalism == FOCK_DENSITY_MATRIX_FORMALISM:
-            self.quantum_manager = QuantumManagerDensityFock(truncation=truncation)
+            self.quantum_manager = QuantumManagerDensityFock(truncation=truncation, storage=state_storage)
+        elif state_storage != DICT_STATE_STORAGE:
+            raise ValueError(f"Invalid state storage {state_storage} for formalism {formalism}")
+        elif formalism == STABILIZER_FORMALISM:
+            self.quantum_manager = QuantumManagerStabilizer()
+        elif formalism == BELL_DIAGONAL_FORMALISM:
+            self.quantum_manager = QuantumManagerBellDiagonal()
         else:
             raise ValueError(f"Invalid formalism {formalism}")
 
@@ -92,15 +123,19 @@ class Timeline:
         return self.time
 
     def schedule(self, event: "Event") -> None:
-        """Method to schedule an event."""
-        if type(event.process.owner) is str:
-            event.process.owner = self.get_entity_by_name(event.process.owner)
+        """Method to schedule an event.
+
+        Processes created with the name of their owner are bound to the named entity.
+        """
+        if event.process._func is None:
+            event.process.bind(self.entities[event.process.owner])
         self.schedule_counter += 1
         self.events.push(event)
 
     def init(self) -> None:
         """Method to initialize all simulated entities."""
-        log.logger.info("Timeline initial network")
+        if log.is_enabled("timeline"):
+            log.logger.info("Timeline initial network")
 
         for entity in self.entities.values():
             entity.init()
@@ -111,20 +146,42 @@ class Timeline:
         The `run` method begins simulation of events.
         Events are continuously popped and executed, until the simulation time limit is reached or events are exhausted.
         A progress bar may also be displayed, if the `show_progress` flag is set.
+        Metrics are exported at the end of the simulation, if the `metrics_file` attribute is set.
+        If profiling is enabled (see `enable_profiling`), the execution time of each event is recorded.
+        Circuits deferred by the quantum manager (see `QuantumManager.defer_circuit`) are run before time advances.
         """
-        log.logger.info("Timeline start simulation")
+        if log.is_enabled("timeline"):
+            log.logger.info("Timeline start simulation")
         tick = time_ns()
         self.is_running = True
 
         if self.show_progress:
             self.progress_bar()
 
-        while len(self.events) > 0:
+        if self.profiler is not None:
+            self._run_profiled()
+        else:
+            self._run()
+
+        self.is_running = False
+        time_elapsed = time_ns() - tick
+        if self.metrics_file is not None:
+            self.metrics.export(self.metrics_file)
+        '''
+        log.logger.info("Timeline end simulation. Execution Time: %d ns; Scheduled Event: %d; Executed Event: %d" %
+                        (time_elapsed, self.schedule_counter, self.run_counter))
+        '''
+
+    def _run(self) -> None:
+        quantum_manager = self.quantum_manager
+        while len(self.events) > 0 or quantum_manager.deferred:
+            if quantum_manager.deferred and (len(self.events) == 0 or self.events.top().time > self.time):
+                quantum_manager.flush()  # run circuits deferred at the current time (may schedule events)
+                continue
+            if self.events.top().time >= self.stop_time:
+                break  # leave event in event list
             event = self.events.pop()
-            
-            if event.time >= self.stop_time:
-                self.schedule(event)  # return to event list
-                break
+
             assert self.time <= event.time, f"invalid event time for process scheduled on {event.process.owner}"
             if event.is_invalid():
                 continue
@@ -132,21 +189,67 @@ class Timeline:
             self.time = event.time
             event.process.run()
             self.run_counter += 1
+        quantum_manager.flush()
+
+    def _run_profiled(self) -> None:
+        record = self.profiler.record
+        quantum_manager = self.quantum_manager
+        while len(self.events) > 0 or quantum_manager.deferred:
+            if quantum_manager.deferred and (len(self.events) == 0 or self.events.top().time > self.time):
+                quantum_manager.flush()  # run circuits deferred at the current time (may schedule events)
+                continue
+            if self.events.top().time >= self.stop_time:
+                break  # leave event in event list
+            event = self.events.pop()
+
+            assert self.time <= event.time, f"invalid event time for process scheduled on {event.process.owner}"
+            if event.is_invalid():
+                continue
+
+            self.time = event.time
+            start = time_ns()
+            event.process.run()
+            record(event.process, time_ns() - start)
+            self.run_counter += 1
+        quantum_manager.flush()
+
+    def enable_profiling(self) -> EventProfiler:
+        """Method to record execution time statistics per event type in subsequent calls to `run`.
+
+        Returns:
+            EventProfiler: profiler attached to the timeline (also available as the `profiler` attribute).
+        """
+
+        if self.profiler is None:
+            self.profiler = EventProfiler()
+        return self.profiler
+
+    def disable_profiling(self) -> None:
+        """Method to stop recording execution time statistics."""
+
+        self.profiler = None
 
-        self.is_running = False
-        time_elapsed = time_ns() - tick
-        '''
-        log.logger.info("Timeline end simulation. Execution Time: %d ns; Scheduled Event: %d; Executed Event: %d" %
-                        (time_elapsed, self.schedule_counter, self.run_counter))
-        '''
     def stop(self) -> None:
         """Method to stop simulation."""
-        log.logger.info("Timeline is stopped")
+        if log.is_enabled("timeline"):
+            log.logger.info("Timeline is stopped")
         self.stop_time = self.now()
 
     def remove_event(self, event: "Event") -> None:
         self.events.remove(event)
 
+    def get_event_stats(self) -> Dict[str, int]:
+        """Method to get statistics of the event list.
+
+        Returns:
+            Dict[str, int]: number of live (valid) and dead (removed) entries in the event list,
+                and the number of compactions performed.
+        """
+
+        return {"live": self.events.live_count(),
+                "dead": self.events.dead_count,
+                "compactions": self.events.compaction_count}
+
     def update_event_time(self, event: "Event", time: int) -> None:
         """Method to change execution time of an event.
 
@@ -157,6 +260,78 @@ class Timeline:
 
         self.events.update_event_time(event, time)
 
+    def snapshot(self) -> "TimelineSnapshot":
+        """Method to capture the current state of the simulation.
+
+        The snapshot holds a deep copy of the event list, all entities (including node random generators),
+        the quantum manager and the global numpy random state.
+        It can be restored any number of times with the `restore` method.
+
+        Returns:
+            TimelineSnapshot: captured simulation state.
+        """
+
+        assert not self.is_running, "cannot take a snapshot of a running timeline"
+        state = deepcopy(self.__dict__, {id(self): self})
+        return TimelineSnapshot(self, state, random.get_state())
+
+    def restore(self, snapshot: "TimelineSnapshot") -> None:
+        """Method to return the simulation to a captured state.
+
+        The timeline object itself is kept, but all entities are replaced by copies from the snapshot.
+        References to entities held outside of the timeline (e.g. by a topology) should be retrieved again
+        with `get_entity_by_name` after restoring.
+
+        Args:
+            snapshot (TimelineSnapshot): state captured with the `snapshot` method (possibly of another timeline).
+        """
+
+        assert not self.is_running, "cannot restore a running timeline"
+        state = deepcopy(snapshot.state, {id(snapshot.timeline): self})
+        self.__dict__.update(state)
+        random.set_state(snapshot.global_random_state)
+
+    def fork(self, n: int) -> int:
+        """Method to continue the simulation in `n` child processes.
+
+        Uses `os.fork`, so children share the memory of the current simulation copy-on-write.
+        Each child should change its parameters or seeds, run the simulation and exit (e.g. with `os._exit`).
+        The parent process can wait for the children with `wait_forks`.
+
+        Args:
+            n (int): number of child processes.
+
+        Returns:
+            int: index of the child (0 to n - 1) in child processes, -1 in the parent process.
+        """
+
+        if not hasattr(os, "fork"):
+            raise NotImplementedError("Timeline.fork requires os.fork")
+        assert not self.is_running, "cannot fork a running timeline"
+
+        stdout.flush()
+        for i in range(n):
+            pid = os.fork()
+            if pid == 0:
+                self.fork_pids = []
+                return i
+            self.fork_pids.append(pid)
+        return -1
+
+    def wait_forks(self) -> List[int]:
+        """Method to wait for all child processes created by `fork`.
+
+        Returns:
+            List[int]: exit codes of the child processes, in order of creation.
+        """
+
+        exit_codes = []
+        for pid in self.fork_pids:
+            _, status = os.waitpid(pid, 0)
+            exit_codes.append(os.waitstatus_to_exitcode(status))
+        self.fork_pids = []
+        return exit_codes
+
     def add_entity(self, entity: "Entity") -> None:
         assert entity.name not in self.entities
         entity.timeline = self
@@ -202,3 +377,20 @@ class Timeline:
     @staticmethod
     def convert_to_nanoseconds(picoseconds: int) -> float:
         return picoseconds / PICOSECONDS_PER_NANOSECOND
+
+
+class TimelineSnapshot:
+    """Class of captured simulation state, created by `Timeline.snapshot`.
+
+    Attributes:
+        timeline (Timeline): timeline the snapshot was taken from.
+        time (int): simulation time of the snapshot.
+        state (Dict[str, Any]): deep copy of the timeline attributes (events, entities, quantum manager, etc.).
+        global_random_state (Tuple): state of the global numpy random generator.
+    """
+
+    def __init__(self, timeline: Timeline, state: Dict[str, Any], global_random_state):
+        self.timeline = timeline
+        self.time = state["time"]
+        self.state = state
+        self.global_random_state = global_random_state
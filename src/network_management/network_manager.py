@@ -56,7 +56,8 @@ class NetworkManager():
             protocol_stack (List[StackProtocol]): stack of protocols to use for processing.
         """
 
-        log.logger.info("Create network manager of Node {}".format(owner.name))
+        if log.is_enabled("network_manager"):
+            log.logger.info("Create network manager of Node {}".format(owner.name))
         self.name = "network_manager"
         self.owner = owner
         self.protocol_stack = protocol_stack
@@ -120,9 +121,10 @@ class NetworkManager():
             Will invoke `pop` method of 0 indexed protocol in `protocol_stack`.
         """
 
-        log.logger.info(
-            "{} network manager receives message {} from {}".format(
-                self.owner.name, msg.payload, src))
+        if log.is_enabled("network_manager"):
+            log.logger.info(
+                "{} network manager receives message {} from {}".format(
+                    self.owner.name, msg.payload, src))
         self.protocol_stack[0].pop(src=src, msg=msg.payload)
 
     def request(self, responder: str, start_time: int, end_time: int, memory_size: int, target_fidelity: float) -> None:
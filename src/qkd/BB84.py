@@ -164,7 +164,8 @@ class BB84(StackProtocol):
         if self.role != 0:
             raise AssertionError("generate key must be called from Alice")
 
-        log.logger.info(self.name + " generating keys, keylen={}, keynum={}".format(length, key_num))
+        if log.is_enabled("BB84"):
+            log.logger.info(self.name + " generating keys, keylen={}, keynum={}".format(length, key_num))
 
         self.key_lengths.append(length)
         self.another.key_lengths.append(length)
@@ -190,7 +191,8 @@ class BB84(StackProtocol):
             Will send a BEGIN_PHOTON_PULSE method to other protocol instance.
         """
 
-        log.logger.debug(self.name + " starting protocol")
+        if log.is_enabled("BB84", log.DEBUG):
+            log.logger.debug(self.name + " starting protocol")
 
         if len(self.key_lengths) > 0:
             # reset buffers for self and another
@@ -239,7 +241,8 @@ class BB84(StackProtocol):
             Will schedule another `begin_photon_pulse` event after the emit period.
         """
         
-        log.logger.debug(self.name + " starting photon pulse")
+        if log.is_enabled("BB84", log.DEBUG):
+            log.logger.debug(self.name + " starting photon pulse")
         
         if self.working and self.own.timeline.now() < self.end_run_times[0]:
             self.own.destination = self.another.own.name
@@ -286,7 +289,8 @@ class BB84(StackProtocol):
     def set_measure_basis_list(self) -> None:
         """Method to set measurement basis list."""
 
-        log.logger.debug(self.name + " setting measurement basis")
+        if log.is_enabled("BB84", log.DEBUG):
+            log.logger.debug(self.name + " setting measurement basis")
 
         num_pulses = int(self.light_time * self.ls_freq)
         basis_list = numpy.random.choice([0, 1], num_pulses)
@@ -296,7 +300,8 @@ class BB84(StackProtocol):
     def end_photon_pulse(self) -> None:
         """Method to process sent qubits."""
 
-        log.logger.debug(self.name + " ending photon pulse")
+        if log.is_enabled("BB84", log.DEBUG):
+            log.logger.debug(self.name + " ending photon pulse")
 
         if self.working and self.own.timeline.now() < self.end_run_times[0]:
             # get bits
@@ -331,7 +336,8 @@ class BB84(StackProtocol):
                 self.ls_freq = msg.frequency
                 self.light_time = msg.light_time
 
-                log.logger.debug(self.name + " received BEGIN_PHOTON_PULSE, ls_freq={}, light_time={}".format(self.ls_freq, self.light_time))
+                if log.is_enabled("BB84", log.DEBUG):
+                    log.logger.debug(self.name + " received BEGIN_PHOTON_PULSE, ls_freq={}, light_time={}".format(self.ls_freq, self.light_time))
 
                 self.start_time = int(msg.start_time) + self.own.qchannels[src].delay
 
@@ -344,13 +350,15 @@ class BB84(StackProtocol):
                 self.own.timeline.schedule(event)
 
             elif msg.msg_type is BB84MsgType.RECEIVED_QUBITS:  # (Current node is Alice): can send basis
-                log.logger.debug(self.name + " received RECEIVED_QUBITS message")
+                if log.is_enabled("BB84", log.DEBUG):
+                    log.logger.debug(self.name + " received RECEIVED_QUBITS message")
                 bases = self.basis_lists.pop(0)
                 message = BB84Message(BB84MsgType.BASIS_LIST, self.another.name, bases=bases)
                 self.own.send_message(self.another.own.name, message)
 
             elif msg.msg_type is BB84MsgType.BASIS_LIST:  # (Current node is Bob): compare bases
-                log.logger.debug(self.name + " received BASIS_LIST message")
+                if log.is_enabled("BB84", log.DEBUG):
+                    log.logger.debug(self.name + " received BASIS_LIST message")
                 # parse alice basis list
                 basis_list_alice = msg.bases
 
@@ -368,7 +376,8 @@ class BB84(StackProtocol):
                 self.own.send_message(self.another.own.name, message)
 
             elif msg.msg_type is BB84MsgType.MATCHING_INDICES:  # (Current node is Alice): create key from matching indices
-                log.logger.debug(self.name + " received MATCHING_INDICES message")
+                if log.is_enabled("BB84", log.DEBUG):
+                    log.logger.debug(self.name + " received MATCHING_INDICES message")
                 # parse matching indices
                 indices = msg.indices
 
@@ -383,7 +392,8 @@ class BB84(StackProtocol):
                     throughput = self.key_lengths[0] * 1e12 / (self.own.timeline.now() - self.last_key_time)
 
                     while len(self.key_bits) >= self.key_lengths[0] and self.keys_left_list[0] > 0:
-                        log.logger.info(self.name + " generated a valid key")
+                        if log.is_enabled("BB84"):
+                            log.logger.info(self.name + " generated a valid key")
                         self.set_key()  # convert from binary list to int
                         self._pop(info=self.key)
                         self.another.set_key()
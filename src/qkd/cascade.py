@@ -208,7 +208,8 @@ class Cascade(StackProtocol):
             info (int): key received.
         """
 
-        log.logger.debug(self.name + ' state={} get_key_from_BB84, key={}'.format(self.state, info))
+        if log.is_enabled("cascade", log.DEBUG):
+            log.logger.debug(self.name + ' state={} get_key_from_BB84, key={}'.format(self.state, info))
         self.bits.append(info)
         self.t1.append(self.own.timeline.now())
         self.t2.append(-1)
@@ -243,7 +244,8 @@ class Cascade(StackProtocol):
             """
             key = msg.key
 
-            log.logger.debug(self.name + ' state={} receive_key, key={}'.format(self.state, key))
+            if log.is_enabled("cascade", log.DEBUG):
+                log.logger.debug(self.name + ' state={} receive_key, key={}'.format(self.state, key))
 
             @lru_cache(maxsize=128)
             def get_k1(p, lower, upper):
@@ -293,7 +295,8 @@ class Cascade(StackProtocol):
             self.end_time = self.start_time + self.run_time
             self.state = 1
 
-            log.logger.debug(self.name + ' state={} receive_params with params={}'.format(self.state, [self.k1, self.keylen, self.frame_num]))
+            if log.is_enabled("cascade", log.DEBUG):
+                log.logger.debug(self.name + ' state={} receive_params with params={}'.format(self.state, [self.k1, self.keylen, self.frame_num]))
             if self.role == 0:
                 raise Exception("Cascade protocol sender '{}' got params message".format(self.name))
 
@@ -306,7 +309,8 @@ class Cascade(StackProtocol):
             key_id = msg.key_id
             checksums = msg.checksums
 
-            log.logger.debug(self.name + ' state={} receive_checksums'.format(self.state))
+            if log.is_enabled("cascade", log.DEBUG):
+                log.logger.debug(self.name + ' state={} receive_checksums'.format(self.state))
 
             while len(self.another_checksums) <= key_id:
                 self.another_checksums.append(None)
@@ -323,7 +327,8 @@ class Cascade(StackProtocol):
             start = msg.start
             end = msg.end
 
-            log.logger.debug(self.name + ' state={} send_for_binary, params={}'.format(self.state, [pass_id, block_id, start, end]))
+            if log.is_enabled("cascade", log.DEBUG):
+                log.logger.debug(self.name + ' state={} send_for_binary, params={}'.format(self.state, [pass_id, block_id, start, end]))
 
             checksum = 0
             block_id_to_index = self.block_id_to_index_lists[key_id]
@@ -347,7 +352,8 @@ class Cascade(StackProtocol):
             end = msg.end
             checksum = msg.checksum
 
-            log.logger.debug(self.name + ' state={} receive_for_binary, params={}'.format(self.state, [key_id, pass_id, block_id, start, end, checksum]))
+            if log.is_enabled("cascade", log.DEBUG):
+                log.logger.debug(self.name + ' state={} receive_for_binary, params={}'.format(self.state, [key_id, pass_id, block_id, start, end, checksum]))
 
             def flip_bit_at_pos(val, pos):
                 """
@@ -369,7 +375,8 @@ class Cascade(StackProtocol):
                 if end - start == 1:
                     pos = block_id_to_index[pass_id][block_id][start]
                     self.bits[key_id] = flip_bit_at_pos(key, pos)
-                    log.logger.debug(self.name + ' state={} ::: flip at {}'.format(self.state, pos))
+                    if log.is_enabled("cascade", log.DEBUG):
+                        log.logger.debug(self.name + ' state={} ::: flip at {}'.format(self.state, pos))
                     # update checksum_table
                     for _pass in range(1, len(checksum_table)):
                         _block = index_to_block_id[_pass][pos]
@@ -393,7 +400,8 @@ class Cascade(StackProtocol):
             for i in range(int(self.frame_len / self.keylen)):
                 self.valid_keys.append((self.bits[key_id] >> (i*self.keylen)) & ((1 << self.keylen)-1))
                 if self.frame_num > 0:
-                    log.logger.info(self.name + ' state={} got valid key'.format(self.state))
+                    if log.is_enabled("cascade"):
+                        log.logger.info(self.name + ' state={} got valid key'.format(self.state))
                     self._pop(key=self.valid_keys[-1])
                     self.frame_num -= 1
 
@@ -414,13 +422,15 @@ class Cascade(StackProtocol):
             run_time (int): max simulation time allowed for key generation (default inf).
         """
 
-        log.logger.info(self.name + ' state={} generate_key, keylen={}, keynum={}'.format(self.state, keylen, frame_num))
+        if log.is_enabled("cascade"):
+            log.logger.info(self.name + ' state={} generate_key, keylen={}, keynum={}'.format(self.state, keylen, frame_num))
         if self.role == 1:
             raise Exception(
                 "Cascase.generate_key() called on receiver '{}'".format(self.name))
 
         if self.state == 0:
-            log.logger.debug(self.name + ' generate_key with state 0')
+            if log.is_enabled("cascade", log.DEBUG):
+                log.logger.debug(self.name + ' generate_key with state 0')
             self.setup_time = self.own.timeline.now()
             self.keylen = keylen
             self.frame_num = frame_num
@@ -430,7 +440,8 @@ class Cascade(StackProtocol):
         else:
             self.start_time = self.own.timeline.now()
             self.end_time = self.start_time + self.run_time
-            log.logger.debug(self.name + ' generate_key with state ' + str(self.state))
+            if log.is_enabled("cascade", log.DEBUG):
+                log.logger.debug(self.name + ' generate_key with state ' + str(self.state))
             self._push(length=self.frame_len, key_num=self.frame_num, run_time=self.run_time)
 
     def create_checksum_table(self) -> None:
@@ -443,7 +454,8 @@ class Cascade(StackProtocol):
         """
 
         # create index_to_block_id
-        log.logger.debug(self.name + ' state={} create_checksum_table'.format(self.state))
+        if log.is_enabled("cascade", log.DEBUG):
+            log.logger.debug(self.name + ' state={} create_checksum_table'.format(self.state))
         index_to_block_id = [[]]
         for pass_id in range(1, self.w + 1):
             index_to_block_relation = []
@@ -515,14 +527,16 @@ class Cascade(StackProtocol):
             WILL send a KEY_IS_VALID method to other cascade protocols.
         """
 
-        log.logger.debug(self.name + ' state={} check_checksum'.format(self.state))
+        if log.is_enabled("cascade", log.DEBUG):
+            log.logger.debug(self.name + ' state={} check_checksum'.format(self.state))
         cur_key = key_id
         another_checksum = self.another_checksums[cur_key]
         block_id_to_index = self.block_id_to_index_lists[cur_key]
         for _pass in range(1, len(another_checksum)):
             for _block in range(len(another_checksum[_pass])):
                 if self.checksum_tables[cur_key][_pass][_block] != self.another_checksums[cur_key][_pass][_block]:
-                    log.logger.debug(self.name + ' state={} two checksums are different'.format(self.state, [cur_key, _pass, _block]))
+                    if log.is_enabled("cascade", log.DEBUG):
+                        log.logger.debug(self.name + ' state={} two checksums are different'.format(self.state, [cur_key, _pass, _block]))
                     block_size = len(block_id_to_index[_pass][_block])
                     self.interactive_binary_search(cur_key, _pass, _block, 0, block_size)
                     return False
@@ -530,7 +544,8 @@ class Cascade(StackProtocol):
         for i in range(int(self.frame_len / self.keylen)):
             self.valid_keys.append((self.bits[key_id] >> (i*self.keylen)) & ((1 << self.keylen)-1))
             if self.frame_num > 0:
-                log.logger.info(self.name + ' state={} got_valid_key'.format(self.state))
+                if log.is_enabled("cascade"):
+                    log.logger.info(self.name + ' state={} got_valid_key'.format(self.state))
                 self._pop(key=self.valid_keys[-1])
                 self.frame_num -= 1
 
@@ -565,8 +580,9 @@ class Cascade(StackProtocol):
             Will send SEND_FOR_BINARY messages to other protocol.
         """
 
-        log.logger.debug(self.name + ' state={} interactive_binary_search, params={}'.format(
-            self.state, [key_id, pass_id, block_id, start, end]))
+        if log.is_enabled("cascade", log.DEBUG):
+            log.logger.debug(self.name + ' state={} interactive_binary_search, params={}'.format(
+                self.state, [key_id, pass_id, block_id, start, end]))
 
         # first half checksum
         message = CascadeMessage(CascadeMsgType.SEND_FOR_BINARY, self.another.name,
@@ -121,7 +121,8 @@ class ResourceManager():
             bool: if rule was loaded successfully.
         """
 
-        log.logger.info('load rule {}'.format(rule))
+        if log.is_enabled("resource_manager"):
+            log.logger.info('load rule {}'.format(rule))
         self.rule_manager.load(rule)
 
         for memory_info in self.memory_manager:
@@ -143,7 +144,8 @@ class ResourceManager():
             rule (Rule): rule to remove.
         """
 
-        log.logger.info('expired rule {}'.format(rule))
+        if log.is_enabled("resource_manager"):
+            log.logger.info('expired rule {}'.format(rule))
         created_protocols = self.rule_manager.expire(rule)
         while created_protocols:
             protocol = created_protocols.pop()
@@ -231,8 +233,9 @@ class ResourceManager():
                                      req_condition_func=req_condition_func,
                                      req_args=req_args)
         self.owner.send_message(req_dst, msg)
-        log.logger.info(
-            "{} network manager send {} message to {}".format(self.owner.name, msg.msg_type.name, req_dst))
+        if log.is_enabled("resource_manager"):
+            log.logger.info(
+                "{} network manager send {} message to {}".format(self.owner.name, msg.msg_type.name, req_dst))
 
     def received_message(self, src: str, msg: "ResourceManagerMessage") -> None:
         """Method to receive resoruce manager messages.
@@ -244,9 +247,10 @@ class ResourceManager():
             msg (ResourceManagerMessage): message received.
         """
 
-        log.logger.info("{} receive {} message from {}".format(self.name,
-                                                               msg.msg_type.name,
-                                                               src))
+        if log.is_enabled("resource_manager"):
+            log.logger.info("{} receive {} message from {}".format(self.name,
+                                                                   msg.msg_type.name,
+                                                                   src))
         if msg.msg_type is ResourceManagerMsgType.REQUEST:
             protocol = msg.req_condition_func(self.waiting_protocols, msg.req_args)
             if protocol is not None:
@@ -90,7 +90,8 @@ class RuleManager:
         return self.resource_manager.get_memory_manager()
 
     def send_request(self, protocol, req_dst, req_condition_func, req_args):
-        log.logger.info('Rule manager send request for protocol {} to {}'.format(protocol.name, req_dst))
+        if log.is_enabled("rule_manager"):
+            log.logger.info('Rule manager send request for protocol {} to {}'.format(protocol.name, req_dst))
         return self.resource_manager.send_request(protocol, req_dst,
                                                   req_condition_func, req_args)
 
@@ -147,7 +148,8 @@ class Rule:
 
         protocol, req_dsts, req_condition_funcs, req_args = self.action(
             memories_info, self.action_args)
-        log.logger.info('Rule generates protocol {}'.format(protocol.name))
+        if log.is_enabled("rule_manager"):
+            log.logger.info('Rule generates protocol {}'.format(protocol.name))
 
         protocol.rule = self
         self.protocols.append(protocol)
@@ -61,7 +61,8 @@ class Node(Entity):
             Default is None.
         """
 
-        log.logger.info("Create Node {}".format(name))
+        if log.is_enabled("node"):
+            log.logger.info("Create Node {}".format(name))
         Entity.__init__(self, name, timeline)
         self.owner = self
         self.cchannels = {}  # mapping of destination node names to classical channels
@@ -125,7 +126,8 @@ class Node(Entity):
             msg (Message): message to transmit.
             priority (int): priority for transmitted message (default inf).
         """
-        log.logger.info("{} send message {} to {}".format(self.name, msg, dst))
+        if log.is_enabled("node"):
+            log.logger.info("{} send message {} to {}".format(self.name, msg, dst))
 
         if priority == inf:
             priority = self.timeline.schedule_counter
@@ -140,8 +142,9 @@ class Node(Entity):
             src (str): name of node sending the message.
             msg (Message): message transmitted from node.
         """
-        log.logger.info(
-            "{} receive message {} from {}".format(self.name, msg, src))
+        if log.is_enabled("node"):
+            log.logger.info(
+                "{} receive message {} from {}".format(self.name, msg, src))
         #print(msg)
         # signal to protocol that we've received a message
         if msg.receiver is not None:
@@ -286,7 +289,8 @@ class QuantumRouter(Node):
         self.app = None
 
     def receive_message(self, src: str, msg: "Message") -> None:
-        log.logger.info("{} receive message {} from {}".format(self.name, msg, src))
+        if log.is_enabled("node"):
+            log.logger.info("{} receive message {} from {}".format(self.name, msg, src))
         #print(msg)
         if msg.receiver == "resource_manager":
             self.resource_manager.received_message(src, msg)
@@ -358,7 +362,15 @@ class QuantumRouter(Node):
         self.network_manager.request(responder, start_time, end_time, memory_size, target_fidelity)
 
     def get_idle_memory(self, info: "MemoryInfo") -> None:
-        """Method for application to receive available memories."""
+        """Method for application to receive available memories.
+
+        Entangled memories are recorded in the timeline metrics ("delivered_fidelity" histogram and time series).
+        """
+
+        if info.state == "ENTANGLED":
+            metrics = self.timeline.metrics
+            metrics.observe("delivered_fidelity", info.fidelity, self.name)
+            metrics.record("delivered_fidelity", self.timeline.now(), info.fidelity, self.name)
 
         if self.app:
             self.app.get_memory(info)
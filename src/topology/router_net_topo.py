@@ -4,6 +4,7 @@ from numpy import mean
 
 from .topology import Topology as Topo
 from ..kernel.timeline import Timeline
+from ..kernel.quantum_manager import KET_STATE_FORMALISM, DICT_STATE_STORAGE
 from .node import BSMNode, QuantumRouter
 
 
@@ -62,7 +63,8 @@ class RouterNetTopo(Topo):
         if config.get(self.IS_PARALLEL, False):
             raise Exception("Please install 'psequence' package for parallel simulations.")
         else:
-            self.tl = Timeline(stop_time)
+            self.tl = Timeline(stop_time, formalism=config.get(Topo.FORMALISM, KET_STATE_FORMALISM),
+                               state_storage=config.get(Topo.STATE_STORAGE, DICT_STATE_STORAGE))
 
     def _map_bsm_routers(self, config):
         for qc in config[Topo.ALL_Q_CHANNEL]:
@@ -40,9 +40,11 @@ class Topology(ABC):
     DELAY = "delay"
     DISTANCE = "distance"
     DST = "destination"
+    FORMALISM = "formalism"
     NAME = "name"
     SEED = "seed"
     SRC = "source"
+    STATE_STORAGE = "state_storage"
     STOP_TIME = "stop_time"
     TYPE = "type"
     ALL_TEMPLATES = "templates"
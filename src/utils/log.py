@@ -4,6 +4,8 @@ This module defines the behavior for the default SeQUeNCe logging system.
 The logger used and log format are specified here.
 Modules will use the `logger` attribute as a normal logging system, saving log outputs in a user specified file.
 If a file is not set, no output will be recorded.
+Log calls should be guarded with `is_enabled`, so that no message is formatted (and no record is created)
+for modules that are not tracked or levels that are not enabled.
 
 Attributes:
     logger (Logger): logger object used for logging by sequence modules.
@@ -12,6 +14,7 @@ Attributes:
 """
 
 import logging
+from logging import DEBUG, INFO
 
 
 def _init_logger():
@@ -62,6 +65,20 @@ def set_logger_level(level: str):
     logger.setLevel(getattr(logging, level))
 
 
+def is_enabled(module_name: str, level: int = INFO) -> bool:
+    """Function to check if a log call would produce output, before building its message.
+
+    Args:
+        module_name (str): name of the module making the log call (file name without extension).
+        level (int): level of the log call (default INFO).
+
+    Returns:
+        bool: if the module is tracked and the logger is enabled for the level.
+    """
+
+    return module_name in _log_modules and logger.isEnabledFor(level)
+
+
 def track_module(module_name: str):
     """Sets a given module to be tracked by logger."""
 
@@ -85,6 +102,7 @@ class ContextFilter(logging.Filter):
         self.timeline = timeline
 
     def filter(self, record):
-        global _log_modules
+        if record.module not in _log_modules:
+            return False
         record.simtime = self.timeline.now()
-        return record.module in _log_modules
+        return True
@@ -0,0 +1,169 @@
+"""Simulation metrics.
+
+This module defines the Metrics class, a registry of counters, histograms and time series kept by the timeline.
+Protocols update the registry of their timeline directly (e.g. entanglement generation attempts and successes per link),
+so outcomes can be counted without parsing log files.
+The registry can be exported to JSON or CSV, and the timeline does so at the end of `run` if `Timeline.metrics_file` is set.
+
+Each metric is identified by a name and an optional label (e.g. a node or link name).
+
+Attributes:
+    DEFAULT_BINS (int): number of bins used for exported histograms.
+"""
+
+import csv
+import json
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_BINS = 10
+
+
+class Metrics:
+    """Class of simulation metrics registry.
+
+    Attributes:
+        counters (Dict[str, Dict[str, int]]): counter values, indexed by name and label.
+        histograms (Dict[str, Dict[str, List[float]]]): observed values, indexed by name and label.
+        time_series (Dict[str, Dict[str, List[Tuple[int, float]]]]): (time, value) pairs, indexed by name and label.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.histograms: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+        self.time_series: Dict[str, Dict[str, List[Tuple[int, float]]]] = defaultdict(lambda: defaultdict(list))
+
+    def __getstate__(self):
+        return {"counters": {name: dict(values) for name, values in self.counters.items()},
+                "histograms": {name: dict(values) for name, values in self.histograms.items()},
+                "time_series": {name: dict(values) for name, values in self.time_series.items()}}
+
+    def __setstate__(self, state):
+        self.__init__()
+        for attr in ["counters", "histograms", "time_series"]:
+            registry = getattr(self, attr)
+            for name, values in state[attr].items():
+                registry[name].update(values)
+
+    def inc(self, name: str, label: str = "", amount: int = 1) -> None:
+        """Method to increase a counter.
+
+        Args:
+            name (str): name of the counter.
+            label (str): label of the counter, e.g. a node or link name (default "").
+            amount (int): increment (default 1).
+        """
+
+        self.counters[name][label] += amount
+
+    def observe(self, name: str, value: float, label: str = "") -> None:
+        """Method to add a value to a histogram.
+
+        Args:
+            name (str): name of the histogram.
+            value (float): observed value.
+            label (str): label of the histogram (default "").
+        """
+
+        self.histograms[name][label].append(value)
+
+    def record(self, name: str, time: int, value: float, label: str = "") -> None:
+        """Method to add a point to a time series.
+
+        Args:
+            name (str): name of the time series.
+            time (int): simulation time of the point.
+            value (float): value of the point.
+            label (str): label of the time series (default "").
+        """
+
+        self.time_series[name][label].append((time, value))
+
+    def get_counter(self, name: str, label: Optional[str] = None) -> int:
+        """Method to get a counter value.
+
+        Args:
+            name (str): name of the counter.
+            label (str): label of the counter (default None, sum over all labels).
+
+        Returns:
+            int: counter value (0 if never increased).
+        """
+
+        if name not in self.counters:
+            return 0
+        if label is None:
+            return sum(self.counters[name].values())
+        return self.counters[name].get(label, 0)
+
+    def reset(self) -> None:
+        """Method to clear all metrics."""
+
+        self.__init__()
+
+    def to_dict(self, bins: int = DEFAULT_BINS) -> Dict:
+        """Method to summarize all metrics.
+
+        Histograms are summarized by their count, mean, min, max and bin counts.
+
+        Args:
+            bins (int): number of bins of each histogram (default `DEFAULT_BINS`).
+
+        Returns:
+            Dict: JSON serializable summary with "counters", "histograms" and "time_series" keys.
+        """
+
+        histograms = {}
+        for name, values in self.histograms.items():
+            histograms[name] = {}
+            for label, data in values.items():
+                counts, edges = np.histogram(data, bins=bins)
+                histograms[name][label] = {"count": len(data),
+                                           "mean": float(np.mean(data)),
+                                           "min": float(np.min(data)),
+                                           "max": float(np.max(data)),
+                                           "bin_edges": edges.tolist(),
+                                           "bin_counts": counts.tolist()}
+
+        return {"counters": {name: dict(values) for name, values in self.counters.items()},
+                "histograms": histograms,
+                "time_series": {name: {label: [list(point) for point in data] for label, data in values.items()}
+                                for name, values in self.time_series.items()}}
+
+    def to_json(self, filename: str) -> None:
+        """Method to write the metrics summary (see `to_dict`) to a JSON file."""
+
+        with open(filename, "w") as fh:
+            json.dump(self.to_dict(), fh, indent=2)
+
+    def to_csv(self, filename: str) -> None:
+        """Method to write all metrics to a CSV file.
+
+        Rows are (type, name, label, time, value);
+        time is empty for counters and histograms, and histograms are written as one row per observed value.
+        """
+
+        with open(filename, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["type", "name", "label", "time", "value"])
+            for name, values in self.counters.items():
+                for label, count in values.items():
+                    writer.writerow(["counter", name, label, "", count])
+            for name, values in self.histograms.items():
+                for label, data in values.items():
+                    for value in data:
+                        writer.writerow(["histogram", name, label, "", value])
+            for name, values in self.time_series.items():
+                for label, data in values.items():
+                    for time, value in data:
+                        writer.writerow(["time_series", name, label, time, value])
+
+    def export(self, filename: str) -> None:
+        """Method to write all metrics to file, as JSON if `filename` ends with ".json" and as CSV otherwise."""
+
+        if filename.endswith(".json"):
+            self.to_json(filename)
+        else:
+            self.to_csv(filename)
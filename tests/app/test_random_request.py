@@ -74,7 +74,7 @@ def test_RandomRequestApp_get_reserve_res():
     app.request_time = 5
     app.get_reserve_res(reservation, True)
     assert app.get_wait_time()[0] == 5
-    assert len(tl.events) == 41 and tl.events.data[0].time == 10
+    assert len(tl.events) == 41 and tl.events.top().time == 10
 
     tl = Timeline()
     tl.time = 6
@@ -193,11 +193,13 @@ def test_Memory__schedule_expiration():
 
     mem._schedule_expiration()
 
+    assert event.is_invalid()
     counter = 0
-    for event in tl.events:
-        if event.is_invalid():
+    for e in tl.events:
+        if not e.is_invalid():
             counter += 1
     assert counter == 1
+    assert mem.expiration_event is not event
 
 
 def test_Absorptive_prepare():
@@ -209,7 +211,7 @@ def test_Absorptive_prepare():
     tl.init()
     mem.prepare()
     assert len(tl.events) == 1
-    event = tl.events.data[0]
+    event = tl.events.top()
     assert event.time == PREPARE_TIME
     process = event.process
     assert process.owner is mem
@@ -333,11 +335,13 @@ def test_Absorptive_expire():
 
     mem._schedule_expiration()
 
+    assert event.is_invalid()
     counter = 0
-    for event in tl.events:
-        if event.is_invalid():
+    for e in tl.events:
+        if not e.is_invalid():
             counter += 1
     assert counter == 1
+    assert mem.expiration_event is not event
 
 
 def test_MemoryWithRandomCoherenceTime__schedule_expiration():
@@ -227,6 +227,9 @@ def test_generation_run():
 
     ratio = empty_count / NUM_TESTS
     assert abs(ratio - 0.5) < 0.1
+
+    assert tl.metrics.get_counter("eg_attempts", "e0-e1") == NUM_TESTS
+    assert tl.metrics.get_counter("eg_successes", "e0-e1") == NUM_TESTS - empty_count
     
 
 def test_generation_fidelity_ket():
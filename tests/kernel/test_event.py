@@ -1,4 +1,5 @@
 import math
+import pytest
 
 from sequence.kernel.event import Event
 
@@ -13,3 +14,9 @@ def test_event():
     assert e1 < e2
     assert e1 < e3
     assert e3 < e2
+
+
+def test_event_slots():
+    e = Event(0, None)
+    with pytest.raises(AttributeError):
+        e.foo = 1
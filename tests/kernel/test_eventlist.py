@@ -1,7 +1,9 @@
-from sequence.kernel.event import Event
-from sequence.kernel.eventlist import EventList
+import pytest
 from numpy import random
 
+from sequence.kernel.event import Event
+from sequence.kernel.eventlist import EventList, BucketEventList, CalendarEventList, LadderEventList
+
 
 MAX_TS = 100
 MIN_TS = 0
@@ -99,7 +101,7 @@ def test_update_event_time():
 
         index = random.randint(len(ts))
         agg_t = random.randint(25)
-        event = e.data[index]
+        event = list(e)[index]
 
         e.update_event_time(event, event.time + agg_t)
 
@@ -119,8 +121,8 @@ def test_update_event_time():
             e.push(event)
 
         index = random.randint(len(ts))
-        dec_t = random.randint(e.data[index].time)
-        event = e.data[index]
+        dec_t = random.randint(list(e)[index].time)
+        event = list(e)[index]
 
         e.update_event_time(event, event.time - dec_t)
 
@@ -139,7 +141,7 @@ def test_update_event_time():
             e.push(event)
 
         index = random.randint(len(ts))
-        event = e.data[index]
+        event = list(e)[index]
 
         e.update_event_time(event, event.time)
 
@@ -156,3 +158,192 @@ def test_top():
         top_event = el.top()
         popped_event = el.pop()
         assert top_event == popped_event
+
+
+def _check_heap(el: EventList):
+    for i, entry in enumerate(el.data):
+        if i > 0:
+            assert not entry < el.data[(i - 1) // 2]
+    current = [entry for entry in el.data if entry[3]._seq == entry[2]]
+    assert len(current) == len(el)
+
+
+def test_remove_from_heap():
+    random.seed(1)
+    el = EventList(compaction_ratio=1)
+    events = [Event(t, None) for t in random.randint(MIN_TS, MAX_TS, 100)]
+    for e in events:
+        el.push(e)
+
+    removed = [events[i] for i in random.choice(100, 40, replace=False)]
+    for e in removed:
+        el.remove(e)
+        assert e.is_invalid()
+    assert el.live_count() == 60
+
+    # removing twice has no further effect
+    el.remove(removed[0])
+    assert el.live_count() == 60
+
+    pre_time = -1
+    valid = 0
+    while not el.isempty():
+        e = el.pop()
+        assert e.time >= pre_time
+        pre_time = e.time
+        valid += not e.is_invalid()
+    assert valid == 60 and el.dead_count == 0
+
+
+def test_update_event_time_reinsert():
+    random.seed(2)
+    el = EventList()
+    events = [Event(t, None) for t in random.randint(MIN_TS, MAX_TS, 100)]
+    for e in events:
+        el.push(e)
+
+    for _ in range(500):
+        e = events[random.randint(len(events))]
+        el.update_event_time(e, random.randint(MIN_TS, MAX_TS))
+        _check_heap(el)
+
+    popped = [el.pop() for _ in range(len(events))]
+    assert sorted(popped, key=lambda e: e.time) == popped
+    assert all(e._seq == 0 for e in popped)
+
+
+def test_pop_insertion_order():
+    el = EventList()
+    events = [Event(5, None, 1) for _ in range(50)]
+    for e in events:
+        el.push(e)
+    el.push(Event(5, None, 0))
+    el.push(Event(4, None, 2))
+
+    assert el.pop().time == 4
+    assert el.pop().priority == 0
+    popped = [el.pop() for _ in range(len(events))]
+    assert all(e1 is e2 for e1, e2 in zip(popped, events))
+
+    # rescheduled events are ordered after events already at the new time
+    el = EventList()
+    e1, e2, e3 = Event(1, None), Event(2, None), Event(3, None)
+    for e in [e1, e2, e3]:
+        el.push(e)
+    el.update_event_time(e1, 2)
+    assert el.pop() is e2
+    assert el.pop() is e1
+    assert el.pop() is e3
+
+
+def test_compaction():
+    random.seed(3)
+    el = EventList(compaction_ratio=0.5)
+    events = [Event(t, None) for t in random.randint(MIN_TS, MAX_TS, 100)]
+    for e in events:
+        el.push(e)
+
+    for e in events[:50]:
+        el.remove(e)
+    assert el.compaction_count == 0
+    assert el.dead_count == 50 and el.live_count() == 50 and len(el) == 100
+
+    el.remove(events[50])
+    assert el.compaction_count == 1
+    assert el.dead_count == 0 and len(el) == 49
+    _check_heap(el)
+    for e in el:
+        assert not e.is_invalid()
+
+    el.remove(events[51])
+    el.update_event_time(events[60], MAX_TS + 1)
+    remaining = [el.pop() for _ in range(len(el))]
+    assert el.dead_count == 0
+    assert sum(e.is_invalid() for e in remaining) == 1
+    assert remaining[-1] is events[60]
+
+    # compaction disabled
+    el = EventList(compaction_ratio=1)
+    events = [Event(t, None) for t in range(10)]
+    for e in events:
+        el.push(e)
+    for e in events:
+        el.remove(e)
+    assert el.compaction_count == 0 and el.dead_count == 10 and el.live_count() == 0
+
+
+def _pop_order_with_updates(el, seed: int):
+    rng = random.RandomState(seed)
+    events = []
+    order = []
+    now = 0
+    for i in range(1000):
+        op = rng.randint(10)
+        if op < 5 or not events:
+            t = now + rng.choice([0, 1, 7, 100, 5000, rng.randint(0, 1000)])
+            if rng.randint(50) == 0:
+                t = float("inf")
+            e = Event(t, None, rng.choice([float("inf"), 0, 1]))
+            el.push(e)
+            events.append((i, e))
+        elif op == 5:
+            _, e = events.pop(rng.randint(len(events)))
+            el.remove(e)
+        elif op == 6:
+            _, e = events[rng.randint(len(events))]
+            if e.time != float("inf"):
+                el.update_event_time(e, e.time + rng.randint(0, 300))
+        else:
+            e = el.pop()
+            while e.is_invalid():
+                e = el.pop()
+            if e.time != float("inf"):
+                now = e.time
+            order.append([i for i, x in events if x is e][0])
+            events = [(i, x) for i, x in events if x is not e]
+    while el.live_count() > 0:
+        e = el.pop()
+        if not e.is_invalid():
+            order.append([i for i, x in events if x is e][0])
+    return order
+
+
+@pytest.mark.parametrize("event_list_class", [CalendarEventList, LadderEventList])
+def test_bucket_event_list_order(event_list_class):
+    for seed in range(2):
+        for ratio in [0.1, 1]:
+            expected = _pop_order_with_updates(EventList(ratio), seed)
+            assert _pop_order_with_updates(event_list_class(ratio), seed) == expected
+
+
+@pytest.mark.parametrize("event_list_class", [CalendarEventList, LadderEventList])
+def test_bucket_event_list_interface(event_list_class):
+    el = event_list_class(compaction_ratio=1)
+    assert el.isempty()
+    events = [Event(t % 7, None, t % 3) for t in range(200)]
+    for e in events:
+        el.push(e)
+    assert len(el) == 200 and len(list(el)) == 200
+
+    el.remove(events[0])
+    el.update_event_time(events[1], 1000)
+    assert el.live_count() == 199 and el.dead_count == 1 and len(el) == 200
+    el.compact()
+    assert el.live_count() == len(el) == 199 and el.compaction_count == 1
+
+    expected = sorted(events[1:], key=lambda e: (e.time, e.priority))
+    popped = []
+    while not el.isempty():
+        assert el.top() is el.top()
+        popped.append(el.pop())
+    assert [(e.time, e.priority) for e in popped] == [(e.time, e.priority) for e in expected]
+    assert popped[-1] is events[1]
+
+
+def test_bucket_event_list_abstract():
+    class IncompleteEventList(BucketEventList):
+        def _count(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        IncompleteEventList()
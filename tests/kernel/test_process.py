@@ -22,3 +22,20 @@ def test_run():
     assert a.counter == 1 and b.counter == 0
     p2.run()
     assert a.counter == 1 and b.counter == -10
+
+
+def test_bind():
+    class Dummy():
+        def __init__(self):
+            self.counter = 0
+
+        def add(self, x):
+            self.counter += x
+
+    a = Dummy()
+    p = Process("a", "add", [2])
+    assert p.owner == "a"
+    p.bind(a)
+    assert p.owner is a
+    p.run()
+    assert a.counter == 2
@@ -1,6 +1,7 @@
 import numpy as np
 from scipy.linalg import fractional_matrix_power
 import math
+from pytest import raises
 
 from sequence.kernel.quantum_manager import *
 from sequence.components.circuit import Circuit
@@ -15,6 +16,9 @@ class DumbCircuit():
     def get_unitary_matrix(self):
         return self.matrix
 
+    def compile(self):
+        return [(self.matrix, list(range(self.size)))]
+
 
 def test_qmanager_get():
     qm = QuantumManagerKet()
@@ -473,6 +477,60 @@ def test_qmanager_apply_operator_fock():
     assert np.all(new_state.state == desired)
 
 
+def test_qmanager_apply_operator_order_fock():
+    TRUNCATION = 2
+
+    qm = QuantumManagerDensityFock(truncation=TRUNCATION)
+    create, destroy = qm.build_ladder()
+    keys = [qm.new() for _ in range(3)]
+    qm.apply_operator(np.eye((TRUNCATION + 1) ** 3), keys)
+
+    # operator on keys in reverse order of the stored state
+    qm.apply_operator(np.kron(create, np.eye(TRUNCATION + 1)), [keys[2], keys[0]])
+    state = qm.get(keys[0])
+    assert qm.get(keys[1]) is state
+
+    excited = np.zeros((TRUNCATION + 1, TRUNCATION + 1))
+    excited[1, 1] = 1
+    ground = np.zeros((TRUNCATION + 1, TRUNCATION + 1))
+    ground[0, 0] = 1
+    single_states = {keys[0]: ground, keys[1]: ground, keys[2]: excited}
+    desired = np.kron(np.kron(single_states[state.keys[0]], single_states[state.keys[1]]),
+                      single_states[state.keys[2]])
+    assert np.array_equal(state.state, desired)
+
+
+def test_qmanager_add_loss_fock():
+    TRUNCATION = 2
+    LOSS = 0.3
+    dim = TRUNCATION + 1
+
+    qm = QuantumManagerDensityFock(truncation=TRUNCATION)
+    keys = [qm.new() for _ in range(3)]
+    rng = np.random.default_rng(0)
+    amplitudes = rng.normal(size=dim ** 3) + 1j * rng.normal(size=dim ** 3)
+    amplitudes /= np.linalg.norm(amplitudes)
+    qm.set(keys, amplitudes)
+    state = np.outer(amplitudes, amplitudes.conj())
+    qm.add_loss(keys[1], LOSS)
+
+    # single-mode Kraus operators are cached, and complete
+    kraus_ops = loss_kraus_operators(LOSS, TRUNCATION)
+    assert loss_kraus_operators(LOSS, TRUNCATION) is kraus_ops
+    assert np.allclose(sum(op.conj().T @ op for op in kraus_ops), np.eye(dim))
+
+    # same result as operators padded with identity on the full space
+    desired = sum(np.kron(np.kron(np.eye(dim), op), np.eye(dim)) @ state @
+                  np.kron(np.kron(np.eye(dim), op), np.eye(dim)).conj().T for op in kraus_ops)
+    assert qm.get(keys[0]).keys == keys
+    assert np.allclose(qm.get(keys[0]).state, desired)
+
+    # full loss leaves the vacuum
+    key = qm.new([0, 0, 1])
+    qm.add_loss(key, 1)
+    assert np.allclose(qm.get(key).state, np.diag([1, 0, 0]))
+
+
 def test_qmanager_measure_fock():
     NUM_TESTS = 1000
     TRUNCATION = 2
@@ -553,3 +611,308 @@ def test_qmanager_measure_fock():
             raise Exception()
 
     assert abs((len(meas_0) / NUM_TESTS) - 0.5) < 0.1
+
+
+def test_qmanager_stabilizer_set():
+    qm = QuantumManagerStabilizer()
+    key = qm.new()
+    assert np.array_equal(qm.get(key).state, [[0, 1, 0]])  # +Z
+    qm.set([key], [0.5 ** 0.5, 0.5 ** 0.5])
+    assert np.array_equal(qm.get(key).state, [[1, 0, 0]])  # +X
+    qm.set_to_one(key)
+    assert np.array_equal(qm.get(key).state, [[0, 1, 1]])  # -Z
+
+    key2 = qm.new()
+    psi_minus = [0, 0.5 ** 0.5, -(0.5 ** 0.5), 0]
+    qm.set([key, key2], psi_minus)
+    assert qm.get(key) is qm.get(key2)
+    assert np.allclose(qm.get(key).to_ket(), psi_minus)
+
+    with raises(ValueError):
+        qm.set([key], [math.cos(0.1), math.sin(0.1)])
+
+
+def test_qmanager_circuit_stabilizer():
+    qm = QuantumManagerStabilizer()
+
+    # bell state
+    key1 = qm.new()
+    key2 = qm.new()
+    circuit = Circuit(2)
+    circuit.h(0)
+    circuit.cx(0, 1)
+    assert qm.run_circuit(circuit, [key1, key2]) == {}
+    assert qm.get(key1) is qm.get(key2)
+    assert np.allclose(qm.get(key1).to_ket(), [0.5 ** 0.5, 0, 0, 0.5 ** 0.5])
+
+    # keys out of order
+    key3 = qm.new()
+    circuit = Circuit(2)
+    circuit.cx(0, 1)
+    qm.run_circuit(circuit, [key2, key3])
+    assert qm.get(key1).keys == [key1, key2, key3]
+    assert np.allclose(qm.get(key1).to_ket(), [0.5 ** 0.5, 0, 0, 0, 0, 0, 0, 0.5 ** 0.5])
+
+    # non-Clifford gate
+    circuit = Circuit(1)
+    circuit.t(0)
+    with raises(ValueError):
+        qm.run_circuit(circuit, [key1])
+
+
+def test_qmanager__measure_stabilizer():
+    # results and post-measurement states should match the ket vector formalism
+    circuit = Circuit(3)
+    circuit.h(0)
+    circuit.cx(0, 1)
+    circuit.h(2)
+    circuit.cx(2, 1)
+    circuit.s(2)
+    circuit.measure(1)
+    circuit.measure(2)
+
+    for meas_samp in np.linspace(0.01, 0.99, 9):
+        qm_ket = QuantumManagerKet()
+        qm_stab = QuantumManagerStabilizer()
+        keys_ket = [qm_ket.new() for _ in range(3)]
+        keys_stab = [qm_stab.new() for _ in range(3)]
+        res_ket = qm_ket.run_circuit(circuit, keys_ket, meas_samp)
+        res_stab = qm_stab.run_circuit(circuit, keys_stab, meas_samp)
+        assert res_ket == res_stab
+        for key in keys_stab[1:]:
+            assert qm_stab.get(key).keys == [key]
+            assert np.allclose(qm_stab.get(key).to_ket(), qm_ket.get(key).state)
+        assert qm_stab.get(0).keys == [0]
+        assert np.isclose(abs(np.vdot(qm_stab.get(0).to_ket(), qm_ket.get(0).state)), 1)
+
+    # deterministic measurement of entangled qubit
+    qm = QuantumManagerStabilizer()
+    keys = [qm.new(), qm.new()]
+    qm.set(keys, [0, 0.5 ** 0.5, 0.5 ** 0.5, 0])
+    circuit = Circuit(1)
+    circuit.measure(0)
+    res = qm.run_circuit(circuit, [keys[0]], 0.9)
+    circuit = Circuit(1)
+    circuit.measure(0)
+    assert qm.run_circuit(circuit, [keys[1]], 0.1)[keys[1]] == 1 - res[keys[0]]
+
+
+def test_qmanager_bell_diagonal_set():
+    qm = QuantumManagerBellDiagonal()
+    keys = [qm.new() for _ in range(3)]
+
+    # Bell diagonal pairs are stored as coefficients
+    qm.set(keys[:2], [0.5 ** 0.5, 0, 0, 0.5 ** 0.5])
+    assert isinstance(qm.get(keys[0]), BellDiagonalState)
+    assert qm.get(keys[0]) is qm.get(keys[1])
+    assert np.allclose(qm.get(keys[0]).diag, [1, 0, 0, 0])
+    assert np.isclose(qm.get_fidelity(keys[1]), 1)
+
+    # other states are stored as density matrices
+    qm.set(keys[:2], [1, 0, 0, 0])
+    assert isinstance(qm.get(keys[0]), DensityState)
+    assert np.isclose(qm.get_fidelity(keys[0]), 0.5)
+    assert qm.get_fidelity(keys[2]) is None
+
+    # Pauli noise
+    qm.set(keys[:2], bell_diagonal_to_density([0.7, 0.1, 0.1, 0.1]))
+    qm.apply_pauli_noise(keys[1], [0.1, 0, 0.2])
+    assert np.allclose(qm.get(keys[0]).diag, [0.7 * 0.7 + 0.2 * 0.1 + 0.1 * 0.1, 0.7 * 0.1 + 0.2 * 0.7 + 0.1 * 0.1,
+                                              0.7 * 0.1 + 0.2 * 0.1 + 0.1 * 0.7, 0.1])
+
+
+def test_qmanager_circuit_bell_diagonal():
+    def reduced_state(qm, keys):
+        state = qm.get(keys[0])
+        all_keys = list(state.keys)
+        rho = np.array(state.state).reshape([2] * 2 * len(all_keys))
+        for key in [k for k in all_keys if k not in keys]:
+            index = all_keys.index(key)
+            rho = np.trace(rho, axis1=index, axis2=index + len(all_keys))
+            all_keys.remove(key)
+        if all_keys != keys:
+            rho = rho.transpose(1, 0, 3, 2)
+        return rho.reshape(4, 4)
+
+    # swapping and purification results should match the density matrix formalism
+    swap = Circuit(2)
+    swap.cx(0, 1)
+    swap.h(0)
+    swap.measure(0)
+    swap.measure(1)
+    purify = Circuit(2)
+    purify.cx(0, 1)
+    purify.measure(1)
+    correction = Circuit(1)
+    correction.x(0)
+    correction.z(0)
+
+    diag1 = [0.7, 0.1, 0.15, 0.05]
+    diag2 = [0.8, 0.02, 0.08, 0.1]
+    for samp in np.linspace(0.01, 0.99, 7):
+        results = []
+        for qm in [QuantumManagerBellDiagonal(), QuantumManagerDensity()]:
+            keys = [qm.new() for _ in range(4)]
+            qm.set(keys[:2], bell_diagonal_to_density(diag1))
+            qm.set(keys[2:], bell_diagonal_to_density(diag2))
+            res = qm.run_circuit(swap, [keys[1], keys[2]], samp)
+            qm.run_circuit(correction, [keys[3]])
+            results.append((res, reduced_state(qm, [keys[0], keys[3]])))
+        assert results[0][0] == results[1][0]
+        assert np.allclose(results[0][1], results[1][1])
+
+        for samp2 in [0.2, 0.6, 0.95]:
+            results = []
+            for qm in [QuantumManagerBellDiagonal(), QuantumManagerDensity()]:
+                keys = [qm.new() for _ in range(4)]
+                qm.set(keys[:2], bell_diagonal_to_density(diag1))
+                qm.set(keys[2:], bell_diagonal_to_density(diag2))
+                res = qm.run_circuit(purify, [keys[0], keys[2]], samp)
+                res.update(qm.run_circuit(purify, [keys[1], keys[3]], samp2))
+                results.append((res, reduced_state(qm, keys[:2])))
+            assert results[0][0] == results[1][0]
+            assert np.allclose(results[0][1], results[1][1])
+
+    # gates other than swapping, purification and Pauli gates fall back to density matrices
+    qm = QuantumManagerBellDiagonal()
+    keys = [qm.new(), qm.new()]
+    qm.set(keys, bell_diagonal_to_density(diag1))
+    circuit = Circuit(1)
+    circuit.h(0)
+    qm.run_circuit(circuit, [keys[0]])
+    assert isinstance(qm.get(keys[0]), DensityState)
+    assert qm.get(keys[0]).keys == keys
+
+
+def test_qmanager_factorize_ket():
+    qm = QuantumManagerKet()
+    keys = [qm.new() for _ in range(3)]
+
+    # measuring one qubit of a GHZ state leaves a product state
+    ghz = [0.5 ** 0.5, 0, 0, 0, 0, 0, 0, 0.5 ** 0.5]
+    qm.set(keys, ghz)
+    assert qm.max_group_size == 3
+    circuit = Circuit(1)
+    circuit.measure(0)
+    res = qm.run_circuit(circuit, [keys[0]], 0.7)
+    for key in keys[1:]:
+        assert qm.get(key).keys == [key]
+        assert np.allclose(qm.get(key).state, [1 - res[keys[0]], res[keys[0]]])
+
+    # measuring one qubit leaves an entangled pair
+    bell_plus = [0.5 ** 0.5, 0, 0, 0.5 ** 0.5]
+    qm.set(keys, np.kron([0, 1], bell_plus))
+    qm.run_circuit(circuit, [keys[0]], 0.5)
+    assert qm.get(keys[1]).keys == keys[1:]
+    assert np.allclose(qm.get(keys[1]).state, bell_plus)
+
+    # qubits left behind by set keep their state if separable
+    qm.set(keys, np.kron([0.6, 0.8j], bell_plus))
+    qm.set_to_zero(keys[0])
+    assert qm.get(keys[1]).keys == keys[1:]
+    assert np.allclose(qm.get(keys[1]).state, bell_plus)
+    qm.set(keys, np.kron([0.6, 0.8j], bell_plus))
+    qm.set_to_zero(keys[1])
+    assert qm.get(keys[0]).keys == [keys[0]]
+    assert np.allclose(qm.get(keys[0]).state, [0.6, 0.8j])
+    assert qm.get(keys[2]).keys == keys
+    assert qm.max_group_size == 3
+
+
+def test_qmanager_factorize_density():
+    qm = QuantumManagerDensity()
+    keys = [qm.new() for _ in range(3)]
+    bell_plus = np.array([0.5 ** 0.5, 0, 0, 0.5 ** 0.5])
+
+    # measured qubits and uncorrelated qubits are split from the state
+    mixed = np.diag([0.2, 0.8])
+    qm.set(keys, np.kron(mixed, np.outer(bell_plus, bell_plus)))
+    circuit = Circuit(1)
+    circuit.measure(0)
+    qm.run_circuit(circuit, [keys[1]], 0.3)
+    for key in keys:
+        assert qm.get(key).keys == [key]
+    assert np.allclose(qm.get(keys[0]).state, mixed)
+    assert np.allclose(qm.get(keys[1]).state, qm.get(keys[2]).state)
+
+    # qubits left behind by set keep their reduced state
+    qm.set(keys, np.kron(mixed, np.outer(bell_plus, bell_plus)))
+    qm.set_to_zero(keys[1])
+    assert qm.get(keys[0]).keys == [keys[0]]
+    assert qm.get(keys[2]).keys == [keys[2]]
+    assert np.allclose(qm.get(keys[0]).state, mixed)
+    assert np.allclose(qm.get(keys[2]).state, np.eye(2) / 2)
+
+    # correlated states are kept together
+    classical = np.diag([0.5, 0, 0, 0.5])
+    qm.set(keys[:2], classical)
+    qm.run_circuit(Circuit(2), keys[:2])
+    assert qm.get(keys[0]).keys == keys[:2]
+
+
+def test_qmanager_run_circuit_batch():
+    circuit = Circuit(2)
+    circuit.h(0)
+    circuit.cx(0, 1)
+    circuit.measure(1)
+    bell_plus = np.array([0.5 ** 0.5, 0, 0, 0.5 ** 0.5])
+    samples = [0.2, 0.7, 0.4]
+
+    for manager, state in [(QuantumManagerKet, np.kron([0.6, 0.8], bell_plus)),
+                           (QuantumManagerDensity, np.kron(np.diag([0.3, 0.7]), np.outer(bell_plus, bell_plus)))]:
+        # groups of keys with states of different sizes give the same results as running them one by one
+        results = []
+        for batch in [False, True]:
+            qm = manager()
+            keys_list = []
+            for i in range(3):
+                keys = [qm.new() for _ in range(3)]
+                if i > 0:
+                    qm.set(keys, state)
+                keys_list.append([keys[2], keys[0]] if i == 2 else keys[:2])
+            if batch:
+                res = qm.run_circuit_batch(circuit, keys_list, samples)
+            else:
+                res = [qm.run_circuit(circuit, keys, samp) for keys, samp in zip(keys_list, samples)]
+            results.append((res, [(qm.get(key).keys, qm.get(key).state) for key in range(9)]))
+        assert results[0][0] == results[1][0]
+        for (keys0, state0), (keys1, state1) in zip(results[0][1], results[1][1]):
+            assert keys0 == keys1
+            assert np.allclose(state0, state1)
+
+    # groups sharing a state are run one by one
+    qm = QuantumManagerKet()
+    keys = [qm.new() for _ in range(2)]
+    qm.set(keys, bell_plus)
+    flip = Circuit(1)
+    flip.x(0)
+    assert qm.run_circuit_batch(flip, [[keys[0]], [keys[1]]]) == [{}, {}]
+    assert np.allclose(qm.get(keys[0]).state, bell_plus)
+
+
+def test_qmanager_defer_circuit():
+    flip = Circuit(1)
+    flip.x(0)
+    measure = Circuit(1)
+    measure.measure(0)
+
+    qm = QuantumManagerKet()
+    keys = [qm.new() for _ in range(3)]
+    results = []
+    for key in keys:
+        qm.defer_circuit(flip, [key])
+    qm.defer_circuit(measure, [keys[0]], 0.5, results.append)
+    assert len(qm.deferred) == 4 and results == []
+    qm.flush()
+    assert qm.deferred == [] and results == [{keys[0]: 1}]
+
+    # accessing states runs deferred circuits first
+    qm.defer_circuit(flip, [keys[1]])
+    assert np.allclose(qm.get(keys[1]).state, [1, 0])
+    assert qm.deferred == []
+
+    # managers without batched kernels run circuits immediately
+    qm = QuantumManagerStabilizer()
+    key = qm.new()
+    qm.defer_circuit(measure, [key], 0.5, results.append)
+    assert qm.deferred == [] and results[-1] == {key: 0}
@@ -2,7 +2,9 @@ from math import sqrt
 from numpy.random import default_rng
 import pytest
 
-from sequence.kernel.quantum_state import KetState, FreeQuantumState
+import numpy as np
+
+from sequence.kernel.quantum_state import KetState, DensityState, FreeQuantumState, set_validation
 from sequence.utils.encoding import polarization
 
 
@@ -44,6 +46,27 @@ def test_build_ket():
         _ = KetState(amps, keys)
 
 
+def test_build_trusted():
+    amps = np.array([complex(0), complex(1)])
+    state = KetState.trusted(amps, [0])
+    assert state.state is amps
+    assert state.keys == [0]
+    assert state.truncation == 1
+    density = DensityState.trusted(np.eye(3) / 3, [0], truncation=2)
+    assert density.truncation == 2
+
+    # invalid states are only detected with validation enabled
+    _ = KetState.trusted(np.array([complex(0), complex(0)]), [0])
+    set_validation(True)
+    try:
+        with pytest.raises(AssertionError, match="Squared amplitudes do not sum to 1"):
+            _ = KetState.trusted(np.array([complex(0), complex(0)]), [0])
+        with pytest.raises(AssertionError, match="density matrix trace must be 1"):
+            _ = DensityState.trusted(np.eye(2), [0])
+    finally:
+        set_validation(False)
+
+
 def test_measure():
     qs = FreeQuantumState()
     states = [(complex(1), complex(0)),
@@ -0,0 +1,74 @@
+import numpy as np
+from pytest import raises
+
+from sequence.kernel.state_arena import StateArena
+from sequence.kernel.quantum_state import KetState, DensityState
+from sequence.kernel.quantum_manager import QuantumManagerKet, QuantumManagerDensity, ARENA_STATE_STORAGE
+from sequence.components.circuit import Circuit
+
+
+def test_assign():
+    arena = StateArena(KetState, capacity=2)
+    arena.assign([0], [1, 0])
+    arena.assign([1, 2], [0.5 ** 0.5, 0, 0, 0.5 ** 0.5])
+    assert len(arena) == 3
+    assert isinstance(arena[0], KetState)
+    assert arena[0].keys == [0]
+    assert np.all(arena[0].state == [1, 0])
+    assert arena[1] is arena[2]
+    assert arena[1].keys == [1, 2]
+
+    # rows are released when no key points to them
+    pair = arena[1]
+    arena.assign([1], [0, 1])
+    assert arena[2] is pair
+    arena.assign([2], [0, 1])
+    assert arena.tables[2].free == [1, 0]
+    assert np.all(pair.state == [0.5 ** 0.5, 0, 0, 0.5 ** 0.5])
+
+    # tables grow beyond their capacity
+    for key in range(3, 10):
+        arena.assign([key], [0, 1])
+    assert len(arena.tables[1].refs) == 16
+    assert all(np.all(arena[key].state == [0, 1]) for key in range(1, 10))
+
+
+def test_objects():
+    arena = StateArena(DensityState, matrix=True)
+    state = np.kron(np.diag([1, 0]), np.eye(4) / 4)
+    arena.assign([0, 1, 2], state)
+    assert arena[0] is arena[2]
+    assert arena[0].keys == [0, 1, 2]
+    assert np.all(arena[0].state == state)
+
+    arena[3] = "test_string"
+    assert arena.get(3) == "test_string"
+    assert arena.get(4) is None
+    assert sorted(arena.keys()) == [0, 1, 2, 3]
+    del arena[3]
+    assert 3 not in arena
+    with raises(KeyError):
+        del arena[3]
+
+
+def test_qmanager_arena():
+    circuit = Circuit(3)
+    circuit.h(0)
+    circuit.cx(0, 1)
+    circuit.cx(1, 2)
+    circuit.measure(2)
+    for manager in [QuantumManagerKet, QuantumManagerDensity]:
+        for samp in [0.2, 0.8]:
+            qms = [manager(), manager(storage=ARENA_STATE_STORAGE)]
+            results = []
+            for qm in qms:
+                keys = [qm.new() for _ in range(3)]
+                qm.set(keys[:2], [0.5 ** 0.5, 0, 0, 0.5 ** 0.5])
+                res = qm.run_circuit(circuit, keys, samp)
+                results.append((res, [qm.get(key).keys for key in keys], [qm.get(key).state for key in keys]))
+            assert results[0][0] == results[1][0]
+            assert results[0][1] == results[1][1]
+            assert all(np.allclose(s0, s1) for s0, s1 in zip(results[0][2], results[1][2]))
+
+    with raises(ValueError):
+        QuantumManagerKet(storage="list")
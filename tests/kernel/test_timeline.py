@@ -1,5 +1,8 @@
+import os
 from math import inf
 from numpy import random
+from numpy.random import default_rng
+from pytest import raises
 
 from sequence.kernel.entity import Entity
 from sequence.kernel.event import Event
@@ -146,3 +149,177 @@ def test_schedule():
     tl.init()
     tl.run()
     assert tl.run_counter == SCHEDULE_NUM == e1.counter
+
+
+def test_get_event_stats():
+    timeline, dummys, events = _set_up_test('operate', number_of_dummys=4, event_time=1)
+    timeline.events.compaction_ratio = 1
+
+    assert timeline.get_event_stats() == {"live": 4, "dead": 0, "compactions": 0}
+    timeline.remove_event(events[0])
+    assert timeline.get_event_stats() == {"live": 3, "dead": 1, "compactions": 0}
+
+    timeline.events.compact()
+    assert timeline.get_event_stats() == {"live": 3, "dead": 0, "compactions": 1}
+    timeline.run()
+    assert timeline.get_event_stats()["live"] == 0
+
+
+def test_event_queue():
+    with raises(ValueError):
+        Timeline(event_queue="unknown")
+
+    for event_queue in ["heap", "calendar", "ladder"]:
+        tl = Timeline(event_queue=event_queue)
+        dummys = [Dummy(f'{i}', tl) for i in range(10)]
+        for i, dummy in enumerate(dummys):
+            tl.schedule(Event(100 - i, Process(dummy, 'click', [])))
+        tl.update_event_time(tl.events.top(), 200)
+        tl.init()
+        tl.run()
+        assert [dummy.click_time for dummy in dummys[:-1]] == [100 - i for i in range(9)]
+        assert dummys[-1].click_time == 200
+
+
+class RandomDummy(Entity):
+    def __init__(self, name, timeline, seed):
+        Entity.__init__(self, name, timeline)
+        self.generator = default_rng(seed)
+        self.values = []
+
+    def init(self):
+        pass
+
+    def get_generator(self):
+        return self.generator
+
+    def sample(self):
+        self.values.append(self.get_generator().random())
+        process = Process(self, "sample", [])
+        self.timeline.schedule(Event(self.timeline.now() + 10, process))
+
+
+def test_snapshot_restore():
+    tl = Timeline(100)
+    dummy = RandomDummy("dummy", tl, 0)
+    qubit = tl.quantum_manager.new()
+    tl.schedule(Event(5, Process(dummy, "sample", [])))
+    tl.init()
+    tl.run()
+    assert len(dummy.values) == 10
+
+    snapshot = tl.snapshot()
+    assert snapshot.time == tl.now() == 95
+
+    tl.stop_time = 200
+    tl.quantum_manager.set([qubit], [complex(0), complex(1)])
+    tl.run()
+    expected = list(dummy.values)
+    assert len(expected) == 20
+
+    for _ in range(2):
+        tl.restore(snapshot)
+        restored = tl.get_entity_by_name("dummy")
+        assert restored is not dummy and restored.timeline is tl
+        assert tl.now() == 95 and len(restored.values) == 10
+        assert tl.quantum_manager.get(qubit).state[0] == 1
+        tl.stop_time = 200
+        tl.run()
+        assert restored.values == expected
+
+    # restore into another timeline
+    tl2 = Timeline()
+    tl2.restore(snapshot)
+    restored = tl2.get_entity_by_name("dummy")
+    assert restored.timeline is tl2 and tl2.now() == 95
+    tl2.stop_time = 200
+    tl2.run()
+    assert restored.values == expected
+
+
+def test_fork(tmp_path):
+    tl = Timeline(100)
+    dummy = RandomDummy("dummy", tl, 0)
+    tl.schedule(Event(5, Process(dummy, "sample", [])))
+    tl.init()
+    tl.run()
+
+    index = tl.fork(3)
+    if index >= 0:
+        try:
+            dummy.generator = default_rng(index)
+            tl.stop_time = 200
+            tl.run()
+            (tmp_path / str(index)).write_text(str(dummy.values))
+        finally:
+            os._exit(0)
+
+    assert tl.wait_forks() == [0, 0, 0]
+    for index in range(3):
+        values = eval((tmp_path / str(index)).read_text())
+        assert values[:10] == dummy.values
+        assert values[10:] == list(default_rng(index).random(10))
+
+
+def test_profiling(tmp_path):
+    tl = Timeline()
+    dummy = Dummy(_DEFAULT_DUMMY_NAME, tl)
+    for t in range(10):
+        tl.schedule(Event(t, Process(dummy, "operate", [])))
+        tl.schedule(Event(t, Process(_DEFAULT_DUMMY_NAME, "click", [])))
+    invalid = Event(5, Process(dummy, "operate", []))
+    tl.schedule(invalid)
+    tl.remove_event(invalid)
+
+    profiler = tl.enable_profiling()
+    assert tl.enable_profiling() is profiler
+    tl.init()
+    tl.run()
+    assert dummy.counter == 10
+    assert tl.run_counter == 20
+
+    summary = profiler.summary()
+    assert {(row["owner"], row["activation"]) for row in summary} == {("Dummy", "operate"), ("Dummy", "click")}
+    for row in summary:
+        assert row["count"] == 10
+        assert sum(row["histogram"].values()) == 10
+    assert abs(sum(row["fraction"] for row in summary) - 1) < 1e-9
+    assert "Dummy.operate" in profiler.table()
+    profiler.to_json(str(tmp_path / "profile.json"))
+
+    tl.disable_profiling()
+    tl.schedule(Event(20, Process(dummy, "operate", [])))
+    tl.run()
+    assert dummy.counter == 11
+    assert tl.profiler is None
+
+
+def test_deferred_circuits():
+    from sequence.components.circuit import Circuit
+
+    class Corrector(Entity):
+        def init(self):
+            pass
+
+        def correct(self, key):
+            self.timeline.quantum_manager.defer_circuit(flip, [key], callback=self.results.append)
+
+        def check(self):
+            self.deferred = len(self.timeline.quantum_manager.deferred)
+
+    flip = Circuit(1)
+    flip.x(0)
+    timeline = Timeline()
+    corrector = Corrector("corrector", timeline)
+    corrector.results = []
+    keys = [timeline.quantum_manager.new() for _ in range(3)]
+    for key in keys:
+        timeline.schedule(Event(10, Process(corrector, "correct", [key])))
+    timeline.schedule(Event(20, Process(corrector, "check", [])))
+    timeline.run()
+
+    # circuits deferred at time 10 are run (as one batch) before time advances
+    assert corrector.deferred == 0
+    assert corrector.results == [{}] * 3
+    for key in keys:
+        assert (timeline.quantum_manager.states[key].state == [0, 1]).all()
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from sequence.experiments import ExperimentRunner, parameter_grid, router_experiment, write_results
+
+CONFIG = "example/testjson.json"
+
+
+def square(params):
+    if params["x"] < 0:
+        raise ValueError("negative x")
+    return [{"y": params["x"] ** 2}]
+
+
+def test_parameter_grid():
+    grid = parameter_grid({"a": [1, 2], "b": ["x", "y", "z"]})
+    assert len(grid) == 6
+    assert grid[0] == {"a": 1, "b": "x"}
+    assert grid[-1] == {"a": 2, "b": "z"}
+    assert parameter_grid({}) == [{}]
+
+
+def test_ExperimentRunner(tmp_path):
+    output = str(tmp_path / "results.csv")
+    with ExperimentRunner(square, processes=2, preload=[]) as runner:
+        results = runner.run(parameter_grid({"x": [3, -1, 2, 1]}), output)
+        assert list(results["run"]) == [0, 1, 2, 3]
+        assert results["y"][0] == 9 and results["y"][2] == 4
+        assert results["error"][0] == ""
+        assert results["error"][1] == "ValueError: negative x"
+
+        # pool is reused between runs
+        pool = runner._pool
+        runner.run([{"x": 5}])
+        assert runner._pool is pool
+
+    assert runner._pool is None
+    saved = pd.read_csv(output)
+    assert list(saved["x"]) == [3, -1, 2, 1]
+
+
+@pytest.mark.parametrize("extension", ["parquet", "feather"])
+def test_write_results_columnar(tmp_path, extension):
+    pytest.importorskip("pyarrow")
+    output = str(tmp_path / "results.{}".format(extension))
+    results = pd.DataFrame({"run": [0, 1], "fidelity": [0.9, 0.8], "error": ["", "ValueError: negative x"]})
+    write_results(results, output)
+    saved = pd.read_parquet(output) if extension == "parquet" else pd.read_feather(output)
+    assert saved.equals(results)
+
+
+def test_router_experiment():
+    params = {"config": CONFIG, "seed": 0, "stop_time": 2e12, "end_time": 2e12}
+    rows = router_experiment(params)
+    assert len(rows) > 0
+    for row in rows:
+        assert row["router"] in ["r0", "r2"]
+        assert 1e12 < row["entangle_time"] < 2e12
+        assert 0 < row["fidelity"] <= 1
+
+    assert router_experiment(params) == rows
@@ -1,5 +1,8 @@
+from json import load, dump
+
 from sequence.topology.router_net_topo import RouterNetTopo
 from sequence.kernel.timeline import Timeline
+from sequence.kernel.quantum_manager import KET_STATE_FORMALISM, STABILIZER_FORMALISM
 
 
 def test_sequential_simulation():
@@ -70,3 +73,18 @@ def test_sequential_simulation():
         assert len(r.network_manager.protocol_stack[0].forwarding_table) > 0
 
 # TODO: unit test for the parallel simulation
+
+
+def test_formalism(tmp_path):
+    topo = RouterNetTopo("tests/topology/router_net_topo_sample_config.json")
+    assert topo.get_timeline().quantum_manager.formalism == KET_STATE_FORMALISM
+
+    with open("tests/topology/router_net_topo_sample_config.json") as fh:
+        config = load(fh)
+    config[RouterNetTopo.FORMALISM] = STABILIZER_FORMALISM
+    filename = str(tmp_path / "config.json")
+    with open(filename, "w") as fh:
+        dump(config, fh)
+
+    topo = RouterNetTopo(filename)
+    assert topo.get_timeline().quantum_manager.formalism == STABILIZER_FORMALISM
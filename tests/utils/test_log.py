@@ -51,3 +51,23 @@ def test_log():
 
     # TODO: fix (should be 1)
     assert file_len(filename) == 2
+
+
+def test_is_enabled():
+    tl = Timeline()
+    lg.set_logger(__name__, tl, filename)
+    lg.set_logger_level("INFO")
+    for mod in lg._log_modules[:]:
+        lg.remove_module(mod)
+
+    assert not lg.is_enabled("test_log")
+    lg.track_module("test_log")
+    assert lg.is_enabled("test_log")
+    assert lg.is_enabled("test_log", lg.INFO)
+    assert not lg.is_enabled("test_log", lg.DEBUG)
+    assert not lg.is_enabled("other")
+
+    lg.set_logger_level("DEBUG")
+    assert lg.is_enabled("test_log", lg.DEBUG)
+    lg.remove_module("test_log")
+    assert not lg.is_enabled("test_log", lg.DEBUG)
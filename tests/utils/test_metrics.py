@@ -0,0 +1,79 @@
+import csv
+import json
+from copy import deepcopy
+import pickle
+
+from sequence.kernel.timeline import Timeline
+from sequence.kernel.entity import Entity
+from sequence.kernel.event import Event
+from sequence.kernel.process import Process
+from sequence.utils.metrics import Metrics
+
+
+class Counter(Entity):
+    def __init__(self, name, tl):
+        super().__init__(name, tl)
+
+    def init(self):
+        pass
+
+    def count(self, value):
+        self.timeline.metrics.inc("count", self.name)
+        self.timeline.metrics.observe("value", value)
+        self.timeline.metrics.record("value", self.timeline.now(), value, self.name)
+
+
+def test_Metrics():
+    metrics = Metrics()
+    metrics.inc("a", "x")
+    metrics.inc("a", "x", 2)
+    metrics.inc("a", "y")
+    metrics.inc("b")
+    assert metrics.get_counter("a", "x") == 3
+    assert metrics.get_counter("a") == 4
+    assert metrics.get_counter("b") == 1
+    assert metrics.get_counter("c") == 0
+    assert metrics.get_counter("a", "z") == 0
+
+    for v in range(10):
+        metrics.observe("h", v)
+    metrics.record("t", 5, 0.5, "x")
+    summary = metrics.to_dict(bins=5)
+    assert summary["counters"]["a"] == {"x": 3, "y": 1}
+    assert summary["histograms"]["h"][""]["count"] == 10
+    assert summary["histograms"]["h"][""]["mean"] == 4.5
+    assert summary["histograms"]["h"][""]["bin_counts"] == [2] * 5
+    assert summary["time_series"]["t"]["x"] == [[5, 0.5]]
+
+    for copied in [deepcopy(metrics), pickle.loads(pickle.dumps(metrics))]:
+        assert copied.to_dict() == metrics.to_dict()
+        copied.inc("a", "x")
+        assert copied.get_counter("a", "x") == 4
+
+    metrics.reset()
+    assert metrics.get_counter("a") == 0
+    assert metrics.to_dict() == {"counters": {}, "histograms": {}, "time_series": {}}
+
+
+def test_Timeline_metrics_export(tmp_path):
+    for filename in ["metrics.json", "metrics.csv"]:
+        tl = Timeline()
+        tl.metrics_file = str(tmp_path / filename)
+        counter = Counter("counter", tl)
+        for t in range(4):
+            tl.schedule(Event(t, Process(counter, "count", [t / 10])))
+        tl.init()
+        tl.run()
+
+        if filename.endswith(".json"):
+            with open(tl.metrics_file) as fh:
+                summary = json.load(fh)
+            assert summary["counters"]["count"]["counter"] == 4
+            assert summary["histograms"]["value"][""]["count"] == 4
+            assert summary["time_series"]["value"]["counter"][-1] == [3, 0.3]
+        else:
+            with open(tl.metrics_file) as fh:
+                rows = list(csv.DictReader(fh))
+            assert rows[0] == {"type": "counter", "name": "count", "label": "counter", "time": "", "value": "4"}
+            assert len([row for row in rows if row["type"] == "histogram"]) == 4
+            assert len([row for row in rows if row["type"] == "time_series"]) == 4
@@ -0,0 +1,64 @@
+"""Micro-benchmark comparing Timeline event queue implementations.
+
+Runs a hold model (pop the next event, schedule a new one) with time steps on a regular grid,
+as produced by memory excitation periods and detector time bins.
+Example scripts given on the command line are also run once per event queue, e.g.
+
+    python utils/event_queue_timing.py example/distance_timebin.py
+"""
+
+import runpy
+import sys
+import time
+from unittest import mock
+
+from numpy import random
+
+from sequence.kernel import timeline as timeline_module
+from sequence.kernel.event import Event
+from sequence.kernel.eventlist import EVENT_QUEUES
+
+QUEUE_SIZES = [100, 10000, 100000]
+NUM_HOLDS = 200000
+PERIOD = 12500  # ps, 80 MHz excitation
+
+
+def hold_model(event_queue: str, size: int) -> float:
+    rng = random.default_rng(0)
+    el = EVENT_QUEUES[event_queue]()
+    for t in rng.integers(0, size, size):
+        el.push(Event(int(t) * PERIOD, None))
+    steps = [int(s) * PERIOD for s in rng.integers(1, size, NUM_HOLDS)]
+
+    start = time.perf_counter()
+    for step in steps:
+        event = el.pop()
+        el.push(Event(event.time + step, None))
+    return time.perf_counter() - start
+
+
+def run_script(event_queue: str, script: str) -> float:
+    class _Timeline(timeline_module.Timeline):
+        def __init__(self, *args, **kwargs):
+            kwargs.setdefault("event_queue", event_queue)
+            super().__init__(*args, **kwargs)
+
+    start = time.perf_counter()
+    with mock.patch.object(timeline_module, "Timeline", _Timeline):
+        runpy.run_path(script, run_name="__main__")
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    print("hold model ({} holds)".format(NUM_HOLDS))
+    for size in QUEUE_SIZES:
+        for event_queue in EVENT_QUEUES:
+            runtime = hold_model(event_queue, size)
+            print("\tsize {:>7} {:>9}: {:.3f}s ({:.0f} holds/s)".format(size, event_queue, runtime,
+                                                                     NUM_HOLDS / runtime))
+
+    for script in sys.argv[1:]:
+        print(script)
+        for event_queue in EVENT_QUEUES:
+            runtime = run_script(event_queue, script)
+            print("\t{:>9}: {:.3f}s".format(event_queue, runtime))
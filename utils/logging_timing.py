@@ -0,0 +1,62 @@
+"""Benchmark of simulation throughput with different logging setups.
+
+Runs an entanglement request over a router network (default example/testjson.json) and reports executed events/sec:
+
+    * no logger set (the default);
+    * logger set to INFO with no tracked modules;
+    * logger set to INFO with the hot-path modules tracked.
+
+    python utils/logging_timing.py [config.json]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from sequence.topology.router_net_topo import RouterNetTopo
+from sequence.utils import log
+
+STOP_TIME = 6e12
+REPEATS = 3
+TRACKED_MODULES = ["node", "optical_channel", "generation", "swapping", "purification", "resource_manager",
+                   "rule_manager", "network_manager", "bsm"]
+
+
+def run(config: str, logfile: str = None, modules=()) -> float:
+    topo = RouterNetTopo(config)
+    tl = topo.get_timeline()
+    tl.stop_time = STOP_TIME
+    routers = topo.get_nodes_by_type(RouterNetTopo.QUANTUM_ROUTER)
+
+    if logfile is not None:
+        log.set_logger("logging_timing", tl, logfile)
+        log.set_logger_level("INFO")
+        for module in modules:
+            log.track_module(module)
+
+    tl.init()
+    routers[0].network_manager.request(routers[-1].name, 1e12, STOP_TIME, 10, 0.9)
+    start = time.perf_counter()
+    tl.run()
+    runtime = time.perf_counter() - start
+
+    for module in modules:
+        log.remove_module(module)
+    for handler in log.logger.handlers[:]:
+        log.logger.removeHandler(handler)
+        handler.close()
+    log.logger.filters.clear()
+    return tl.run_counter / runtime
+
+
+if __name__ == "__main__":
+    config = sys.argv[1] if len(sys.argv) > 1 else "example/testjson.json"
+    logfile = os.path.join(tempfile.mkdtemp(), "out.log")
+
+    run(config)  # warm up imports and caches
+
+    print("no logger:         {:.0f} events/s".format(max(run(config) for _ in range(REPEATS))))
+    print("INFO, untracked:   {:.0f} events/s".format(max(run(config, logfile) for _ in range(REPEATS))))
+    print("INFO, tracked:     {:.0f} events/s".format(
+        max(run(config, logfile, TRACKED_MODULES) for _ in range(REPEATS))))
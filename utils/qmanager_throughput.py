@@ -0,0 +1,69 @@
+"""Compare the throughput of the serial and threaded quantum manager servers.
+
+Each client process keeps its own entangled groups of qubits on the server and repeatedly runs a circuit on them,
+so requests of different clients never share states.
+"""
+
+import time
+import multiprocessing
+import numpy as np
+
+from psequence.quantum_manager_server import generate_arg_parser, start_server, start_threaded_server
+from psequence.quantum_manager_client import QuantumManagerClient
+from sequence.kernel.quantum_manager import KET_STATE_FORMALISM
+from sequence.components.circuit import Circuit
+
+
+NUM_TRIALS = 3
+NUM_CLIENTS = 4
+GROUP_SIZE = 10  # qubits per entangled group
+NUM_RUNS = 50  # circuits run by each client
+
+
+def client_function(ip, port, barrier):
+    client = QuantumManagerClient(KET_STATE_FORMALISM, ip, port)
+    keys = [client.new() for _ in range(GROUP_SIZE)]
+    for key in keys:
+        client.move_manage_to_server(key)
+
+    circ = Circuit(GROUP_SIZE)
+    for i in range(GROUP_SIZE - 1):
+        circ.h(i)
+        circ.cx(i, i + 1)
+    circ.measure(GROUP_SIZE - 1)
+
+    barrier.wait()
+    for _ in range(NUM_RUNS):
+        # measurement results are returned, so each run is a round trip to the server
+        client.run_circuit(circ, keys, np.random.random())
+    client.disconnect_from_server()
+
+
+def run_trial(server_function, ip, port):
+    server = multiprocessing.Process(target=server_function, args=(ip, port, NUM_CLIENTS))
+    server.start()
+    time.sleep(0.5)
+
+    barrier = multiprocessing.Barrier(NUM_CLIENTS + 1)
+    clients = [multiprocessing.Process(target=client_function, args=(ip, port, barrier))
+               for _ in range(NUM_CLIENTS)]
+    for client in clients:
+        client.start()
+    barrier.wait()
+    start = time.time()
+    for client in clients:
+        client.join()
+    end = time.time()
+    server.join()
+    return NUM_CLIENTS * NUM_RUNS / (end - start)
+
+
+parser = generate_arg_parser()
+args = parser.parse_args()
+
+for server_function in [start_server, start_threaded_server]:
+    throughputs = []
+    for _ in range(NUM_TRIALS):
+        throughputs.append(run_trial(server_function, args.ip, args.port))
+        print("\tthroughput:", throughputs[-1])
+    print("{}: average throughput {} circuits/s".format(server_function.__name__, np.mean(throughputs)))